@@ -0,0 +1,75 @@
+# Picks the fastest E4980 :APERTURE setting that measures C within a relative noise target, by measuring a few bias
+# points repeatedly at each setting, and remembers the choice per device type and frequency.
+
+import json
+import os
+import pathlib
+import threading
+
+import numpy as np
+
+
+# Nominal E4980 integration time per point for each :APERTURE mode, the instrument also needs a few signal periods
+nominal_integration_time_s = { "SHORT" : 5.6E-3, "MEDIUM" : 88E-3, "LONG" : 220E-3 }
+aperture_settings = [ ("SHORT", 1), ("SHORT", 4), ("MEDIUM", 1), ("MEDIUM", 4), ("LONG", 4), ("LONG", 16) ] # (mode, averaging)
+
+
+def Point_Time_s( setting, ac_frequency ):
+	mode, averaging = setting
+	return averaging * (nominal_integration_time_s[ mode ] + 2 / ac_frequency)
+
+def Settings_By_Speed( ac_frequency, settings=aperture_settings ):
+	return sorted( settings, key=lambda setting : Point_Time_s( setting, ac_frequency ) )
+
+def Relative_Noise( repeats ):
+	# repeats is a (repeat, point) array of capacitance, returns the relative standard deviation pooled over points
+	with np.errstate( divide='ignore', invalid='ignore' ):
+		relative_variance = np.nanvar( repeats, axis=0, ddof=1 ) / np.nanmean( repeats, axis=0 )**2
+	relative_variance = relative_variance[ np.isfinite( relative_variance ) ]
+	return float( np.sqrt( np.mean( relative_variance ) ) ) if len( relative_variance ) else np.inf
+
+def Calibration_Bias_Points( x_values, point_count=5 ):
+	# A few biases spread over the sweep, depletion at reverse bias gives the smallest and relatively noisiest C
+	return x_values[ np.unique( np.linspace( 0, len(x_values) - 1, point_count ).round().astype( int ) ) ]
+
+
+class Aperture_Cache:
+	# JSON file of {"device type @ frequency" : [mode, averaging]}, None keeps choices for this session only
+	def __init__( self, file_name=None ):
+		self.file_name = None if file_name is None else pathlib.Path( file_name )
+		self.lock = threading.Lock()
+		self.choices = {}
+		if self.file_name is not None and self.file_name.exists():
+			with open( self.file_name ) as infile:
+				self.choices = json.load( infile )
+
+	@staticmethod
+	def Key( device_type, ac_frequency ):
+		return f"{device_type} @ {float( ac_frequency ):g} Hz"
+
+	def Get( self, device_type, ac_frequency ):
+		with self.lock:
+			choice = self.choices.get( self.Key( device_type, ac_frequency ) )
+		return None if choice is None else ( choice[0], int( choice[1] ) )
+
+	def Set( self, device_type, ac_frequency, setting ):
+		with self.lock:
+			self.choices[ self.Key( device_type, ac_frequency ) ] = list( setting )
+			if self.file_name is None:
+				return
+			temporary_file = self.file_name.with_suffix( ".tmp" ) # Replaced in one step so a crash never leaves half a file
+			with open( temporary_file, 'w' ) as outfile:
+				json.dump( self.choices, outfile, indent=1 )
+			os.replace( temporary_file, self.file_name )
+
+
+shared_caches = {}
+shared_caches_lock = threading.Lock()
+
+def Shared_Aperture_Cache( file_name=None ):
+	# Every station calibrating into the same file shares one cache
+	key = None if file_name is None else str( pathlib.Path( file_name ).absolute() )
+	with shared_caches_lock:
+		if key not in shared_caches:
+			shared_caches[ key ] = Aperture_Cache( file_name )
+		return shared_caches[ key ]
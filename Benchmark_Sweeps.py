@@ -0,0 +1,167 @@
+# Sweep throughput benchmarks against the simulated E4980, no instrument or dewar needed.
+# Run with: python -m CV_Measurement_Assistant.Benchmark_Sweeps [--time-scale 0.1] [--end-to-end]
+
+import argparse
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from PyQt5 import QtCore
+from rich import print
+from rich.table import Table
+
+from CV_Measurement_Assistant.CV_Box_Controller import CV_Controller
+from CV_Measurement_Assistant.Simulated_E4980 import Simulated_E4980
+
+
+class Phase_Timer:
+	# Wraps the instrument and the controller's parsing so wall time can be attributed to each sweep phase
+	def __init__( self, controller ):
+		self.totals = defaultdict( float )
+		instrument = controller.gpib_resource
+		self.Wrap( instrument, "write", "program" )
+		self.Wrap( instrument, "query_ascii_values", "fetch" )
+		self.Wrap( instrument, "query_binary_values", "fetch" )
+		self.Wrap( controller, "Parse_Impedance", "parse" )
+
+	def Wrap( self, owner, name, phase ):
+		original = getattr( owner, name )
+		def timed( *args, **kargs ):
+			start = time.perf_counter()
+			try:
+				return original( *args, **kargs )
+			finally:
+				self.totals[ phase ] += time.perf_counter() - start
+		setattr( owner, name, timed )
+
+
+def Benchmark_Sweep( label, time_scale, sweep_args, repeats=3, warm_up=True, **controller_settings ):
+	controller = CV_Controller( **controller_settings )
+	controller.gpib_resource = Simulated_E4980( time_scale=time_scale )
+	if warm_up: # Measures the steady state between devices, with the instrument already configured
+		controller.Voltage_Sweep_Keysight( *sweep_args )
+	timer = Phase_Timer( controller )
+	points = 0
+	start = time.perf_counter()
+	for _ in range( repeats ):
+		controller.Voltage_Sweep_Keysight( *sweep_args )
+		points += len( controller.last_result )
+	wall_time = time.perf_counter() - start
+	return dict( label=label, points_per_second=points / wall_time, sweep_time=wall_time / repeats,
+	             **{ phase : total / repeats for phase, total in timer.totals.items() } )
+
+def Run_Sweep_Benchmarks( time_scale, repeats ):
+	sweep_201 = ( -2.0, 0.5, 0.0125, 30E-3, 1E5, 0.0 ) # v_start, v_end, v_step, ac_voltage, ac_frequency, step_delay
+	sweep_1101 = ( -5.0, 0.5, 0.005, 30E-3, 1E5, 0.0 )
+	return [ Benchmark_Sweep( "List, ASCII, 201 pts, cold", time_scale, sweep_201, repeats, warm_up=False ),
+	         Benchmark_Sweep( "List, ASCII, 201 pts", time_scale, sweep_201, repeats ),
+	         Benchmark_Sweep( "List, REAL64, 201 pts", time_scale, sweep_201, repeats, binary_transfer=True ),
+	         Benchmark_Sweep( "List, REAL64, 1101 pts", time_scale, sweep_1101, repeats, binary_transfer=True ),
+	         Benchmark_Sweep( "Adaptive, REAL64, 1101 pts", time_scale, sweep_1101, repeats, binary_transfer=True, adaptive_stepping=True ),
+	         Benchmark_Sweep( "Streaming, REAL64, 201 pts", time_scale, sweep_201, repeats, binary_transfer=True, streaming=True ) ]
+
+def Print_Sweep_Benchmarks( results, time_scale ):
+	table = Table( title=f"Simulated E4980 sweeps (time scale {time_scale:g})" )
+	for column in ("Case", "Points/s", "Sweep (s)", "Program (s)", "Fetch (s)", "Parse (s)"):
+		table.add_column( column, justify="left" if column == "Case" else "right" )
+	for result in results:
+		table.add_row( result["label"], f'{result["points_per_second"]:.1f}', f'{result["sweep_time"]:.3f}',
+		               *( f'{result.get( phase, 0.0 ):.4f}' for phase in ("program", "fetch", "parse") ) )
+	print( table )
+
+
+Simulated_Device = namedtuple( "Simulated_Device", ["neg_pad", "pos_pad", "location", "side"] )
+
+class Simulated_Temperature_Controller( QtCore.QObject ):
+	# Just enough of MPL_Shared's Temperature_Controller for Measurement_Sweep, with timed pad switching and ramps
+	Pads_Selected_Changed = QtCore.pyqtSignal( tuple, bool )
+	Heater_Output_Off = QtCore.pyqtSignal()
+	Temperature_Stable = QtCore.pyqtSignal( float )
+
+	def __init__( self, time_scale, pad_switch_s=0.5, ramp_rate_K_per_s=0.1, settle_s=60.0, parent=None ):
+		super().__init__( parent )
+		self.time_scale = time_scale
+		self.pad_switch_s = pad_switch_s
+		self.ramp_rate_K_per_s = ramp_rate_K_per_s
+		self.settle_s = settle_s
+		self.temperature = 295.0
+
+	def Wait( self, seconds ):
+		time.sleep( seconds * self.time_scale )
+
+	def Set_Active_Pads( self, neg_pad, pos_pad ):
+		self.Wait( self.pad_switch_s )
+		self.Pads_Selected_Changed.emit( (neg_pad, pos_pad), False )
+
+	def Set_Temp_And_Turn_On( self, temperature ):
+		self.Wait( abs( temperature - self.temperature ) / self.ramp_rate_K_per_s + self.settle_s )
+		self.temperature = temperature
+		self.Temperature_Stable.emit( temperature )
+
+	def Turn_On( self ):
+		self.Wait( self.settle_s / 10 )
+		self.Temperature_Stable.emit( self.temperature )
+
+	def Turn_Off( self ):
+		self.Heater_Output_Off.emit()
+
+	def Make_Safe( self ):
+		pass
+
+def Run_End_To_End_Benchmark( time_scale, device_count=8, temperatures=(80.0, 120.0, 1.0) ):
+	# Needs MPL_Shared for Async_Iterator, results go to an in memory sink instead of the database
+	import tempfile
+	from CV_Measurement_Assistant import Measurement_Sweep, SQL_Write_Behind, SQL_Connection_Pool, Sweep_Spool
+
+	committed = []
+	SQL_Connection_Pool.Connect_To_SQL = lambda *args, **kargs : (None, None)
+	SQL_Connection_Pool.Shared_SQL_Pool( "benchmark" )
+	Sweep_Spool.Shared_Sweep_Spool( tempfile.mkdtemp( prefix="benchmark_spool_" ) )
+	SQL_Write_Behind.Commit_XY_Data_To_SQL = lambda *args, **kargs : committed.append( kargs )
+
+	app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication( [] )
+	cv_controller = CV_Controller( machine_type="Simulated", binary_transfer=True )
+	cv_controller.Initialize_Connection()
+	cv_controller.gpib_resource.time_scale = time_scale
+	temp_controller = Simulated_Temperature_Controller( time_scale )
+	threads = []
+	for subsystem in (cv_controller, temp_controller):
+		thread = QtCore.QThread()
+		subsystem.moveToThread( thread )
+		thread.start()
+		threads.append( thread )
+
+	devices = [ Simulated_Device( 2 * i + 1, 2 * i + 2, f"D{i}", 100 ) for i in range( device_count ) ]
+	meta_data = dict( sample_name="Benchmark", user="Benchmark", measurement_setup="Simulated" )
+	quit_early = threading.Event()
+	arguments = ( quit_early, temp_controller, cv_controller, meta_data, temperatures,
+	              (-2.0, 0.5, 0.0125, 0.0), (30E-3, 1E5), devices )
+	start = time.perf_counter()
+	def run_sweep():
+		Measurement_Sweep.Measurement_Sweep( *arguments, current_temperature=temp_controller.temperature )
+		QtCore.QMetaObject.invokeMethod( app, "quit", QtCore.Qt.QueuedConnection )
+	sweep_thread = threading.Thread( target=run_sweep )
+	sweep_thread.start()
+	app.exec_()
+	sweep_thread.join()
+	wall_time = time.perf_counter() - start
+
+	for thread in threads:
+		thread.quit()
+		thread.wait()
+	print( f"Measurement_Sweep: {len(committed)} sweeps in {wall_time:.2f} s wall time "
+	       f"({wall_time / max( 1, len(committed) ):.3f} s per sweep, time scale {time_scale:g})" )
+	return wall_time, len( committed )
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser( description="Benchmark C-V sweep throughput against a simulated E4980" )
+	parser.add_argument( "--time-scale", type=float, default=0.1, help="Simulated instrument time multiplier, 1 is real time" )
+	parser.add_argument( "--repeats", type=int, default=3, help="Sweeps timed per case" )
+	parser.add_argument( "--end-to-end", action="store_true", help="Also time a full Measurement_Sweep run (needs MPL_Shared)" )
+	args = parser.parse_args()
+
+	app = QtCore.QCoreApplication( [] )
+	Print_Sweep_Benchmarks( Run_Sweep_Benchmarks( args.time_scale, args.repeats ), args.time_scale )
+	if args.end_to_end:
+		Run_End_To_End_Benchmark( args.time_scale )
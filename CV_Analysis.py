@@ -0,0 +1,149 @@
+# Depletion analysis of C-V sweeps: 1/C^2, its bias derivative, doping profile N(W) and built-in voltage.
+# Sweeps are analyzed in NaN padded batches so thousands of stored sweeps take one pass of array operations.
+
+import configparser
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from PyQt5 import QtCore
+
+elementary_charge_C = 1.602176634E-19
+vacuum_permittivity_F_per_m = 8.8541878128E-12
+
+CV_Profile = namedtuple( "CV_Profile", ["bias_v", "inverse_c2", "d_inverse_c2_dv", "depth_m", "doping_per_m3", "built_in_v"] )
+
+
+def Device_Area_m2( side_length_um ):
+	# Pad description files give square devices by side length
+	if side_length_um is None:
+		return np.nan
+	return (float( side_length_um ) * 1E-6)**2
+
+def Stack_Sweeps( arrays ):
+	# Pads sweeps of different lengths with NaN into one (sweep, point) array
+	stacked = np.full( (len(arrays), max( [ len(array) for array in arrays ], default=0 )), np.nan )
+	for row, array in enumerate( arrays ):
+		stacked[ row, :len(array) ] = array
+	return stacked
+
+def Local_Slope( x, y, window=7 ):
+	# Savitzky-Golay style first derivative, the slope of a least squares line through a centered window around
+	# each point. Handles uneven bias steps from adaptive sweeps and NaN padding, windows shrink at the ends.
+	half = window // 2
+	x_windows = sliding_window_view( np.pad( x, ((0, 0), (half, half)), constant_values=np.nan ), window, axis=1 )
+	y_windows = sliding_window_view( np.pad( y, ((0, 0), (half, half)), constant_values=np.nan ), window, axis=1 )
+	valid = np.isfinite( x_windows ) & np.isfinite( y_windows )
+	count = valid.sum( axis=-1 )
+	with np.errstate( divide='ignore', invalid='ignore' ):
+		x_mean = np.where( valid, x_windows, 0.0 ).sum( axis=-1 ) / count
+		y_mean = np.where( valid, y_windows, 0.0 ).sum( axis=-1 ) / count
+		dx = np.where( valid, x_windows - x_mean[..., None], 0.0 )
+		dy = np.where( valid, y_windows - y_mean[..., None], 0.0 )
+		slope = (dx * dy).sum( axis=-1 ) / (dx**2).sum( axis=-1 )
+	slope[ (count < 3) | ~np.isfinite( y ) ] = np.nan
+	return slope
+
+def Analyze_Batch( bias_v, capacitance_f, area_m2, relative_permittivity, window=7 ):
+	# bias_v and capacitance_f are (sweep, point) arrays, area_m2 is one value per sweep (NaN when unknown).
+	# Returns per sweep arrays for a one sided abrupt junction.
+	permittivity = relative_permittivity * vacuum_permittivity_F_per_m
+	area_m2 = np.asarray( area_m2, dtype=float )[:, None]
+	with np.errstate( divide='ignore', invalid='ignore' ):
+		inverse_c2 = 1 / capacitance_f**2
+		d_inverse_c2_dv = Local_Slope( bias_v, inverse_c2, window )
+		doping_per_m3 = 2 / (elementary_charge_C * permittivity * area_m2**2 * np.abs( d_inverse_c2_dv ))
+		depth_m = permittivity * area_m2 / capacitance_f
+
+		# Built-in voltage is where a line through 1/C^2 over reverse bias reaches zero, all points if too few are reversed
+		valid = np.isfinite( bias_v ) & np.isfinite( inverse_c2 )
+		reverse = valid & (bias_v <= 0)
+		fit = np.where( (reverse.sum( axis=1 ) >= 3)[:, None], reverse, valid )
+		count = fit.sum( axis=1 )
+		x_mean = np.where( fit, bias_v, 0.0 ).sum( axis=1 ) / count
+		y_mean = np.where( fit, inverse_c2, 0.0 ).sum( axis=1 ) / count
+		dx = np.where( fit, bias_v - x_mean[:, None], 0.0 )
+		slope = (dx * np.where( fit, inverse_c2 - y_mean[:, None], 0.0 )).sum( axis=1 ) / (dx**2).sum( axis=1 )
+		built_in_v = x_mean - y_mean / slope
+	return inverse_c2, d_inverse_c2_dv, depth_m, doping_per_m3, built_in_v
+
+
+class CV_Analyzer:
+	# Memoizes profiles by sweep id, a sweep is only ever analyzed once however often it is plotted or exported
+	def __init__( self, configuration_file=None, relative_permittivity=11.7, window=7, max_cached_sweeps=20000 ):
+		self.relative_permittivity = relative_permittivity
+		self.window = window
+		if configuration_file is not None:
+			configuration = configparser.ConfigParser()
+			configuration.read( configuration_file )
+			self.relative_permittivity = configuration.getfloat( "CV_Analysis", "Relative_Permittivity", fallback=relative_permittivity )
+			self.window = configuration.getint( "CV_Analysis", "Derivative_Window", fallback=window )
+		self.max_cached_sweeps = max_cached_sweeps
+		self.cache = OrderedDict()
+
+	def Analyze( self, sweeps ):
+		# sweeps is a list of (sweep_id, bias_v, capacitance_f, area_m2), returns a CV_Profile for each in order
+		missing = OrderedDict( (sweep[0], sweep) for sweep in sweeps if sweep[0] not in self.cache )
+		if missing:
+			sweep_ids, bias_arrays, capacitance_arrays, areas = zip( *missing.values() )
+			bias_v = Stack_Sweeps( bias_arrays )
+			inverse_c2, d_inverse_c2_dv, depth_m, doping_per_m3, built_in_v = Analyze_Batch(
+				bias_v, Stack_Sweeps( capacitance_arrays ), [ np.nan if area is None else area for area in areas ], self.relative_permittivity, self.window )
+			for row, (sweep_id, bias_array) in enumerate( zip( sweep_ids, bias_arrays ) ):
+				length = len( bias_array )
+				self.cache[ sweep_id ] = CV_Profile( bias_v[ row, :length ], inverse_c2[ row, :length ], d_inverse_c2_dv[ row, :length ],
+				                                     depth_m[ row, :length ], doping_per_m3[ row, :length ], built_in_v[ row ] )
+		profiles = []
+		for sweep_id, *_ in sweeps:
+			self.cache.move_to_end( sweep_id )
+			profiles.append( self.cache[ sweep_id ] )
+		while len( self.cache ) > self.max_cached_sweeps:
+			self.cache.popitem( last=False )
+		return profiles
+
+
+def Load_Raw_Data( sql_conn, measurement_ids ):
+	# Reads stored sweeps from cv_raw_data with the device size from cv_measurements, sorted by bias.
+	# Assumes raw data rows reference their measurement by measurement_id, as Commit_XY_Data_To_SQL writes them.
+	from PyQt5 import QtSql
+	if not measurement_ids:
+		return []
+	query = QtSql.QSqlQuery( sql_conn )
+	query.setForwardOnly( True )
+	query.exec_( "SELECT r.measurement_id, r.voltage_v, r.capacitance_f, m.device_side_length_in_um FROM cv_raw_data r "
+	             "JOIN cv_measurements m ON m.id = r.measurement_id WHERE r.measurement_id IN ("
+	             + ",".join( str( int( measurement_id ) ) for measurement_id in measurement_ids ) + ")" )
+	rows = OrderedDict()
+	while query.next():
+		measurement_id = query.value( 0 )
+		rows.setdefault( measurement_id, ([], [], query.value( 3 )) )
+		rows[ measurement_id ][0].append( query.value( 1 ) )
+		rows[ measurement_id ][1].append( query.value( 2 ) )
+	sweeps = []
+	for measurement_id, (bias_v, capacitance_f, side_length_um) in rows.items():
+		order = np.argsort( bias_v )
+		sweeps.append( (measurement_id, np.asarray( bias_v, dtype=float )[ order ], np.asarray( capacitance_f, dtype=float )[ order ], Device_Area_m2( side_length_um )) )
+	return sweeps
+
+
+class CV_Analysis_Worker( QtCore.QObject ):
+	# Lives on its own thread, takes deviceSweepFinished_signal directly and hands profiles back to the GUI
+	profileReady_signal = QtCore.pyqtSignal( object ) # CV_Profile
+
+	def __init__( self, analyzer, parent=None ):
+		super().__init__( parent )
+		self.analyzer = analyzer
+		self.live_sweep_count = 0
+
+	@QtCore.pyqtSlot( np.ndarray, np.ndarray, float )
+	def Analyze_Sweep( self, bias_voltage_V, capacitance_F, area_m2 ):
+		# Doping and depth are NaN when the device area is unknown, as for single measurements
+		self.live_sweep_count += 1
+		profile, = self.analyzer.Analyze( [ (f"live-{self.live_sweep_count}", bias_voltage_V, capacitance_F, area_m2) ] )
+		self.profileReady_signal.emit( profile )
+
+	@QtCore.pyqtSlot( object )
+	def Analyze_Stored( self, sweeps ):
+		# sweeps as returned by Load_Raw_Data, or spool sweep ids with their arrays
+		for profile in self.analyzer.Analyze( sweeps ):
+			self.profileReady_signal.emit( profile )
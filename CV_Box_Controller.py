@@ -1,34 +1,153 @@
 # Interface for Keysight E4980 outlined in this document: https://literature.cdn.keysight.com/litweb/pdf/E4980-90210.pdf
 
-try:
-	import pyvisa as visa
-except ImportError:
-	from MPL_Shared.Install_If_Necessary import Ask_For_Install
-	Ask_For_Install( "PyVisa" )
-	import pyvisa as visa
 import numpy as np
 import time
+import configparser
+import pathlib
+from threading import Event
+from collections import namedtuple
 
 from rich import print
 from PyQt5 import QtCore
 
+from CV_Measurement_Assistant.Sweep_Result import Sweep_Result
+from CV_Measurement_Assistant.Timing_Trace import Shared_Timing_Trace
+from CV_Measurement_Assistant.Repeat_Statistics import Running_Statistics, Repeat_Summary
+from CV_Measurement_Assistant.Aperture_Calibration import Shared_Aperture_Cache, Settings_By_Speed, Relative_Noise, Calibration_Bias_Points
+
+
+def Refinement_Intervals( capacitance_f, threshold ):
+	# Marks the intervals between consecutive points that touch a point where C or 1/C^2 bends by more than
+	# threshold times the curve's range, judged by the second difference along the sweep
+	interval_count = len( capacitance_f ) - 1
+	refine = np.zeros( max( interval_count, 0 ), dtype=bool )
+	if interval_count < 2:
+		return refine
+	with np.errstate( divide='ignore', invalid='ignore' ):
+		for curve in (capacitance_f, 1 / capacitance_f**2):
+			curve_range = np.nanmax( curve ) - np.nanmin( curve )
+			if not np.isfinite( curve_range ) or curve_range == 0:
+				continue
+			bends = np.abs( np.diff( curve, 2 ) ) / curve_range > threshold
+			bends |= ~np.isfinite( np.diff( curve, 2 ) ) # Unparsable points are refined rather than trusted
+			refine[:-1] |= bends # Interval before the bending point
+			refine[1:] |= bends # and after it
+	return refine
+
+
+def Import_Visa():
+	# Deferred until the first real instrument connection, pyvisa is slow to import and the simulator does not need it
+	try:
+		import pyvisa as visa
+	except ImportError:
+		from MPL_Shared.Install_If_Necessary import Ask_For_Install
+		Ask_For_Install( "PyVisa" )
+		import pyvisa as visa
+	return visa
+
+
+def Parse_Aperture( text ):
+	# "MEDIUM,4" to ("MEDIUM", 4), blank leaves the instrument default
+	if not text or not text.strip():
+		return None
+	mode, _, averaging = text.partition( ',' )
+	return ( mode.strip().upper(), int( averaging ) if averaging.strip() else 1 )
+
+def Bias_Voltages( v_start, v_end, v_step ):
+	# Checked before any command is sent, so a bad range is reported as such instead of as a lost instrument
+	if not np.all( np.isfinite( [v_start, v_end, v_step] ) ) or v_step == 0:
+		raise ValueError( f"Bias step must be a nonzero number of Volts, got {v_step}" )
+	x_values = np.arange( v_start, v_end + v_step / 2, v_step )
+	if len( x_values ) == 0:
+		raise ValueError( f"No bias points from {v_start:g} V to {v_end:g} V in steps of {v_step:g} V, check the sweep direction" )
+	return x_values
+
+
+CV_Station = namedtuple( "CV_Station", ["name", "address", "temperature_configuration"] )
+
+def Configured_Stations( configuration_file ):
+	# Extra analyzers listed in [CV_Stations], one per line as: name = VISA address[, temperature controller configuration file]
+	configuration = configparser.ConfigParser()
+	configuration.optionxform = str # Station names keep their case
+	configuration.read( configuration_file )
+	if not configuration.has_section( "CV_Stations" ):
+		return []
+	stations = []
+	for name, value in configuration.items( "CV_Stations" ):
+		address, _, temperature_configuration = ( part.strip() for part in value.partition( ',' ) )
+		if temperature_configuration: # Relative to the configuration file listing it
+			temperature_configuration = str( pathlib.Path( configuration_file ).parent / temperature_configuration )
+		stations.append( CV_Station( name, address, temperature_configuration or None ) )
+	return stations
+
 
 class CV_Controller( QtCore.QObject ):
 	newSweepStarted_signal = QtCore.pyqtSignal()
 	dataPointGotten_signal = QtCore.pyqtSignal(float, float)
-	sweepFinished_signal = QtCore.pyqtSignal(np.ndarray, np.ndarray, np.ndarray) # bias_voltage_V, capacitance_F, Q_Data
+	sweepFinished_signal = QtCore.pyqtSignal(np.ndarray, np.ndarray, np.ndarray, float) # bias_voltage_V, capacitance_F, Q_Data, temperature_K (NaN when unknown)
+	deviceSweepFinished_signal = QtCore.pyqtSignal(np.ndarray, np.ndarray, float) # bias_voltage_V, capacitance_F, device area in m^2 (NaN when unknown)
+	cvfSweepFinished_signal = QtCore.pyqtSignal(np.ndarray, np.ndarray, np.ndarray, np.ndarray) # bias_voltage_V, ac_frequency_Hz, capacitance_F[bias, frequency], Q_Data[bias, frequency]
 
 	Device_Connected = QtCore.pyqtSignal(str,str)
 	Device_Disconnected = QtCore.pyqtSignal(str,str)
 
 	Error_signal = QtCore.pyqtSignal( str )
 
-	def __init__( self, parent=None, machine_type="Keysight" ):
+	max_list_points = 201 # Size of the E4980 list sweep table
+
+	def __init__( self, configuration_file=None, parent=None, machine_type="Keysight", binary_transfer=False, streaming=False,
+	              adaptive_stepping=False, adaptive_coarse_factor=4, adaptive_threshold=0.02, address=None, station_name=None,
+	              aperture=None, noise_target=None, calibration_repeats=8, aperture_cache_file=None,
+	              max_repeats=1, min_repeats=3, repeat_target=1E-3 ):
 		super(CV_Controller, self).__init__(parent)
+		self.address = address # VISA address, None uses the machine type's usual address
+		self.station_name = station_name # Tags results when several analyzers run at once
+		self.trace = Shared_Timing_Trace()
+		self.trace_tags = {} # Device and temperature of the sweep in progress, set by Measurement_Sweep
 		self.machine_type = machine_type
+		self.binary_transfer = binary_transfer # Fetch results as REAL64 blocks instead of ASCII text
+		self.streaming = streaming # Measure point by point, emitting each result as it arrives
+		self.adaptive_stepping = adaptive_stepping # Coarse pass first, then the requested step only where the curve bends
+		self.adaptive_coarse_factor = adaptive_coarse_factor # Coarse pass step as a multiple of the requested step
+		self.adaptive_threshold = adaptive_threshold # Second difference, as a fraction of the curve's range, that gets refined
+		self.aperture = aperture # (mode, averaging) for :APERTURE, None for the instrument default
+		self.noise_target = noise_target # Relative noise on C to calibrate the aperture for, None uses self.aperture as given
+		self.calibration_repeats = calibration_repeats
+		self.device_type = None # Calibrated apertures are remembered per device type, set by Measurement_Sweep
+		self.device_area_m2 = np.nan # Area of the device being swept, set by Measurement_Sweep and sent with each finished sweep for depth and doping
+		self.temperature_k = np.nan # Temperature of the sweep in progress, sent with each finished sweep so graphs can color by it
+		self.max_repeats = max_repeats # Sweeps averaged per single frequency sweep, 1 measures once
+		self.min_repeats = min_repeats
+		self.repeat_target = repeat_target # Repeats stop once every point's 95% confidence interval is within this fraction of its mean
+		if configuration_file is not None:
+			configuration = configparser.ConfigParser()
+			configuration.read( configuration_file )
+			self.machine_type = configuration.get( "CV_Controller", "Machine_Type", fallback=machine_type )
+			self.binary_transfer = configuration.getboolean( "CV_Controller", "Binary_Transfer", fallback=binary_transfer )
+			self.streaming = configuration.getboolean( "CV_Controller", "Streaming", fallback=streaming )
+			self.adaptive_stepping = configuration.getboolean( "CV_Controller", "Adaptive_Stepping", fallback=adaptive_stepping )
+			self.adaptive_coarse_factor = configuration.getint( "CV_Controller", "Adaptive_Coarse_Factor", fallback=adaptive_coarse_factor )
+			self.adaptive_threshold = configuration.getfloat( "CV_Controller", "Adaptive_Threshold", fallback=adaptive_threshold )
+			self.aperture = Parse_Aperture( configuration.get( "CV_Controller", "Aperture", fallback="" ) ) or aperture
+			noise_target_text = configuration.get( "CV_Controller", "Noise_Target", fallback="" ).strip()
+			self.noise_target = float( noise_target_text ) if noise_target_text else noise_target
+			self.calibration_repeats = configuration.getint( "CV_Controller", "Calibration_Repeats", fallback=calibration_repeats )
+			cache_file = configuration.get( "CV_Controller", "Aperture_Cache", fallback="" ).strip()
+			if cache_file: # Relative to the configuration file
+				aperture_cache_file = pathlib.Path( configuration_file ).parent / cache_file
+			self.max_repeats = configuration.getint( "CV_Controller", "Max_Repeats", fallback=max_repeats )
+			self.min_repeats = configuration.getint( "CV_Controller", "Min_Repeats", fallback=min_repeats )
+			self.repeat_target = configuration.getfloat( "CV_Controller", "Repeat_Target", fallback=repeat_target )
+		self.aperture_cache = Shared_Aperture_Cache( aperture_cache_file )
+		self.stop_requested = Event()
+		self.last_result = None # Sweep_Result behind the most recent sweepFinished_signal
+		self.last_frequency_results = [] # One Sweep_Result per frequency behind the most recent cvfSweepFinished_signal
+		self.last_repeat_summary = None # Repeat_Summary of the most recent sweep when it was repeated
 		self.gpib_resource = None
+		self.programmed_state = None # Settings last sent to the instrument, None when its state is unknown
 		self.debug = 1
 		self.Voltage_Sweep_ = self.Voltage_Sweep_Default
+		self.Voltage_Frequency_Sweep_ = self.Check_Connection_Then_Run( self.Voltage_Frequency_Sweep_Keysight )
 
 	def thread_start( self ):
 		self.Initialize_Connection()
@@ -39,6 +158,10 @@ class CV_Controller( QtCore.QObject ):
 	def Make_Safe( self ):
 		pass
 
+	def Stop_Sweep( self ):
+		# Safe to call from any thread, the running sweep returns what it has measured so far
+		self.stop_requested.set()
+
 	def Check_Connection_Then_Run( self, func ):
 		def newfunc( *args, **kargs ):
 			if self.gpib_resource == None:
@@ -47,8 +170,12 @@ class CV_Controller( QtCore.QObject ):
 			try:
 				# print( f"Check_Connection_Then_Run = {func}" )
 				return func( *args, **kargs )
+			except ValueError as e: # Sweep settings the instrument was never sent, the connection is fine
+				self.Error_signal.emit( "Invalid sweep settings: " + str(e) )
+				return
 			except Exception as e:
-				self.Device_Disconnected.emit( self.machine_type, self.supported_devices[ self.machine_type ][0] )
+				self.Invalidate_Instrument_State()
+				self.Device_Disconnected.emit( self.machine_type, self.Resource_Address() )
 				self.Error_signal.emit( "CV controller not connected: " + str(e) )
 				return
 
@@ -56,21 +183,27 @@ class CV_Controller( QtCore.QObject ):
 		return newfunc
 
 	def Initialize_Connection( self ):
+		self.Invalidate_Instrument_State()
 		if self.gpib_resource != None:
 			self.gpib_resource.close()
 			self.gpib_resource = None
 		#print( self.resource_manager.list_resources() ) # List available machines to connect to
 
-		self.supported_devices = { "Keysight"     : ( 'GPIB0::17::INSTR',                       (self.Voltage_Sweep_Keysight,) ),
-								   "Keithley USB" : ( 'USB0::2391::2313::MY12345678::0::INSTR', (self.Voltage_Sweep_Keysight,) ) }
+		self.supported_devices = { "Keysight"     : ( 'GPIB0::17::INSTR',                       (self.Voltage_Sweep_Keysight, self.Voltage_Frequency_Sweep_Keysight) ),
+								   "Keithley USB" : ( 'USB0::2391::2313::MY12345678::0::INSTR', (self.Voltage_Sweep_Keysight, self.Voltage_Frequency_Sweep_Keysight) ),
+								   "Simulated"    : ( 'SIM0::E4980::INSTR',                     (self.Voltage_Sweep_Keysight, self.Voltage_Frequency_Sweep_Keysight) ) }
 		try:
 			lambda *args, **kargs : self.Check_Connection()
-			address = self.supported_devices[ self.machine_type ][0]
-			(self.Voltage_Sweep_,) = ( self.Check_Connection_Then_Run(x) for x in self.supported_devices[ self.machine_type ][1] )
-			self.resource_manager = visa.ResourceManager()
+			address = self.Resource_Address()
+			(self.Voltage_Sweep_, self.Voltage_Frequency_Sweep_) = ( self.Check_Connection_Then_Run(x) for x in self.supported_devices[ self.machine_type ][1] )
+			if self.machine_type == "Simulated":
+				from CV_Measurement_Assistant.Simulated_E4980 import Simulated_Resource_Manager
+				self.resource_manager = Simulated_Resource_Manager()
+			else:
+				self.resource_manager = Import_Visa().ResourceManager()
 			self.gpib_resource = self.resource_manager.open_resource(address)
 			self.gpib_resource.clear()
-			self.Device_Connected.emit( self.machine_type, self.supported_devices[ self.machine_type ][0] )
+			self.Device_Connected.emit( self.machine_type, self.Resource_Address() )
 			self.is_connected = True
 			return self.gpib_resource
 		except Exception as e:
@@ -82,16 +215,33 @@ class CV_Controller( QtCore.QObject ):
 
 	def Close_Connection( self ):
 		# print( f"Closing connection with CV Controller {self.supported_devices[ self.machine_type ][1]}" )
+		self.Invalidate_Instrument_State()
 		if self.gpib_resource == None:
 			return
 		self.gpib_resource.close()
 		self.gpib_resource = None
 
-		self.Device_Disconnected.emit( self.machine_type, self.supported_devices[ self.machine_type ][0] )
+		self.Device_Disconnected.emit( self.machine_type, self.Resource_Address() )
+
+	def Resource_Address( self ):
+		return self.address or self.supported_devices[ self.machine_type ][0]
+
+	def Invalidate_Instrument_State( self ):
+		self.programmed_state = None # Forces a full reset and reconfiguration on the next sweep
+
+	def Program_Setting( self, command, value ):
+		# Skip the write if the instrument already holds this value
+		if self.programmed_state.get( command ) == value:
+			return
+		self.gpib_resource.write( f"{command} {value}" )
+		self.programmed_state[ command ] = value
 
 	def Voltage_Sweep( self, v_start, v_end, v_step, ac_voltage, ac_frequency, step_delay=0.5 ):
 		return self.Voltage_Sweep_( v_start, v_end, v_step, ac_voltage, ac_frequency, step_delay )
 
+	def Voltage_Frequency_Sweep( self, v_start, v_end, v_step, ac_voltage, ac_frequencies, step_delay=0.5 ):
+		return self.Voltage_Frequency_Sweep_( v_start, v_end, v_step, ac_voltage, ac_frequencies, step_delay )
+
 	def Voltage_Sweep_Default( self, v_start, v_end, v_step, ac_voltage, ac_frequency, step_delay ):
 		print( self.Voltage_Sweep )
 		# Pretend data to test graphing
@@ -102,83 +252,254 @@ class CV_Controller( QtCore.QObject ):
 		for index, x in enumerate(x_values):
 			self.dataPointGotten_signal.emit( x, x * 100E-3 * self.debug )
 			time.sleep( 0.01 )
-		self.sweepFinished_signal.emit( x_values, x_values )
+		self.Finish_Sweep( Sweep_Result.From_Arrays( x_values, x_values * 100E-3 * self.debug, np.zeros_like( x_values ), time_s=time.time() ) )
 		self.debug += 1
 
 
 	def Voltage_Sweep_Keysight( self, v_start, v_end, v_step, ac_voltage, ac_frequency, step_delay ):
-		M = self.gpib_resource
-
-		empty_data_point = 9E37 # = 9.9E37 or -9.9E37 means np.nan
+		x_values = Bias_Voltages( v_start, v_end, v_step ) # Before the graph starts a plot for it
 		self.newSweepStarted_signal.emit()
+		self.stop_requested.clear()
 
-		x_values = np.arange( v_start, v_end + v_step / 2, v_step )
-		bias_list = ','.join([ f'{x:E}' for x in x_values ])
-		assert len(x_values) <= 201, "Number of voltage points to sweep must be no more than 201"
 		assert ac_voltage <= 20 and ac_voltage >= 0, "ac_voltage must be between 0 and 20 Volts"
 		assert ac_frequency <= 2E6 and ac_frequency >= 20, "ac_voltage must be between 20Hz and 2MHz"
 		assert step_delay <= 999 and step_delay >= 0, "step_delay must be between 0 and 999 seconds"
 
-		M.write( "*RST;*CLS" ) # Reset everything to known good state (factory defaults)
-		M.write( ":DISPLAY:CCLEAR" ) # Clears any lingering error messages
-		M.write( ":TRIGGER:SOURCE BUS" ) # Sets trigger source to "GPIB/LAN/USB"
-		M.write( ":FORMAT ASCII" ) # Sets the transfer mode to ASCII
-		M.write( ":FUNCTION:IMPEDANCE:TYPE CPQ" )
-		M.write( f":FREQUENCY {ac_frequency:e}" ) # Sets ac voltage frequency (in Hz) to use during the measurements
-		M.write( f":VOLTAGE:LEVEL {ac_voltage:e}" ) # Sets ac voltage frequency (in Hz) to use during the measurements
-		M.write( ":AMPLitude:ALC ON" ) # Sets device to 4 point probe mode
-		M.write( f":TRIGGER:DELAY {step_delay:e}" ) # Sets delay (in seconds) between successive measurements (not including settling delay)
-		#M.write( ":APERTURE LONG,5" ) # Sets the time window to capture a measurement
+		with self.trace.Span( "program", **self.trace_tags ):
+			self.Configure_Keysight( ac_voltage, ac_frequency, step_delay )
+		self.Select_Aperture( x_values, ac_frequency )
+		if self.streaming:
+			with self.trace.Span( "streaming sweep", points=len( x_values ), **self.trace_tags ):
+				result = self.Streaming_Sweep_Keysight( x_values, step_delay )
+		elif self.adaptive_stepping:
+			result = self.Adaptive_Sweep_Keysight( x_values )
+		else:
+			result = self.List_Sweep_Keysight( x_values )
+		self.last_repeat_summary = None
+		if self.max_repeats > 1 and len( result ) > 0 and not self.stop_requested.is_set():
+			self.last_repeat_summary = self.Repeat_Sweep( result )
+			result = self.last_repeat_summary.mean
+		self.Finish_Sweep( result )
+		# return ( x_values, np.array(test) )
+
+	def Finish_Sweep( self, result ):
+		self.last_result = result
+		self.sweepFinished_signal.emit( result.bias_v, result.capacitance_f, result.q, float( self.temperature_k ) )
+		self.deviceSweepFinished_signal.emit( result.bias_v, result.capacitance_f, float( self.device_area_m2 ) )
+
+	def Voltage_Frequency_Sweep_Keysight( self, v_start, v_end, v_step, ac_voltage, ac_frequencies, step_delay ):
+		x_values = Bias_Voltages( v_start, v_end, v_step ) # Before the graph starts a plot for it
+		self.newSweepStarted_signal.emit()
+		self.stop_requested.clear()
+
+		ac_frequencies = np.atleast_1d( np.asarray( ac_frequencies, dtype=float ) )
+		assert ac_voltage <= 20 and ac_voltage >= 0, "ac_voltage must be between 0 and 20 Volts"
+		assert np.all( ac_frequencies <= 2E6 ) and np.all( ac_frequencies >= 20 ), "ac_frequencies must be between 20Hz and 2MHz"
+		assert step_delay <= 999 and step_delay >= 0, "step_delay must be between 0 and 999 seconds"
+
+		# The E4980 list table holds a single sweep parameter, so the bias list stays programmed and only
+		# :FREQUENCY changes between passes, with no reset or reconfiguration in between
+		Capacitance = np.full( (len(x_values), len(ac_frequencies)), np.nan )
+		Q_Data = np.full( (len(x_values), len(ac_frequencies)), np.nan )
+		self.last_frequency_results = []
+		for frequency_index, ac_frequency in enumerate( ac_frequencies ):
+			if self.stop_requested.is_set():
+				break
+			with self.trace.Span( "program", frequency=ac_frequency, **self.trace_tags ):
+				self.Configure_Keysight( ac_voltage, ac_frequency, step_delay )
+			self.Select_Aperture( x_values, ac_frequency )
+			if self.streaming:
+				with self.trace.Span( "streaming sweep", points=len( x_values ), frequency=ac_frequency, **self.trace_tags ):
+					result = self.Streaming_Sweep_Keysight( x_values, step_delay )
+			else:
+				result = self.List_Sweep_Keysight( x_values )
+			Capacitance[ :len(result), frequency_index ] = result.capacitance_f
+			Q_Data[ :len(result), frequency_index ] = result.q
+			self.last_frequency_results.append( result )
+		self.cvfSweepFinished_signal.emit( x_values, ac_frequencies, Capacitance, Q_Data )
+
+	def Configure_Keysight( self, ac_voltage, ac_frequency, step_delay ):
+		M = self.gpib_resource
+		if self.programmed_state is None:
+			M.write( "*RST;*CLS" ) # Reset everything to known good state (factory defaults)
+			M.write( ":DISPLAY:CCLEAR" ) # Clears any lingering error messages
+			self.programmed_state = {}
+		# Only settings that changed since the last sweep are sent
+		self.Program_Setting( ":TRIGGER:SOURCE", "BUS" ) # Sets trigger source to "GPIB/LAN/USB"
+		if self.binary_transfer:
+			self.Program_Setting( ":FORMAT", "REAL" ) # Sets the transfer mode to 64 bit binary (big endian by default)
+		else:
+			self.Program_Setting( ":FORMAT", "ASCII" ) # Sets the transfer mode to ASCII
+		self.Program_Setting( ":FUNCTION:IMPEDANCE:TYPE", "CPQ" )
+		self.Program_Setting( ":FREQUENCY", f"{ac_frequency:e}" ) # Sets ac voltage frequency (in Hz) to use during the measurements
+		self.Program_Setting( ":VOLTAGE:LEVEL", f"{ac_voltage:e}" ) # Sets ac voltage frequency (in Hz) to use during the measurements
+		self.Program_Setting( ":AMPLitude:ALC", "ON" ) # Sets device to 4 point probe mode
+		self.Program_Setting( ":TRIGGER:DELAY", f"{step_delay:e}" ) # Sets delay (in seconds) between successive measurements (not including settling delay)
+		self.Program_Aperture() # Sets the time window to capture a measurement and the averaging rate
 		#M.write( ":OUTPUT:DC:ISOLATION ON" ) # Enables DC Isolation
 		#M.write( ":AMPLITUDE:ALC ON" ) # Turns on automatic leveling control for holding the requested voltage
 		#M.write( f':DISPLAY:LINE "{message}"' ) # Displays message on the LCD screen, can be no longer than 30 characters
 		#timestr = time.strftime("%Y%m%d-%H%M%S")
-		M.write( ":LIST:MODE SEQUENCE" ) # Sets the list sweep mode to sequence mode, when triggered once, the device is measured at all sweep points.
+
+	def Program_Aperture( self ):
+		if self.aperture is not None:
+			mode, averaging = self.aperture
+			self.Program_Setting( ":APERTURE", f"{mode},{averaging}" )
+
+	def Select_Aperture( self, x_values, ac_frequency ):
+		# With a noise target, use the aperture chosen for this device type and frequency, calibrating it the first time
+		if self.noise_target is None or len( x_values ) == 0:
+			return
+		device_type = self.device_type or "unknown device"
+		setting = self.aperture_cache.Get( device_type, ac_frequency )
+		if setting is None:
+			with self.trace.Span( "aperture calibration", frequency=ac_frequency, **self.trace_tags ):
+				setting = self.Calibrate_Aperture( x_values, ac_frequency )
+			if setting is None: # Stopped partway, calibrate again next time
+				return
+			self.aperture_cache.Set( device_type, ac_frequency, setting )
+		self.aperture = setting
+		self.Program_Aperture()
+
+	def Calibrate_Aperture( self, x_values, ac_frequency ):
+		# Measures a few biases calibration_repeats times at each setting, fastest first, and returns the first setting
+		# whose relative noise on C meets noise_target, or the quietest one if none does
+		bias_points = Calibration_Bias_Points( x_values )
+		repeated_points = np.repeat( bias_points, self.calibration_repeats ) # Repeats of a bias are consecutive, so it only settles once
+		noise_by_setting = {}
+		for setting in Settings_By_Speed( ac_frequency ):
+			self.aperture = setting
+			self.Program_Aperture()
+			result = self.List_Sweep_Keysight( repeated_points )
+			if self.stop_requested.is_set() or len( result ) < len( repeated_points ):
+				return None
+			noise_by_setting[ setting ] = Relative_Noise( result.capacitance_f.reshape( len(bias_points), self.calibration_repeats ).T )
+			if noise_by_setting[ setting ] <= self.noise_target:
+				break
+		if noise_by_setting[ setting ] > self.noise_target:
+			print( f"[yellow]No aperture reaches relative noise {self.noise_target:.1e}, using the quietest[/yellow]" )
+			setting = min( noise_by_setting, key=noise_by_setting.get )
+		print( f"Aperture {setting[0]},{setting[1]} for {self.device_type or 'unknown device'} at {ac_frequency:g} Hz, relative noise {noise_by_setting[ setting ]:.1e} "
+		       "(" + ", ".join( f"{mode},{averaging}: {noise:.1e}" for (mode, averaging), noise in noise_by_setting.items() ) + ")" )
+		return setting
+
+	def List_Sweep_Keysight( self, x_values ):
+		M = self.gpib_resource
+		# Sweeps longer than the list table are run as consecutive segments, format every bias list up front
+		segments = [ x_values[i:i + self.max_list_points] for i in range( 0, len(x_values), self.max_list_points ) ]
+		bias_lists = [ ','.join([ f'{x:E}' for x in segment ]) for segment in segments ]
+
+		self.Program_Setting( ":LIST:MODE", "SEQUENCE" ) # Sets the list sweep mode to sequence mode, when triggered once, the device is measured at all sweep points.
 		#bias_list = ','.join([ f'{float(x):E}' for x in np.linspace( 1E-3, 10E-3, 10 )])
-		M.write( ":LIST:BIAS:VOLTAGE " + bias_list ) # Sets voltages (in Volts) to sweep through
+		self.Program_Setting( ":LIST:BIAS:VOLTAGE", bias_lists[0] ) # Sets voltages (in Volts) to sweep through
 		#frequency_list = ','.join([ f'{float(x):E}' for x in range(1000, 10000+1, 1000) ])
 		#M.write( ":LIST:FREQUENCY " + frequency_list ) # Sets voltages (in Volts) to sweep through
 		# ac_voltages_list = ','.join( ['10E-3'] * len(bias_list) )
 		# M.write( ":LIST:VOLTAGE " + ac_voltages_list ) # Sets voltages (in Volts) to sweep through
-		M.write( ":DISPLAY:PAGE LIST" ) # Sets displayed page to <LIST SWEEP DISPLAY>
-		# M.write( ":DISPLAY:PAGE MEASUREMENT" ) # Sets displayed page to <LIST SWEEP DISPLAY>
+		self.Program_Setting( ":DISPLAY:PAGE", "LIST" ) # Sets displayed page to <LIST SWEEP DISPLAY>
 		# #for i in range( 1, len(bias_list) + 2 ):
 		#	M.write( f"LIST:BAND{i} A,1E-4,2E-4" ) # Begins the measurement sweep
-		#M.write( f":MEMORY:DIM DBUF, {1}" ) # Clears data buffer memory and sets the data buffer memory's size
-		#M.write( f":MEMORY:DIM DBUF, {len(x_values)}" ) # Clears data buffer memory and sets the data buffer memory's size
-		#M.write( ":MEMORY:CLEAR DBUF" ) # Clears the data buffer memory and disables it from storing measurement data
-		#M.write( ":MEMORY:FILL DBUF" ) # Enables the data buffer memory to store measurement data
-		#M.write( ":APERTURE LONG,5" ) # Sets the measurement time mode and the averaging rate
 		M.write( ":BIAS:STATE ON" )
-		M.write( ":INITIATE:CONTINUOUS ON" ) # Prepares instrument for the measurement sweep
+		self.Program_Setting( ":INITIATE:CONTINUOUS", "ON" ) # Prepares instrument for the measurement sweep
 		#M.write( ":INITIATE:IMMEDIATE" ) # Prepares instrument for the measurement sweep
 		M.write( ":TRIGGER:IMMEDIATE" ) # Begins the measurement sweep
-		#M.write( ":MEMORY:READ? DBUF" ) # Begin reading the data
-		#results = []
-		#for index, x in enumerate(x_values):
-		#	data = M.read()
-		#	#print( data )
-		#	results.append( float(data) )
-		#	self.dataPointGotten_signal.emit( x, float(data) )
-		#	if index % 10 == 0:
-		#		QtCore.QCoreApplication.processEvents()
-		#		if self.stop_measurement_early == True:
-		#			self.stop_measurement_early = False
-		#			break
 		M.write( ":SYSTEM:BEEPER:TONE 1" ) # Makes a beep (1 - 5)
 		M.write( ":SYSTEM:BEEPER:IMMEDIATE" ) # Makes a beep (1 - 5)
-		M.timeout = 120000 # The measurement may take up to 120 seconds
-		results = M.query_ascii_values(":FETCH:IMPEDANCE?", container=np.array)
+		M.timeout = 120000 # The measurement may take up to 120 seconds per segment
+		segment_results = []
+		for segment_index in range( len(segments) ):
+			with self.trace.Span( "fetch", points=len( segments[segment_index] ), **self.trace_tags ): # Includes the instrument measuring the segment
+				results = self.Fetch_Impedance()
+			last_segment = segment_index + 1 == len(segments) or self.stop_requested.is_set()
+			if not last_segment:
+				# Start the next segment before parsing this one so the instrument measures while we parse
+				self.Program_Setting( ":LIST:BIAS:VOLTAGE", bias_lists[segment_index + 1] )
+				M.write( ":TRIGGER:IMMEDIATE" )
+			with self.trace.Span( "parse", points=len( segments[segment_index] ), **self.trace_tags ):
+				segment_results.append( self.Parse_Impedance( segments[segment_index], results ) )
+			if last_segment:
+				break
 		M.write( ":BIAS:STATE OFF" )
-		#results = M.query_ascii_values(":MEMORY:READ? DBUF", container=np.array)
-		by_measurement = np.reshape( results, (len(results)//4,4) )
-		Capacitance = [(x[0] if (x[0] < empty_data_point and x[0] > -empty_data_point) else np.nan) for x in by_measurement]
-		Q_Data = [(x[1] if (x[1] < empty_data_point and x[1] > -empty_data_point) else np.nan) for x in by_measurement]
-		# M.write( ":MEMORY:CLEAR DBUF" ) # Clears the data buffer memory and disables it from storing measurement data
-		#results = M.read()
-		self.sweepFinished_signal.emit( x_values, np.array(Capacitance), np.array(Q_Data) )
-		# return ( x_values, np.array(test) )
+		return Sweep_Result.Concatenate( segment_results )
+
+	def Adaptive_Sweep_Keysight( self, x_values ):
+		# x_values is the full resolution grid, a coarse subset of it is measured first and the rest of the grid is
+		# only measured between coarse points where C or 1/C^2 curves, the depletion edge rather than the flat ends
+		coarse_index = np.unique( np.append( np.arange( 0, len(x_values), self.adaptive_coarse_factor ), len(x_values) - 1 ) )
+		coarse = self.List_Sweep_Keysight( x_values[ coarse_index ] )
+		if self.stop_requested.is_set() or len( coarse ) < len( coarse_index ):
+			return coarse
+
+		refine_interval = Refinement_Intervals( coarse.capacitance_f, self.adaptive_threshold )
+		fine_index = np.concatenate( [ np.arange( start + 1, end ) for start, end in zip( coarse_index[:-1][ refine_interval ], coarse_index[1:][ refine_interval ] ) ] + [ np.empty( 0, dtype=int ) ] )
+		if len( fine_index ) == 0:
+			return coarse
+		fine = self.List_Sweep_Keysight( x_values[ fine_index ] )
 
+		# Merge both passes into one sweep in the requested direction
+		merged = np.concatenate( (coarse.points, fine.points) )
+		direction = 1.0 if x_values[-1] >= x_values[0] else -1.0
+		return Sweep_Result( merged[ np.argsort( direction * merged["bias_v"], kind="stable" ) ] )
+
+	def Repeat_Sweep( self, first_result ):
+		# Re-measures the first sweep's biases as list sweeps, so adaptive and streaming sweeps repeat on the grid they
+		# chose, until every point's mean is known to repeat_target or max_repeats sweeps are taken
+		bias_v = np.array( first_result.bias_v )
+		capacitance = Running_Statistics( len( bias_v ) )
+		q = Running_Statistics( len( bias_v ) )
+		capacitance.Add( first_result.capacitance_f )
+		q.Add( first_result.q )
+		sweeps = 1
+		while sweeps < self.max_repeats and not capacitance.Is_Converged( self.repeat_target, self.min_repeats ):
+			with self.trace.Span( "repeat", repeat=sweeps, **self.trace_tags ):
+				result = self.List_Sweep_Keysight( bias_v )
+			if self.stop_requested.is_set() or len( result ) < len( bias_v ): # A stopped repeat only holds partial data
+				break
+			capacitance.Add( result.capacitance_f )
+			q.Add( result.q )
+			sweeps += 1
+		print( f"Averaged {sweeps} sweeps, worst 95% confidence interval {np.nanmax( capacitance.Relative_Half_Width() ):.1e} of C" )
+		time_s = time.time()
+		return Repeat_Summary( mean=Sweep_Result.From_Arrays( bias_v, capacitance.Mean(), q.Mean(), status=np.where( capacitance.count > 0, 0, -1 ), time_s=time_s ),
+		                       std=Sweep_Result.From_Arrays( bias_v, capacitance.Std(), q.Std(), status=np.where( capacitance.count > 1, 0, -1 ), time_s=time_s ),
+		                       count=capacitance.count, sweeps=sweeps )
+
+	def Streaming_Sweep_Keysight( self, x_values, step_delay ):
+		M = self.gpib_resource
+		# Each bias point is triggered and fetched on its own so results arrive while the sweep runs
+		self.Program_Setting( ":DISPLAY:PAGE", "MEASUREMENT" ) # Leaves list sweep mode, each trigger measures once at the present bias
+		self.Program_Setting( ":INITIATE:CONTINUOUS", "ON" )
+		M.write( ":BIAS:STATE ON" )
+		M.timeout = 10000 + 1000 * step_delay # Only a single point is waited on at a time
+		result = Sweep_Result.From_Arrays( x_values, np.nan, np.nan, status=-1 )
+		points_measured = 0
+		for index, x in enumerate( x_values ):
+			if self.stop_requested.is_set():
+				break
+			self.Program_Setting( ":BIAS:VOLTAGE", f"{x:E}" )
+			M.write( ":TRIGGER:IMMEDIATE" )
+			result.points[ index ] = self.Parse_Impedance( x_values[index:index + 1], self.Fetch_Impedance() ).points[ 0 ]
+			points_measured = index + 1
+			self.dataPointGotten_signal.emit( x, result.capacitance_f[ index ] )
+		M.write( ":BIAS:STATE OFF" )
+		return Sweep_Result( result.points[:points_measured] )
+
+	def Parse_Impedance( self, x_values, results ):
+		empty_data_point = 9E37 # = 9.9E37 or -9.9E37 means np.nan
+		# Data A, data B, status, then a comparator result on the list sweep page, or a bin number on the measurement page
+		# only when the comparator is on, so the field count comes from the number of points asked for
+		by_measurement = np.reshape( results, (len( x_values ), -1) )
+		values = by_measurement[:, :2]
+		values = np.where( np.abs( values ) < empty_data_point, values, np.nan )
+		return Sweep_Result.From_Arrays( x_values, values[:, 0], values[:, 1], status=by_measurement[:, 2], time_s=time.time() )
+
+	def Fetch_Impedance( self ):
+		M = self.gpib_resource
+		if self.binary_transfer:
+			# Block is read straight into a float64 buffer, skipping all text parsing
+			return M.query_binary_values( ":FETCH:IMPEDANCE?", datatype='d', is_big_endian=True, container=np.array )
+		else:
+			return M.query_ascii_values( ":FETCH:IMPEDANCE?", container=np.array )
 
 
 if __name__ == "__main__":
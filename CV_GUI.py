@@ -6,11 +6,10 @@ if __name__ == "__main__": # This allows running this module by running this scr
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtWidgets import QFileDialog
-try:
-	from PyQt5 import uic
-except ImportError:
-	import sip
 import sys
+import hashlib
+import functools
+import pathlib
 
 import numpy as np
 import time
@@ -18,11 +17,17 @@ from threading import Event
 
 from MPL_Shared.Temperature_Controller import Temperature_Controller
 from MPL_Shared.Temperature_Controller_Settings import TemperatureControllerSettingsWindow
-from MPL_Shared.SQL_Controller import Commit_XY_Data_To_SQL, Connect_To_SQL
-from MPL_Shared.Async_Iterator import Async_Iterator, Run_Async
+from MPL_Shared.SQL_Controller import Commit_XY_Data_To_SQL
 from MPL_Shared.Saveable_Session import Saveable_Session
-from CV_Measurement_Assistant.CV_Box_Controller import CV_Controller
-from CV_Measurement_Assistant.Measurement_Loop import Measurement_Loop
+from CV_Measurement_Assistant.CV_Box_Controller import CV_Controller, Configured_Stations
+from CV_Measurement_Assistant.SQL_Connection_Pool import Shared_SQL_Pool
+from CV_Measurement_Assistant.Sweep_Spool import Shared_Sweep_Spool
+from CV_Measurement_Assistant.Timing_Trace import Shared_Timing_Trace
+from CV_Measurement_Assistant.Export_Data import Export_Sweeps
+from CV_Measurement_Assistant.CV_Analysis import CV_Analyzer, CV_Analysis_Worker
+from CV_Measurement_Assistant.Live_Graph import Live_Graph
+from CV_Measurement_Assistant.Sweep_Cache import Sweep_Cache_Worker
+from CV_Measurement_Assistant.Measurement_Sweep import Multi_Station_Sweep, Completed_Sweep_Count
 
 from MPL_Shared.Pad_Description_File import Get_Device_Description_File
 from MPL_Shared.GUI_Tools import Popup_Error, Popup_Yes_Or_No, resource_path, Measurement_Sweep_Runner
@@ -33,12 +38,34 @@ from rich import print
 __version__ = '2.00'
 
 
-Ui_MainWindow, QtBaseClass = uic.loadUiType( resource_path("CV_GUI.ui") ) # GUI layout file.
+def Load_Ui_MainWindow():
+	# CV_GUI_ui is generated from CV_GUI.ui by Compile_UI, importing it skips parsing the .ui file at startup.
+	# It is only trusted while it was generated from the .ui file as it is now, otherwise the .ui file is parsed.
+	ui_file = pathlib.Path( resource_path( "CV_GUI.ui" ) )
+	try:
+		from CV_Measurement_Assistant import CV_GUI_ui
+	except ImportError:
+		CV_GUI_ui = None
+	if CV_GUI_ui is not None and (not ui_file.exists() or hashlib.sha256( ui_file.read_bytes() ).hexdigest() == CV_GUI_ui.ui_sha256):
+		return CV_GUI_ui.Ui_Form
+	print( "CV_GUI_ui is missing or out of date, run Compile_UI to speed up startup" )
+	from PyQt5 import uic
+	return uic.loadUiType( str( ui_file ) )[0]
+
+Ui_MainWindow = Load_Ui_MainWindow() # GUI layout file.
+
+def Float_Or_None( text ):
+	try:
+		return float( text )
+	except ValueError:
+		return None
 
 
 class CV_Measurement_Assistant_App( QtWidgets.QWidget, Ui_MainWindow, Saveable_Session, Threaded_Subsystems ):
 
 	measurementRequested_signal = QtCore.pyqtSignal(float, float, float, float, float, float)
+	cvfMeasurementRequested_signal = QtCore.pyqtSignal(float, float, float, float, object, float)
+	storedSweepsRequested_signal = QtCore.pyqtSignal(str, float)
 
 	def __init__(self, parent=None, root_window=None):
 		QtWidgets.QWidget.__init__(self, parent)
@@ -64,23 +91,55 @@ class CV_Measurement_Assistant_App( QtWidgets.QWidget, Ui_MainWindow, Saveable_S
 			self.quit_early.set()
 			self.measurement.wait()
 		self.graph.close()
+		self.doping_graph.close()
+		self.analysis_thread.quit()
+		self.analysis_thread.wait()
 		Threaded_Subsystems.closeEvent(self, event)
 		QtWidgets.QWidget.closeEvent(self, event)
 
 	def Init_Subsystems( self ):
-		self.sql_type, self.sql_conn = Connect_To_SQL( resource_path( "configuration.ini" ), config_error_popup=Popup_Yes_Or_No )
+		self.sql_pool = Shared_SQL_Pool( resource_path( "configuration.ini" ) )
+		self.sql_pool.Get_Connection( config_error_popup=Popup_Yes_Or_No ) # Connect up front so configuration problems show at startup
+		self.session_spool_start = len( Shared_Sweep_Spool( resource_path( "Sweep Spool" ) ).Entries() ) # Sweeps spooled before this session are not exported
+		self.session_sweeps = [] # Single measurements as (meta_data, Sweep_Result), measurement sweeps are read back from the spool
+		Shared_Timing_Trace( resource_path( "Timing Traces" ) ) # Each measurement sweep writes its phase timings here
 		self.config_window = TemperatureControllerSettingsWindow()
 		self.measurement = None
 
 		self.quit_early = Event()
 		status_layout = self.connectionsStatusDisplay_widget.layout()
+		# Extra analyzers from [CV_Stations] with their own dewar run each measurement sweep alongside the primary one
+		station_subsystems = []
+		for station in Configured_Stations( resource_path( "configuration.ini" ) ):
+			if station.temperature_configuration is None:
+				print( f"[red]Station {station.name} has no temperature controller configuration, skipping it[/red]" )
+				continue
+			station_subsystems += [ CV_Controller( resource_path( "configuration.ini" ), address=station.address, station_name=station.name ),
+			                        Temperature_Controller( station.temperature_configuration ) ]
 		subsystems = self.Make_Subsystems( self, status_layout,
-		                                   CV_Controller(),
-		                                   Temperature_Controller( resource_path( "configuration.ini" ) ) )
-		self.cv_controller, self.temp_controller = subsystems
+		                                   CV_Controller( resource_path( "configuration.ini" ) ),
+		                                   Temperature_Controller( resource_path( "configuration.ini" ) ),
+		                                   *station_subsystems )
+		self.cv_controller, self.temp_controller = subsystems[:2]
+		self.stations = list( zip( subsystems[2::2], subsystems[3::2] ) ) # (cv_controller, temp_controller) per extra station
+
+		# Derived curves are computed off the GUI thread, the GUI only plots them
+		self.analysis_thread = QtCore.QThread( self )
+		self.analysis_worker = CV_Analysis_Worker( CV_Analyzer( resource_path( "configuration.ini" ) ) )
+		self.analysis_worker.moveToThread( self.analysis_thread )
+		# Stored sweeps are looked up on the same thread, filling the local cache from the database never blocks the GUI
+		self.sweep_cache_worker = Sweep_Cache_Worker( resource_path( "sweep_cache.sqlite" ), self.sql_pool.Get_Connection, Shared_Sweep_Spool() )
+		self.sweep_cache_worker.moveToThread( self.analysis_thread )
+		self.analysis_thread.start()
 
 
 		self.graph.set_labels( title="C-V", x_label="Voltage (V)", y_label="Capacitance (C)" )
+		self.graph.overlay_mode = True # Finished sweeps join one LineCollection, so redraws stay flat over a long run
+		# Doping against depth has its own x axis, so it gets its own window, shown once a sweep of known area is analyzed
+		self.doping_graph = Live_Graph()
+		self.doping_graph.setWindowTitle( "Doping Profile" )
+		self.doping_graph.set_labels( title="Doping profile", x_label="Depletion depth (um)", y_label="Doping (cm$^{-3}$)" )
+		self.doping_graph.ax.set_yscale( "log" )
 
 	def Open_Config_Window( self ):
 		self.config_window.show()
@@ -91,20 +150,41 @@ class CV_Measurement_Assistant_App( QtWidgets.QWidget, Ui_MainWindow, Saveable_S
 		self.Stop_Measurement() # Initializes Measurement Sweep Button
 
 		#self.establishComms_pushButton.clicked.connect( self.Establish_Comms )
-		self.takeMeasurement_pushButton.clicked.connect( self.Take_Single_Measurement )
+		self.Single_Measurement_Running( False ) # Initializes Single Measurement Button
 		self.outputToFile_pushButton.clicked.connect( self.Save_Data_To_File )
 		self.saveToDatabase_pushButton.clicked.connect( self.Save_Data_To_Database )
 		self.clearGraph_pushButton.clicked.connect( self.graph.clear_all_plots )
+		self.loadStoredSweeps_pushButton.clicked.connect( self.Load_Stored_Sweeps )
+		self.storedSweepsRequested_signal.connect( self.sweep_cache_worker.Load_Sweeps )
+		self.sweep_cache_worker.sweepsLoaded_signal.connect( self.Plot_Stored_Sweeps )
+		self.sweep_cache_worker.loadFailed_signal.connect( lambda error : Popup_Error( "Error Loading Sweeps", error ) )
 
 		self.measurementRequested_signal.connect( self.cv_controller.Voltage_Sweep )
-		# self.cv_controller.newSweepStarted_signal.connect( self.graph.new_plot )
-		# self.cv_controller.dataPointGotten_signal.connect( self.graph.add_new_data_point )
-		def plot_results( bias_voltage_V, capacitance_F, Q_Data ):
-			self.graph.plot( "C-V", bias_voltage_V, capacitance_F )
-			self.graph.plot( r"$1/C^2-V$", bias_voltage_V, 1 / capacitance_F**2, axis=1 )
-			# self.graph.plot( r"$(\frac{d(1/C^2)}{dV})-V$", (bias_voltage_V[:-1] + bias_voltage_V[1:])/2, np.diff( 1 / capacitance_F**2 ) / np.diff( bias_voltage_V ), axis=1 )
+		self.cvfMeasurementRequested_signal.connect( self.cv_controller.Voltage_Frequency_Sweep )
+		# Streaming sweeps draw each point as it arrives, the graph batches them into rate limited redraws
+		self.cv_controller.newSweepStarted_signal.connect( self.graph.new_plot )
+		self.cv_controller.dataPointGotten_signal.connect( self.graph.add_new_data_point )
+		def plot_results( bias_voltage_V, capacitance_F, Q_Data, temperature_K ):
+			self.graph.plot_finished( bias_voltage_V, capacitance_F, temperature_K ) # Colored by temperature in the overlay
 		self.cv_controller.sweepFinished_signal.connect( plot_results )
+		self.cv_controller.deviceSweepFinished_signal.connect( self.analysis_worker.Analyze_Sweep )
+		def plot_profile( profile ):
+			self.graph.update_curve( "inverse_c2", profile.bias_v, profile.inverse_c2, axis=1, label=r"$1/C^2-V$" ) # Latest sweep only
+			print( f"Built-in voltage {profile.built_in_v:.3f} V" )
+			known = np.isfinite( profile.depth_m ) & np.isfinite( profile.doping_per_m3 )
+			if known.any():
+				self.doping_graph.update_curve( "doping", profile.depth_m[ known ] * 1E6, profile.doping_per_m3[ known ] * 1E-6, label=f"Vbi {profile.built_in_v:.2f} V" )
+				self.doping_graph.show()
+		self.analysis_worker.profileReady_signal.connect( plot_profile )
+		def plot_cvf_results( bias_voltage_V, ac_frequency_Hz, capacitance_F, Q_Data ):
+			for frequency, frequency_capacitance_F in zip( ac_frequency_Hz, capacitance_F.T ):
+				self.graph.plot( f"C-V {frequency:g} Hz", bias_voltage_V, frequency_capacitance_F )
+		self.cv_controller.cvfSweepFinished_signal.connect( plot_cvf_results )
 		self.cv_controller.Error_signal.connect( self.Error_During_Measurement )
+		for signal in (self.cv_controller.sweepFinished_signal, self.cv_controller.cvfSweepFinished_signal, self.cv_controller.Error_signal):
+			signal.connect( lambda *args : self.Single_Measurement_Running( False ) )
+		for cv_controller, _ in self.stations:
+			cv_controller.Error_signal.connect( self.Error_During_Measurement )
 
 		# Temperature controller stuff
 		self.config_window.Connect_Functions( self.temp_controller )
@@ -139,20 +219,39 @@ class CV_Measurement_Assistant_App( QtWidgets.QWidget, Ui_MainWindow, Saveable_S
 			temp_start, temp_end, temp_step = float(self.startTemp_lineEdit.text()), float(self.endTemp_lineEdit.text()), float(self.stepTemp_lineEdit.text())
 			v_start, v_end, v_step = float(self.startVoltage_lineEdit.text()), float(self.endVoltage_lineEdit.text()), float(self.stepVoltage_lineEdit.text())
 			ac_voltage = float( self.acVoltage_lineEdit.text() )
-			ac_frequency = float( self.acFrequency_lineEdit.text() )
+			ac_frequency = self.Get_AC_Frequencies()
 			step_delay = float( self.stepDelay_lineEdit.text() )
 		except ValueError:
 			raise ValueError( "Invalid arguement for temperature, timing, or voltage range" )
 
 		device_config_data = Get_Device_Description_File( self.descriptionFilePath_lineEdit.text() )
 
-		self.sql_type, self.sql_conn = Connect_To_SQL( resource_path( "configuration.ini" ) )
 		meta_data = dict( sample_name=sample_name, user=user, measurement_setup="LN2 Dewar" )
 
 		return meta_data, (temp_start, temp_end, temp_step), (v_start, v_end, v_step, step_delay), (ac_voltage, ac_frequency), device_config_data
 
+	def Get_Current_Temperature( self ):
+		# Last reading shown, lets the planner start with the nearest setpoint
+		try:
+			return float( self.currentTemp_lineEdit.text() )
+		except ValueError:
+			return None
+
+	def Get_AC_Frequencies( self ):
+		# A comma separated list of frequencies requests a full C-V-f grid per device
+		ac_frequencies = [ float(x) for x in self.acFrequency_lineEdit.text().split( ',' ) ]
+		if len( ac_frequencies ) == 1:
+			return ac_frequencies[0]
+		return ac_frequencies
+
+	def Stop_All_Sweeps( self ):
+		self.cv_controller.Stop_Sweep()
+		for cv_controller, _ in self.stations:
+			cv_controller.Stop_Sweep()
+
 	def Error_During_Measurement( self, error ):
 		self.quit_early.set()
+		self.Stop_All_Sweeps()
 		self.Make_Safe()
 		Popup_Error( "Error During Measurement:", error )
 
@@ -161,9 +260,14 @@ class CV_Measurement_Assistant_App( QtWidgets.QWidget, Ui_MainWindow, Saveable_S
 		try:
 			self.Save_Session( resource_path( "session.ini" ) )
 			self.quit_early.clear()
-			self.measurement = Measurement_Sweep_Runner( self, self.Stop_Measurement, self.quit_early, Measurement_Sweep,
-			                                             self.temp_controller, self.cv_controller,
-							                             *self.Get_Measurement_Sweep_User_Input() )
+			meta_data, *run_info = self.Get_Measurement_Sweep_User_Input()
+			station_runs = [ (self.temp_controller, self.cv_controller, meta_data, *run_info, self.Get_Current_Temperature()) ]
+			station_runs += [ (temp_controller, cv_controller, meta_data, *run_info, None) for cv_controller, temp_controller in self.stations ]
+			completed_count = Completed_Sweep_Count( station_runs )
+			resume = completed_count > 0 and Popup_Yes_Or_No( "Resume Measurement", f"An interrupted run of this measurement already finished {completed_count} device sweeps.\nSkip them and resume?" )
+			self.measurement = Measurement_Sweep_Runner( self, self.Stop_Measurement, self.quit_early,
+			                                             functools.partial( Multi_Station_Sweep, resume=resume, reorder_temperatures=self.reorderTemperatures_checkBox.isChecked() ),
+			                                             station_runs )
 		except Exception as e:
 			Popup_Error( "Error Starting Measurement", str(e) )
 			return
@@ -178,6 +282,7 @@ class CV_Measurement_Assistant_App( QtWidgets.QWidget, Ui_MainWindow, Saveable_S
 
 	def Stop_Measurement( self ):
 		self.quit_early.set()
+		self.Stop_All_Sweeps()
 
 		try: self.takeMeasurementSweep_pushButton.clicked.disconnect()
 		except Exception: pass
@@ -185,8 +290,12 @@ class CV_Measurement_Assistant_App( QtWidgets.QWidget, Ui_MainWindow, Saveable_S
 		self.takeMeasurementSweep_pushButton.setStyleSheet("QPushButton { background-color: rgba(0,255,0,255); color: rgba(0, 0, 0,255); }")
 		self.takeMeasurementSweep_pushButton.clicked.connect( self.Start_Measurement )
 
-	def Set_Current_Data( self, bias_V, capacitance_F, Q ):
-		self.current_data = ( bias_V, capacitance_F, Q )
+	def Set_Current_Data( self, bias_V, capacitance_F, Q, temperature_K ):
+		self.current_data = self.cv_controller.last_result
+		# Numbers like the spooled sweeps' metadata, so exported columns hold one type
+		self.session_sweeps.append( (dict( sample_name=str( self.sampleName_lineEdit.text() ), user=str( self.user_lineEdit.text() ),
+		                                   temperature_in_k=Float_Or_None( self.currentTemp_lineEdit.text() ), ac_amplitude_v=Float_Or_None( self.acVoltage_lineEdit.text() ),
+		                                   ac_frequency_hz=Float_Or_None( self.acFrequency_lineEdit.text() ) ), self.current_data) )
 		self.cv_controller.sweepFinished_signal.disconnect( self.Set_Current_Data )
 
 	def Take_Single_Measurement( self ):
@@ -194,13 +303,45 @@ class CV_Measurement_Assistant_App( QtWidgets.QWidget, Ui_MainWindow, Saveable_S
 		input_end = float( self.endVoltage_lineEdit.text() )
 		input_step = float( self.stepVoltage_lineEdit.text() )
 		ac_voltage = float( self.acVoltage_lineEdit.text() )
-		ac_frequency = float( self.acFrequency_lineEdit.text() )
+		ac_frequency = self.Get_AC_Frequencies()
 		step_delay = float( self.stepDelay_lineEdit.text() )
 		self.Save_Session( resource_path( "session.ini" ) )
 
+		self.Single_Measurement_Running( True )
+		if np.ndim( ac_frequency ) > 0:
+			self.cvfMeasurementRequested_signal.emit( input_start, input_end, input_step, ac_voltage, ac_frequency, step_delay )
+			return
+		temperature = Float_Or_None( self.currentTemp_lineEdit.text() )
+		self.cv_controller.temperature_k = np.nan if temperature is None else temperature
 		self.cv_controller.sweepFinished_signal.connect( self.Set_Current_Data )
 		self.measurementRequested_signal.emit( input_start, input_end, input_step, ac_voltage, ac_frequency, step_delay )
 
+	def Single_Measurement_Running( self, running ):
+		# While a single measurement runs its button stops it, a streamed sweep can take a while point by point
+		try: self.takeMeasurement_pushButton.clicked.disconnect()
+		except Exception: pass
+		if running:
+			self.takeMeasurement_pushButton.setText( "Stop Measurement" )
+			self.takeMeasurement_pushButton.clicked.connect( lambda : self.cv_controller.Stop_Sweep() ) # Called here, the controller's thread is busy sweeping
+		else:
+			self.takeMeasurement_pushButton.setText( "Take Single Measurement" )
+			self.takeMeasurement_pushButton.clicked.connect( self.Take_Single_Measurement )
+
+	def Load_Stored_Sweeps( self ):
+		if self.sampleName_lineEdit.text() == '':
+			Popup_Error( "Error", "Must enter sample name" )
+			return
+		ac_frequency = Float_Or_None( self.acFrequency_lineEdit.text() ) # A list of frequencies loads all of them
+		self.storedSweepsRequested_signal.emit( str( self.sampleName_lineEdit.text() ), np.nan if ac_frequency is None else ac_frequency )
+
+	def Plot_Stored_Sweeps( self, sweeps ):
+		if not sweeps.meta_data:
+			Popup_Error( "Error", "No stored sweeps for this sample" )
+			return
+		print( f"Loaded {len( sweeps.meta_data )} stored sweeps" )
+		temperatures = [ meta_data["temperature_in_k"] for meta_data in sweeps.meta_data ]
+		self.graph.add_stacked_to_overlay( sweeps.bias_v, sweeps.capacitance_f, temperatures ) # Alongside this session's sweeps
+
 	def Save_Data_To_File( self ):
 		if self.sampleName_lineEdit.text() == '':
 			Popup_Error( "Error", "Must enter sample name" )
@@ -209,11 +350,24 @@ class CV_Measurement_Assistant_App( QtWidgets.QWidget, Ui_MainWindow, Saveable_S
 		timestr = time.strftime("%Y%m%d-%H%M%S")
 		sample_name = str( self.sampleName_lineEdit.text() )
 
-		file_name = "CV Data_" + sample_name + "_" + timestr + ".csv"
-		print( "Saving File: " + file_name )
-		with open( file_name, 'w' ) as outfile:
-			for bias_V,capacitance_F,Q in zip( *self.current_data ):
-				outfile.write( f'{bias_V},{capacitance_F},{Q}\n' )
+		sql_tables = ("xy_data_sql_table", "xy_sql_labels", "metadata_sql_table")
+		session_entries = [ entry for entry in Shared_Sweep_Spool().Entries()[ self.session_spool_start: ]
+		                    if entry["commit_arguments"].get( "xy_data_sql_table" ) == "cv_raw_data" ] # Not the repeat statistics companions
+		sweeps = self.session_sweeps + [ ({ key : value for key, value in entry["commit_arguments"].items() if key not in sql_tables }, result) for entry, result in
+		                                 Shared_Sweep_Spool().Read_Sweeps( session_entries ) ]
+		if not sweeps:
+			Popup_Error( "Error", "No sweeps taken this session" )
+			return
+
+		file_name, _ = QFileDialog.getSaveFileName( self, "Export Session Data", "CV Data_" + sample_name + "_" + timestr + ".csv",
+		                                            "CSV Files (*.csv);;NumPy Archive (*.npz);;Parquet Files (*.parquet)" )
+		if not file_name:
+			return
+		print( f"Saving {len(sweeps)} sweeps to file: " + file_name )
+		try:
+			Export_Sweeps( file_name, sweeps )
+		except Exception as e: # Unsupported formats, unwritable files and exporter type errors alike
+			Popup_Error( "Error Saving File", str( e ) )
 
 	def Save_Data_To_Database( self ):
 		if self.current_data == None:
@@ -229,72 +383,13 @@ class CV_Measurement_Assistant_App( QtWidgets.QWidget, Ui_MainWindow, Saveable_S
 					device_location=None, device_side_length_in_um=None, blackbody_temperature_in_c=None,
 					bandpass_filter=None, aperture_radius_in_m=None )
 
-		Commit_XY_Data_To_SQL( self.sql_type, self.sql_conn, xy_data_sql_table="cv_raw_data", xy_sql_labels=("voltage_v","capacitance_f"),
-						   x_data=self.current_data[0], y_data=self.current_data[1], metadata_sql_table="cv_measurements", **meta_data_sql_entries )
+		sql_type, sql_conn = self.sql_pool.Get_Connection()
+		Commit_XY_Data_To_SQL( sql_type, sql_conn, xy_data_sql_table="cv_raw_data", xy_sql_labels=("voltage_v","capacitance_f"),
+						   x_data=self.current_data.bias_v, y_data=self.current_data.capacitance_f, metadata_sql_table="cv_measurements", **meta_data_sql_entries )
 
 		print( "Data committed to database: " + sample_name  )
 
 
-def Measurement_Sweep( quit_early,
-                       temp_controller, cv_controller,
-                       meta_data, temperature_info, voltage_sweep_info, ac_voltage_info, device_config_data ):
-	sql_type, sql_conn = Connect_To_SQL( resource_path( "configuration.ini" ) )
-
-	run_devices  = Async_Iterator( device_config_data,
-	                               temp_controller, lambda current_device, temp_controller=temp_controller : temp_controller.Set_Active_Pads( current_device.neg_pad, current_device.pos_pad ),
-	                               temp_controller.Pads_Selected_Changed,
-	                               quit_early )
-
-	if temperature_info is None:
-		turn_off_heater = [None]
-		turn_heater_back_on = [None]
-		run_temperatures = [None]
-	else:
-		turn_off_heater = Async_Iterator( [None],
-		                                  temp_controller, lambda _ : temp_controller.Turn_Off(),
-		                                  temp_controller.Heater_Output_Off,
-		                                  quit_early )
-		turn_heater_back_on = Async_Iterator( [None],
-		                                      temp_controller, lambda _ : temp_controller.Turn_On(),
-		                                      temp_controller.Temperature_Stable,
-		                                      quit_early )
-		temp_start, temp_end, temp_step = temperature_info
-		run_temperatures = Async_Iterator( np.arange( temp_start, temp_end + temp_step / 2, temp_step ),
-		                                   temp_controller, temp_controller.Set_Temp_And_Turn_On,
-		                                   temp_controller.Temperature_Stable,
-		                                   quit_early )
-
-	v_start, v_end, v_step, step_delay = voltage_sweep_info
-	ac_voltage, ac_frequency = ac_voltage_info
-	meta_data.update( { "ac_amplitude_v":ac_voltage, "ac_frequency_hz":ac_frequency } )
-	get_results = Async_Iterator( [None],
-	                              cv_controller, lambda *args, v_start=v_start, v_end=v_end, v_step=v_step, ac_voltage=ac_voltage, ac_frequency=ac_frequency, step_delay=step_delay :
-	                                                    cv_controller.Voltage_Sweep( v_start, v_end, v_step, ac_voltage, ac_frequency, step_delay ),
-	                              cv_controller.sweepFinished_signal,
-	                              quit_early )
-
-	# for temperature in run_temperatures:
-	# 	for device, pads_info in run_devices:
-	# 		for _ in turn_heater_back_on:
-	for temperature, (device, pads_info), _ in ((x,y,z) for x in run_temperatures for y in run_devices for z in turn_heater_back_on ):
-		meta_data.update( dict( temperature_in_k=temperature, device_location=device.location, device_side_length_in_um=device.side ) )
-		(neg_pad, pos_pad), pads_are_reversed = pads_info
-		print( f"Starting Measurement for {device.location} side length {device.side} at {temperature} K on pads {neg_pad} and {pos_pad}" )
-
-		for _, xy_data in ((x,y) for x in turn_off_heater for y in get_results ):
-			x_data, y_data, q_data = xy_data
-			if pads_are_reversed:
-				x_data = x_data[::-1]
-				y_data = y_data[::-1]
-				q_data = q_data[::-1]
-			Commit_XY_Data_To_SQL( sql_type, sql_conn, xy_data_sql_table="cv_raw_data", xy_sql_labels=("voltage_v","capacitance_f"),
-								x_data=x_data, y_data=y_data, metadata_sql_table="cv_measurements", **meta_data )
-
-	test1 = Run_Async( temp_controller, lambda : temp_controller.Make_Safe() ); test1.Run()
-
-	print( "Finished Measurment" )
-
-
 if __name__ == "__main__":
 	app = QtWidgets.QApplication( sys.argv )
 	window = CV_Measurement_Assistant_App()
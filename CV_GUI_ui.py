@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'CV_GUI.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Form(object):
+    def setupUi(self, Form):
+        Form.setObjectName("Form")
+        Form.resize(880, 883)
+        self.horizontalLayout = QtWidgets.QHBoxLayout(Form)
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.graph = Live_Graph(Form)
+        self.graph.setObjectName("graph")
+        self.horizontalLayout.addWidget(self.graph)
+        self.frame = QtWidgets.QFrame(Form)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Preferred)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.frame.sizePolicy().hasHeightForWidth())
+        self.frame.setSizePolicy(sizePolicy)
+        self.frame.setFrameShape(QtWidgets.QFrame.StyledPanel)
+        self.frame.setFrameShadow(QtWidgets.QFrame.Raised)
+        self.frame.setObjectName("frame")
+        self.verticalLayout = QtWidgets.QVBoxLayout(self.frame)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.connectionsStatusDisplay_widget = QtWidgets.QWidget(self.frame)
+        self.connectionsStatusDisplay_widget.setMinimumSize(QtCore.QSize(0, 20))
+        self.connectionsStatusDisplay_widget.setObjectName("connectionsStatusDisplay_widget")
+        self.verticalLayout_5 = QtWidgets.QVBoxLayout(self.connectionsStatusDisplay_widget)
+        self.verticalLayout_5.setContentsMargins(0, 0, 0, 0)
+        self.verticalLayout_5.setObjectName("verticalLayout_5")
+        self.verticalLayout.addWidget(self.connectionsStatusDisplay_widget)
+        self.groupBox_2 = QtWidgets.QGroupBox(self.frame)
+        self.groupBox_2.setObjectName("groupBox_2")
+        self.verticalLayout_2 = QtWidgets.QVBoxLayout(self.groupBox_2)
+        self.verticalLayout_2.setObjectName("verticalLayout_2")
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.start_label = QtWidgets.QLabel(self.groupBox_2)
+        self.start_label.setObjectName("start_label")
+        self.horizontalLayout_2.addWidget(self.start_label)
+        self.startVoltage_lineEdit = QtWidgets.QLineEdit(self.groupBox_2)
+        self.startVoltage_lineEdit.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.startVoltage_lineEdit.setObjectName("startVoltage_lineEdit")
+        self.horizontalLayout_2.addWidget(self.startVoltage_lineEdit)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_2)
+        self.horizontalLayout_3 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_3.setObjectName("horizontalLayout_3")
+        self.end_label = QtWidgets.QLabel(self.groupBox_2)
+        self.end_label.setObjectName("end_label")
+        self.horizontalLayout_3.addWidget(self.end_label)
+        self.endVoltage_lineEdit = QtWidgets.QLineEdit(self.groupBox_2)
+        self.endVoltage_lineEdit.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.endVoltage_lineEdit.setObjectName("endVoltage_lineEdit")
+        self.horizontalLayout_3.addWidget(self.endVoltage_lineEdit)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_3)
+        self.horizontalLayout_4 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_4.setObjectName("horizontalLayout_4")
+        self.step_label = QtWidgets.QLabel(self.groupBox_2)
+        self.step_label.setObjectName("step_label")
+        self.horizontalLayout_4.addWidget(self.step_label)
+        self.stepVoltage_lineEdit = QtWidgets.QLineEdit(self.groupBox_2)
+        self.stepVoltage_lineEdit.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.stepVoltage_lineEdit.setObjectName("stepVoltage_lineEdit")
+        self.horizontalLayout_4.addWidget(self.stepVoltage_lineEdit)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_4)
+        self.horizontalLayout_6 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_6.setObjectName("horizontalLayout_6")
+        self.end_label_3 = QtWidgets.QLabel(self.groupBox_2)
+        self.end_label_3.setObjectName("end_label_3")
+        self.horizontalLayout_6.addWidget(self.end_label_3)
+        self.acVoltage_lineEdit = QtWidgets.QLineEdit(self.groupBox_2)
+        self.acVoltage_lineEdit.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.acVoltage_lineEdit.setObjectName("acVoltage_lineEdit")
+        self.horizontalLayout_6.addWidget(self.acVoltage_lineEdit)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_6)
+        self.horizontalLayout_11 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_11.setObjectName("horizontalLayout_11")
+        self.end_label_4 = QtWidgets.QLabel(self.groupBox_2)
+        self.end_label_4.setObjectName("end_label_4")
+        self.horizontalLayout_11.addWidget(self.end_label_4)
+        self.acFrequency_lineEdit = QtWidgets.QLineEdit(self.groupBox_2)
+        self.acFrequency_lineEdit.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.acFrequency_lineEdit.setObjectName("acFrequency_lineEdit")
+        self.horizontalLayout_11.addWidget(self.acFrequency_lineEdit)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_11)
+        self.horizontalLayout_13 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_13.setObjectName("horizontalLayout_13")
+        self.end_label_5 = QtWidgets.QLabel(self.groupBox_2)
+        self.end_label_5.setObjectName("end_label_5")
+        self.horizontalLayout_13.addWidget(self.end_label_5)
+        self.stepDelay_lineEdit = QtWidgets.QLineEdit(self.groupBox_2)
+        self.stepDelay_lineEdit.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.stepDelay_lineEdit.setObjectName("stepDelay_lineEdit")
+        self.horizontalLayout_13.addWidget(self.stepDelay_lineEdit)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_13)
+        self.verticalLayout.addWidget(self.groupBox_2)
+        self.takeMeasurement_pushButton = QtWidgets.QPushButton(self.frame)
+        self.takeMeasurement_pushButton.setObjectName("takeMeasurement_pushButton")
+        self.verticalLayout.addWidget(self.takeMeasurement_pushButton)
+        self.clearGraph_pushButton = QtWidgets.QPushButton(self.frame)
+        self.clearGraph_pushButton.setObjectName("clearGraph_pushButton")
+        self.verticalLayout.addWidget(self.clearGraph_pushButton)
+        self.loadStoredSweeps_pushButton = QtWidgets.QPushButton(self.frame)
+        self.loadStoredSweeps_pushButton.setObjectName("loadStoredSweeps_pushButton")
+        self.verticalLayout.addWidget(self.loadStoredSweeps_pushButton)
+        self.groupBox_3 = QtWidgets.QGroupBox(self.frame)
+        self.groupBox_3.setObjectName("groupBox_3")
+        self.verticalLayout_4 = QtWidgets.QVBoxLayout(self.groupBox_3)
+        self.verticalLayout_4.setObjectName("verticalLayout_4")
+        self.horizontalLayout_7 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_7.setObjectName("horizontalLayout_7")
+        self.start_label_2 = QtWidgets.QLabel(self.groupBox_3)
+        self.start_label_2.setObjectName("start_label_2")
+        self.horizontalLayout_7.addWidget(self.start_label_2)
+        self.startTemp_lineEdit = QtWidgets.QLineEdit(self.groupBox_3)
+        self.startTemp_lineEdit.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.startTemp_lineEdit.setObjectName("startTemp_lineEdit")
+        self.horizontalLayout_7.addWidget(self.startTemp_lineEdit)
+        self.verticalLayout_4.addLayout(self.horizontalLayout_7)
+        self.horizontalLayout_9 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_9.setObjectName("horizontalLayout_9")
+        self.end_label_2 = QtWidgets.QLabel(self.groupBox_3)
+        self.end_label_2.setObjectName("end_label_2")
+        self.horizontalLayout_9.addWidget(self.end_label_2)
+        self.endTemp_lineEdit = QtWidgets.QLineEdit(self.groupBox_3)
+        self.endTemp_lineEdit.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.endTemp_lineEdit.setObjectName("endTemp_lineEdit")
+        self.horizontalLayout_9.addWidget(self.endTemp_lineEdit)
+        self.verticalLayout_4.addLayout(self.horizontalLayout_9)
+        self.horizontalLayout_8 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_8.setObjectName("horizontalLayout_8")
+        self.step_label_2 = QtWidgets.QLabel(self.groupBox_3)
+        self.step_label_2.setObjectName("step_label_2")
+        self.horizontalLayout_8.addWidget(self.step_label_2)
+        self.stepTemp_lineEdit = QtWidgets.QLineEdit(self.groupBox_3)
+        self.stepTemp_lineEdit.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.stepTemp_lineEdit.setObjectName("stepTemp_lineEdit")
+        self.horizontalLayout_8.addWidget(self.stepTemp_lineEdit)
+        self.verticalLayout_4.addLayout(self.horizontalLayout_8)
+        self.horizontalLayout_10 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_10.setObjectName("horizontalLayout_10")
+        self.currentTemp_label = QtWidgets.QLabel(self.groupBox_3)
+        self.currentTemp_label.setObjectName("currentTemp_label")
+        self.horizontalLayout_10.addWidget(self.currentTemp_label)
+        self.currentTemp_lineEdit = QtWidgets.QLineEdit(self.groupBox_3)
+        self.currentTemp_lineEdit.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.currentTemp_lineEdit.setText("")
+        self.currentTemp_lineEdit.setReadOnly(True)
+        self.currentTemp_lineEdit.setObjectName("currentTemp_lineEdit")
+        self.horizontalLayout_10.addWidget(self.currentTemp_lineEdit)
+        self.verticalLayout_4.addLayout(self.horizontalLayout_10)
+        self.reorderTemperatures_checkBox = QtWidgets.QCheckBox(self.groupBox_3)
+        self.reorderTemperatures_checkBox.setObjectName("reorderTemperatures_checkBox")
+        self.verticalLayout_4.addWidget(self.reorderTemperatures_checkBox)
+        self.horizontalLayout_12 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_12.setObjectName("horizontalLayout_12")
+        self.currentTemp_label_3 = QtWidgets.QLabel(self.groupBox_3)
+        self.currentTemp_label_3.setObjectName("currentTemp_label_3")
+        self.horizontalLayout_12.addWidget(self.currentTemp_label_3)
+        self.outputPower_lineEdit = QtWidgets.QLineEdit(self.groupBox_3)
+        self.outputPower_lineEdit.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.outputPower_lineEdit.setText("")
+        self.outputPower_lineEdit.setReadOnly(True)
+        self.outputPower_lineEdit.setObjectName("outputPower_lineEdit")
+        self.horizontalLayout_12.addWidget(self.outputPower_lineEdit)
+        self.verticalLayout_4.addLayout(self.horizontalLayout_12)
+        self.verticalLayout.addWidget(self.groupBox_3)
+        self.takeMeasurementSweep_pushButton = QtWidgets.QPushButton(self.frame)
+        self.takeMeasurementSweep_pushButton.setObjectName("takeMeasurementSweep_pushButton")
+        self.verticalLayout.addWidget(self.takeMeasurementSweep_pushButton)
+        self.descriptionFile_label = QtWidgets.QLabel(self.frame)
+        self.descriptionFile_label.setObjectName("descriptionFile_label")
+        self.verticalLayout.addWidget(self.descriptionFile_label)
+        self.horizontalLayout_5 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_5.setObjectName("horizontalLayout_5")
+        self.descriptionFilePath_lineEdit = QtWidgets.QLineEdit(self.frame)
+        self.descriptionFilePath_lineEdit.setMaximumSize(QtCore.QSize(16777215, 16777215))
+        self.descriptionFilePath_lineEdit.setText("")
+        self.descriptionFilePath_lineEdit.setObjectName("descriptionFilePath_lineEdit")
+        self.horizontalLayout_5.addWidget(self.descriptionFilePath_lineEdit)
+        self.loadDevicesFile_pushButton = QtWidgets.QPushButton(self.frame)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.loadDevicesFile_pushButton.sizePolicy().hasHeightForWidth())
+        self.loadDevicesFile_pushButton.setSizePolicy(sizePolicy)
+        self.loadDevicesFile_pushButton.setMaximumSize(QtCore.QSize(32, 16777215))
+        self.loadDevicesFile_pushButton.setObjectName("loadDevicesFile_pushButton")
+        self.horizontalLayout_5.addWidget(self.loadDevicesFile_pushButton)
+        self.verticalLayout.addLayout(self.horizontalLayout_5)
+        self.groupBox = QtWidgets.QGroupBox(self.frame)
+        self.groupBox.setObjectName("groupBox")
+        self.verticalLayout_3 = QtWidgets.QVBoxLayout(self.groupBox)
+        self.verticalLayout_3.setObjectName("verticalLayout_3")
+        self.user_label = QtWidgets.QLabel(self.groupBox)
+        self.user_label.setObjectName("user_label")
+        self.verticalLayout_3.addWidget(self.user_label)
+        self.user_lineEdit = QtWidgets.QLineEdit(self.groupBox)
+        self.user_lineEdit.setMaximumSize(QtCore.QSize(16777215, 16777215))
+        self.user_lineEdit.setText("")
+        self.user_lineEdit.setObjectName("user_lineEdit")
+        self.verticalLayout_3.addWidget(self.user_lineEdit)
+        self.sampleName_label = QtWidgets.QLabel(self.groupBox)
+        self.sampleName_label.setObjectName("sampleName_label")
+        self.verticalLayout_3.addWidget(self.sampleName_label)
+        self.sampleName_lineEdit = QtWidgets.QLineEdit(self.groupBox)
+        self.sampleName_lineEdit.setMaximumSize(QtCore.QSize(16777215, 16777215))
+        self.sampleName_lineEdit.setText("")
+        self.sampleName_lineEdit.setObjectName("sampleName_lineEdit")
+        self.verticalLayout_3.addWidget(self.sampleName_lineEdit)
+        self.saveToDatabase_pushButton = QtWidgets.QPushButton(self.groupBox)
+        self.saveToDatabase_pushButton.setObjectName("saveToDatabase_pushButton")
+        self.verticalLayout_3.addWidget(self.saveToDatabase_pushButton)
+        self.outputToFile_pushButton = QtWidgets.QPushButton(self.groupBox)
+        self.outputToFile_pushButton.setObjectName("outputToFile_pushButton")
+        self.verticalLayout_3.addWidget(self.outputToFile_pushButton)
+        self.verticalLayout.addWidget(self.groupBox)
+        self.settings_pushButton = QtWidgets.QPushButton(self.frame)
+        self.settings_pushButton.setObjectName("settings_pushButton")
+        self.verticalLayout.addWidget(self.settings_pushButton)
+        spacerItem = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
+        self.verticalLayout.addItem(spacerItem)
+        self.horizontalLayout.addWidget(self.frame)
+
+        self.retranslateUi(Form)
+        QtCore.QMetaObject.connectSlotsByName(Form)
+
+    def retranslateUi(self, Form):
+        _translate = QtCore.QCoreApplication.translate
+        Form.setWindowTitle(_translate("Form", "Form"))
+        self.groupBox_2.setTitle(_translate("Form", "Voltage Range (in V)"))
+        self.start_label.setText(_translate("Form", "Start"))
+        self.startVoltage_lineEdit.setText(_translate("Form", "-1"))
+        self.end_label.setText(_translate("Form", "End"))
+        self.endVoltage_lineEdit.setText(_translate("Form", "1"))
+        self.step_label.setText(_translate("Form", "Step"))
+        self.stepVoltage_lineEdit.setText(_translate("Form", "0.01"))
+        self.end_label_3.setText(_translate("Form", "AC Amplitude"))
+        self.acVoltage_lineEdit.setText(_translate("Form", "10E-6"))
+        self.end_label_4.setText(_translate("Form", "AC Frequency"))
+        self.acFrequency_lineEdit.setText(_translate("Form", "1E4"))
+        self.end_label_5.setText(_translate("Form", "Step Delay (seconds)"))
+        self.stepDelay_lineEdit.setText(_translate("Form", "0.5"))
+        self.takeMeasurement_pushButton.setText(_translate("Form", "Take Single Measurement"))
+        self.clearGraph_pushButton.setText(_translate("Form", "Clear Graph"))
+        self.loadStoredSweeps_pushButton.setToolTip(_translate("Form", "Overlay this sample\'s stored sweeps at the entered AC frequency, colored by temperature"))
+        self.loadStoredSweeps_pushButton.setText(_translate("Form", "Load Stored Sweeps"))
+        self.groupBox_3.setTitle(_translate("Form", "Temperature Range (in K)"))
+        self.start_label_2.setText(_translate("Form", "Start"))
+        self.startTemp_lineEdit.setText(_translate("Form", "90"))
+        self.end_label_2.setText(_translate("Form", "End"))
+        self.endTemp_lineEdit.setText(_translate("Form", "300"))
+        self.step_label_2.setText(_translate("Form", "Step"))
+        self.stepTemp_lineEdit.setText(_translate("Form", "10"))
+        self.currentTemp_label.setText(_translate("Form", "Current Temperature"))
+        self.reorderTemperatures_checkBox.setToolTip(_translate("Form", "Start from whichever end of the temperature range is nearer the current temperature"))
+        self.reorderTemperatures_checkBox.setText(_translate("Form", "Start From Nearest End"))
+        self.currentTemp_label_3.setText(_translate("Form", "Heater Output"))
+        self.takeMeasurementSweep_pushButton.setText(_translate("Form", "Measurement Sweep"))
+        self.descriptionFile_label.setText(_translate("Form", "Measurement Description File"))
+        self.loadDevicesFile_pushButton.setText(_translate("Form", "..."))
+        self.groupBox.setTitle(_translate("Form", "Save"))
+        self.user_label.setText(_translate("Form", "User"))
+        self.sampleName_label.setText(_translate("Form", "Sample Name"))
+        self.saveToDatabase_pushButton.setText(_translate("Form", "Save To Database"))
+        self.outputToFile_pushButton.setText(_translate("Form", "Output To File"))
+        self.settings_pushButton.setText(_translate("Form", "Configuration"))
+from CV_Measurement_Assistant.Live_Graph import Live_Graph
+
+
+ui_sha256 = "17d3aaa33f57190b34303625a5d6e5bd452241b01cc1204bf48ca27ac05eae1d" # CV_GUI.ui this module was generated from
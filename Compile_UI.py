@@ -0,0 +1,24 @@
+# Regenerates CV_GUI_ui.py from CV_GUI.ui so the GUI can import its layout instead of parsing the .ui file at startup.
+# Run with: python -m CV_Measurement_Assistant.Compile_UI after editing CV_GUI.ui
+
+import hashlib
+import io
+import pathlib
+
+from PyQt5.uic import compileUi
+
+
+def Compile_UI( ui_file, py_file ):
+	ui_file = pathlib.Path( ui_file )
+	generated = io.StringIO()
+	with open( ui_file ) as infile:
+		compileUi( infile, generated )
+	generated.write( f'\n\nui_sha256 = "{hashlib.sha256( ui_file.read_bytes() ).hexdigest()}" # CV_GUI.ui this module was generated from\n' )
+	with open( py_file, 'w', newline='\r\n' ) as outfile:
+		outfile.write( generated.getvalue().replace( str( ui_file ), ui_file.name ) ) # No machine specific path in the header
+
+
+if __name__ == "__main__":
+	this_files_directory = pathlib.Path( __file__ ).parent.resolve()
+	Compile_UI( this_files_directory / "CV_GUI.ui", this_files_directory / "CV_GUI_ui.py" )
+	print( "Wrote " + str( this_files_directory / "CV_GUI_ui.py" ) )
@@ -0,0 +1,73 @@
+# Writes many sweeps with their metadata to one file, one row per bias point in long format.
+# sweeps are given as a list of (meta_data dict, Sweep_Result).
+
+import csv
+import io
+import json
+import pathlib
+
+import numpy as np
+
+from CV_Measurement_Assistant.Sweep_Result import Sweep_Result, sweep_point_dtype
+
+
+def Metadata_Columns( sweeps ):
+	columns = {}
+	for meta_data, _ in sweeps:
+		columns.update( dict.fromkeys( meta_data ) )
+	return list( columns )
+
+def Export_Sweeps( file_name, sweeps, file_format=None ):
+	file_format = file_format or pathlib.Path( file_name ).suffix.lstrip( '.' ).lower()
+	exporters = { "csv" : Export_CSV, "npz" : Export_NPZ, "parquet" : Export_Parquet }
+	if file_format not in exporters:
+		raise ValueError( f"Unsupported export format: {file_format}" )
+	exporters[ file_format ]( file_name, sweeps )
+
+def Export_CSV( file_name, sweeps ):
+	metadata_columns = Metadata_Columns( sweeps )
+	with open( file_name, 'w', newline='' ) as outfile:
+		csv.writer( outfile ).writerow( ["sweep_index"] + metadata_columns + list( sweep_point_dtype.names ) )
+		for sweep_index, (meta_data, result) in enumerate( sweeps ):
+			if len( result ) == 0:
+				continue
+			# Metadata is constant over a sweep, so each sweep is formatted with a single string operation
+			prefix = io.StringIO()
+			csv.writer( prefix ).writerow( [sweep_index] + [ meta_data.get( column, "" ) for column in metadata_columns ] )
+			row_format = prefix.getvalue().rstrip( '\r\n' ).replace( '%', '%%' ) + ",%.17g,%.17g,%.17g,%d,%.17g\n"
+			values = np.column_stack( [ result.points[ name ].astype( np.float64 ) for name in sweep_point_dtype.names ] )
+			outfile.write( (row_format * len( result )) % tuple( values.ravel().tolist() ) )
+
+def Export_NPZ( file_name, sweeps ):
+	points = np.concatenate( [ result.points for _, result in sweeps ] ) if sweeps else np.empty( 0, dtype=sweep_point_dtype )
+	sweep_lengths = np.array( [ len( result ) for _, result in sweeps ], dtype=np.int64 )
+	meta_data = json.dumps( [ meta_data for meta_data, _ in sweeps ], default=lambda value : value.item() if hasattr( value, "item" ) else str( value ) )
+	np.savez_compressed( file_name, points=points, sweep_lengths=sweep_lengths, meta_data=np.array( meta_data ) )
+
+def Load_NPZ( file_name ):
+	with np.load( file_name ) as data:
+		all_meta_data = json.loads( str( data["meta_data"] ) )
+		starts = np.concatenate( ([0], np.cumsum( data["sweep_lengths"] )) )
+		points = data["points"]
+		return [ (meta_data, Sweep_Result( points[ start:end ] )) for meta_data, start, end in zip( all_meta_data, starts[:-1], starts[1:] ) ]
+
+def Export_Parquet( file_name, sweeps ):
+	try:
+		import pyarrow
+		import pyarrow.parquet
+	except ImportError:
+		from MPL_Shared.Install_If_Necessary import Ask_For_Install
+		Ask_For_Install( "pyarrow" )
+		import pyarrow
+		import pyarrow.parquet
+
+	metadata_columns = Metadata_Columns( sweeps )
+	sweep_lengths = [ len( result ) for _, result in sweeps ]
+	columns = { "sweep_index" : np.repeat( np.arange( len( sweeps ) ), sweep_lengths ) }
+	for column in metadata_columns:
+		values = [ meta_data.get( column ) for meta_data, _ in sweeps ]
+		columns[ column ] = pyarrow.array( values ).take( pyarrow.array( columns["sweep_index"] ) )
+	points = np.concatenate( [ result.points for _, result in sweeps ] ) if sweeps else np.empty( 0, dtype=sweep_point_dtype )
+	for name in sweep_point_dtype.names:
+		columns[ name ] = np.ascontiguousarray( points[ name ] )
+	pyarrow.parquet.write_table( pyarrow.table( columns ), file_name )
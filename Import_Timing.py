@@ -0,0 +1,46 @@
+# Measures what a cold import costs, module by module, using the interpreter's -X importtime report.
+# Run with: python -m CV_Measurement_Assistant.Import_Timing [module ...] [--top 25]
+
+import argparse
+import pathlib
+import subprocess
+import sys
+import time
+
+from rich import print
+from rich.table import Table
+
+
+def Measure_Import_Time( module ):
+	# Fresh interpreter per measurement so nothing is already cached in sys.modules.
+	# Returns the wall time and a list of (self_us, cumulative_us, module) for every module imported.
+	package_parent = pathlib.Path( __file__ ).absolute().parent.parent
+	start = time.perf_counter()
+	completed = subprocess.run( [sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=package_parent, capture_output=True, text=True )
+	wall_time_s = time.perf_counter() - start
+	imports = []
+	for line in completed.stderr.splitlines():
+		if not line.startswith( "import time:" ) or "cumulative" in line:
+			continue
+		self_us, cumulative_us, name = line[ len( "import time:" ): ].split( "|" )
+		imports.append( (int( self_us ), int( cumulative_us ), name.rstrip()) )
+	if completed.returncode != 0:
+		print( f"[red]Importing {module} failed:[/red]\n" + "\n".join( line for line in completed.stderr.splitlines() if not line.startswith( "import time:" ) ) )
+	return wall_time_s, imports
+
+def Print_Import_Times( module, wall_time_s, imports, top=25 ):
+	table = Table( title=f"import {module}: {wall_time_s:.2f} s wall time including interpreter start" )
+	for column in ("Module", "Cumulative (ms)", "Self (ms)"):
+		table.add_column( column, justify="left" if column == "Module" else "right" )
+	for self_us, cumulative_us, name in sorted( imports, key=lambda entry : -entry[1] )[:top]:
+		table.add_row( name, f"{cumulative_us / 1000:.1f}", f"{self_us / 1000:.1f}" )
+	print( table )
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser( description="Show which imports dominate startup time" )
+	parser.add_argument( "modules", nargs="*", default=["CV_Measurement_Assistant.CV_GUI", "CV_Measurement_Assistant.Run_Headless"] )
+	parser.add_argument( "--top", type=int, default=25, help="Slowest imports to list per module" )
+	args = parser.parse_args()
+	for module in args.modules:
+		Print_Import_Times( module, *Measure_Import_Time( module ), top=args.top )
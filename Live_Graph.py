@@ -1,3 +1,4 @@
+from PyQt5 import QtCore
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
 
 import matplotlib
@@ -7,12 +8,28 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 import numpy as np
 import matplotlib.cm as cm
+from matplotlib.collections import LineCollection
+from matplotlib.colors import Normalize
+
+
+def Decimate_Min_Max( x_data, y_data, bin_count ):
+	# Keeps the lowest and highest point of each of bin_count runs of points, which looks the same as the full sweep
+	# once a run is narrower than a pixel
+	if len( x_data ) <= 2 * bin_count:
+		return x_data, y_data
+	run_length = -(-len( x_data ) // bin_count)
+	padding = run_length * bin_count - len( x_data )
+	runs = np.pad( np.asarray( y_data, dtype=float ), (0, padding), mode='edge' ).reshape( bin_count, run_length )
+	offsets = np.arange( bin_count ) * run_length
+	low_index = offsets + np.argmin( np.where( np.isnan( runs ), np.inf, runs ), axis=1 )
+	high_index = offsets + np.argmax( np.where( np.isnan( runs ), -np.inf, runs ), axis=1 )
+	keep = np.unique( np.minimum( np.concatenate( (low_index, high_index) ), len( x_data ) - 1 ) )
+	return np.asarray( x_data )[ keep ], np.asarray( y_data )[ keep ]
 
 class Live_Graph( QWidget ):
-	def __init__(self, parent=None):
+	def __init__(self, parent=None, min_redraw_interval_ms=50, overlay_mode=False, max_overlay_sweeps=500, fade_old_sweeps=True, temperature_colormap=cm.coolwarm):
 		super().__init__(parent=parent)
 
 		self.figure = plt.figure()
@@ -21,8 +38,8 @@ class Live_Graph( QWidget ):
 		self.canvas = FigureCanvas( self.figure )
 		plt.ion()
 
-		self.current_graph_data = []
 		self.current_graph = None
+		self.running_graph = None
 		#self.graph_colors = cm.get_cmap('seismic')(np.linspace(0, 1, 10))
 		self.graph_colors = cm.rainbow(np.linspace(0, 1, 10))
 		# a figure instance to plot on
@@ -37,12 +54,36 @@ class Live_Graph( QWidget ):
 
 
 		self.ax = self.figure.add_subplot(111)
+		self.right_ax = None # Second y axis for derived curves, made on first use
 		self.figure.tight_layout()
 		#self.ax.plot( [1,2,3,4], [1,2,3,4], 'b-')
 		self.all_graphs = []
+		self.named_curves = {} # Curves redrawn in place by update_curve, such as the latest sweep's 1/C^2
 		self.debug_counter = 0
-		#self.current_graph, = self.ax.plot( [], [], 'b-')
-		#self.canvas.show()
+
+		# Points of the sweep in progress, grown by doubling so adding a point never copies the whole sweep
+		self.x_buffer = np.empty( 256 )
+		self.y_buffer = np.empty( 256 )
+		self.point_count = 0
+
+		# Redraws happen at most once per interval and only after new data, never on a free running animation
+		self.redraw_timer = QtCore.QTimer( self )
+		self.redraw_timer.setSingleShot( True )
+		self.redraw_timer.setInterval( min_redraw_interval_ms )
+		self.redraw_timer.timeout.connect( self.replot )
+		self.background = None
+		self.canvas.mpl_connect( 'draw_event', self.on_draw )
+
+		# Overlay mode merges finished sweeps into one LineCollection, so drawing cost does not grow with the sweep count
+		self.overlay_mode = overlay_mode
+		self.max_overlay_sweeps = max_overlay_sweeps
+		self.fade_old_sweeps = fade_old_sweeps
+		self.temperature_colormap = temperature_colormap
+		self.overlay = LineCollection( [], linewidths=1.0 )
+		self.ax.add_collection( self.overlay )
+		self.overlay_segments = []
+		self.overlay_temperatures = []
+		self.overlay_limits = []
 
 	def set_labels( self, title, x_label, y_label ):
 		self.ax.set_xlabel( x_label )
@@ -50,54 +91,195 @@ class Live_Graph( QWidget ):
 		self.ax.set_title( title )
 
 	def new_plot( self ):
-		self.current_graph, = self.ax.plot( [], [], color=self.graph_colors[self.debug_counter])
-		self.running_graph, = self.ax.plot( [], [], 'ro-' )
+		# The running sweep is animated, so full redraws leave it out and it is blitted on top of the cached background
+		self.current_graph, = self.ax.plot( [], [], color=self.graph_colors[self.debug_counter], animated=True )
+		self.running_graph, = self.ax.plot( [], [], 'ro-', animated=True )
 		self.debug_counter = (self.debug_counter + 1) % 10
+		self.fit_to_data = len( self.all_graphs ) == 0 and len( self.overlay_segments ) == 0 # Nothing else on the axes, so their default limits mean nothing
 		self.all_graphs.append( self.current_graph )
-		#self.ax.set_xlim([50,100])
-		self.current_graph_data = []
-		self.newest_data = None
-		self.ani = animation.FuncAnimation(self.figure, self.replot, blit=False, interval=10,
-                              repeat=True)
-
-	def replot( self, frame_number ):
-		if len( self.current_graph_data ) > 0:
-			self.current_graph.set_data( *zip(*self.current_graph_data) )
-
-		if self.newest_data is not None:
-			self.running_graph.set_data( [self.newest_data[0]], [self.newest_data[1]] )
-		# refresh canvas
-		self.ax.relim()
-		#self.ax.autoscale_view()
-		#self.ax.autoscale(enable=True, axis='y')
-		self.ax.autoscale_view(True,True,True)
-		self.figure.tight_layout()
-		#plt.pause(0.05)
-		#self.canvas.draw()
-		#self.canvas.show()
-		return self.all_graphs + [self.running_graph]
+		self.point_count = 0
+		self.canvas.draw_idle()
+
+	def on_draw( self, event ):
+		self.background = self.canvas.copy_from_bbox( self.ax.bbox )
+		self.draw_animated()
+
+	def draw_animated( self ):
+		for graph in (self.current_graph, self.running_graph):
+			if graph is not None and graph.get_animated():
+				self.ax.draw_artist( graph )
+
+	def replot( self ):
+		if self.current_graph is None or self.point_count == 0:
+			return
+		x_data = self.x_buffer[:self.point_count]
+		y_data = self.y_buffer[:self.point_count]
+		self.current_graph.set_data( x_data, y_data )
+		self.running_graph.set_data( x_data[-1:], y_data[-1:] )
+
+		if self.rescale_if_outside( x_data, y_data ) or self.background is None:
+			self.canvas.draw_idle() # Axis changed, the cached background is stale
+			return
+		self.canvas.restore_region( self.background )
+		self.draw_animated()
+		self.canvas.blit( self.ax.bbox )
+
+	def rescale_if_outside( self, x_data, y_data ):
+		# Only grows the axes when a point falls outside them, with a margin so the next points usually fit
+		rescaled = False
+		for data, get_limits, set_limits in ((x_data, self.ax.get_xlim, self.ax.set_xlim), (y_data, self.ax.get_ylim, self.ax.set_ylim)):
+			finite = data[ np.isfinite( data ) ]
+			if len( finite ) == 0:
+				continue
+			low, high = get_limits()
+			data_low, data_high = finite.min(), finite.max()
+			if not self.fit_to_data and data_low >= low and data_high <= high:
+				continue
+			margin = 0.1 * (max( high, data_high ) - min( low, data_low )) if not self.fit_to_data else 0.1 * (data_high - data_low)
+			margin = margin or 0.1 * abs( data_high ) or 1.0
+			if self.fit_to_data:
+				set_limits( data_low - margin, data_high + margin )
+			else: # Leaves the side that still fits alone
+				set_limits( min( low, data_low - margin ), max( high, data_high + margin ) )
+			rescaled = True
+		self.fit_to_data = self.fit_to_data and not rescaled
+		return rescaled
 
 	def add_new_data_point( self, x, y ):
-		self.newest_data = (x,y)
-		self.current_graph_data.append( (x, y) )
+		if self.point_count == len( self.x_buffer ):
+			self.x_buffer = np.resize( self.x_buffer, 2 * len( self.x_buffer ) )
+			self.y_buffer = np.resize( self.y_buffer, 2 * len( self.y_buffer ) )
+		self.x_buffer[ self.point_count ] = x
+		self.y_buffer[ self.point_count ] = y
+		self.point_count += 1
+		if not self.redraw_timer.isActive():
+			self.redraw_timer.start()
+
+	def plot( self, label, x_data, y_data, axis=0 ):
+		# A complete curve drawn in one go, axis 1 puts it on a second y axis on the right such as 1/C^2 next to C
+		if axis == 0:
+			self.discard_empty_running_plot()
+		ax = self.get_axis( axis )
+		graph, = ax.plot( x_data, y_data, color=self.graph_colors[self.debug_counter], label=label )
+		self.debug_counter = (self.debug_counter + 1) % 10
+		self.all_graphs.append( graph )
+		ax.relim()
+		ax.autoscale_view(True,True,True)
+		self.canvas.draw_idle()
+
+	def update_curve( self, name, x_data, y_data, axis=0, label=None ):
+		# One curve per name whose data is replaced, for derived curves of the latest sweep that must not pile up artists
+		ax = self.get_axis( axis )
+		curve = self.named_curves.get( name )
+		if curve is None:
+			curve, = ax.plot( [], [], color=self.graph_colors[ len( self.named_curves ) % 10 ] )
+			self.named_curves[ name ] = curve
+		curve.set_data( x_data, y_data )
+		curve.set_label( name if label is None else label )
+		ax.relim()
+		ax.autoscale_view(True,True,True)
+		self.canvas.draw_idle()
+
+	def get_axis( self, axis ):
+		if axis == 0:
+			return self.ax
+		if self.right_ax is None:
+			self.right_ax = self.ax.twinx()
+		return self.right_ax
+
+	def discard_empty_running_plot( self ):
+		# A sweep that finished without streaming any points, e.g. a C-V-f grid, is drawn by plot instead
+		if self.current_graph is None or self.point_count > 0 or not self.current_graph.get_animated():
+			return
+		self.redraw_timer.stop()
+		for graph in (self.current_graph, self.running_graph):
+			if graph is not None:
+				graph.remove()
+		self.all_graphs.remove( self.current_graph )
+		self.current_graph = None
+		self.running_graph = None
 
-	def plot_finished( self, x_data, y_data ):
-		self.ani._stop()
-		self.running_graph.remove()
+	def plot_finished( self, x_data, y_data, temperature=None ):
+		if self.current_graph is None and not self.overlay_mode: # Sweep started without new_plot
+			self.new_plot()
+		self.redraw_timer.stop()
+		if self.running_graph is not None:
+			self.running_graph.remove()
+			self.running_graph = None
+		if self.overlay_mode: # The finished sweep moves from its running line into the overlay
+			if self.current_graph is not None:
+				self.current_graph.remove()
+				self.all_graphs.remove( self.current_graph )
+				self.current_graph = None
+			self.add_to_overlay( x_data, y_data, temperature )
+			return
 		self.current_graph.set_data( x_data, y_data )
+		self.current_graph.set_animated( False ) # Finished sweeps become part of the cached background
 		self.ax.relim()
 		#self.ax.autoscale_view()
 		self.ax.autoscale_view(True,True,True)
-		self.figure.tight_layout()
-		self.canvas.draw()
-		self.canvas.show()
+		self.canvas.draw_idle()
+
+	def add_to_overlay( self, x_data, y_data, temperature=None, redraw=True ):
+		x_data, y_data = Decimate_Min_Max( np.asarray( x_data ), np.asarray( y_data ), max( 1, int( self.ax.bbox.width ) ) )
+		self.overlay_segments.append( np.column_stack( (x_data, y_data) ) )
+		self.overlay_temperatures.append( np.nan if temperature is None else temperature )
+		finite = np.isfinite( x_data ) & np.isfinite( y_data )
+		self.overlay_limits.append( (x_data[finite].min(), x_data[finite].max(), y_data[finite].min(), y_data[finite].max()) if finite.any() else (np.nan,) * 4 )
+		if len( self.overlay_segments ) > self.max_overlay_sweeps:
+			del self.overlay_segments[0], self.overlay_temperatures[0], self.overlay_limits[0]
+		if redraw:
+			self.update_overlay()
+
+	def add_stacked_to_overlay( self, x_stacked, y_stacked, temperatures=None ):
+		# Many stored sweeps at once, NaN padded (sweep, point) arrays such as a Sweep_Cache query, with a single redraw
+		for row, (x_data, y_data) in enumerate( zip( x_stacked, y_stacked ) ):
+			length = np.count_nonzero( np.isfinite( x_data ) ) # Padding is only ever at the end
+			self.add_to_overlay( x_data[:length], y_data[:length], None if temperatures is None else temperatures[ row ], redraw=False )
+		self.update_overlay()
+
+	def update_overlay( self ):
+		temperatures = np.array( self.overlay_temperatures, dtype=float )
+		colors = np.array( [ self.graph_colors[ i % 10 ] for i in range( len( temperatures ) ) ] ).reshape( -1, 4 )
+		known = np.isfinite( temperatures )
+		if known.any(): # Sweeps without a temperature keep the cycling colors
+			colors[ known ] = self.temperature_colormap( Normalize( temperatures[known].min(), temperatures[known].max() )( temperatures[known] ) )
+		if self.fade_old_sweeps and len( colors ) > 1:
+			colors[:, 3] = np.linspace( 0.15, 1.0, len( colors ) )
+		self.overlay.set_segments( self.overlay_segments )
+		self.overlay.set_color( colors )
+
+		# Limits come from the per sweep bounds kept alongside the segments instead of relim over every artist
+		limits = np.array( self.overlay_limits ).reshape( -1, 4 )
+		limits = limits[ np.isfinite( limits ).all( axis=1 ) ]
+		if len( limits ):
+			for low, high, set_limits in ((limits[:,0].min(), limits[:,1].max(), self.ax.set_xlim), (limits[:,2].min(), limits[:,3].max(), self.ax.set_ylim)):
+				margin = 0.05 * (high - low) or 0.1 * abs( high ) or 1.0
+				set_limits( low - margin, high + margin )
+		self.canvas.draw_idle()
 
 	def clear_all_plots( self ):
+		self.redraw_timer.stop()
+		if self.running_graph is not None:
+			self.running_graph.remove()
 		for graph in self.all_graphs:
 			graph.remove()
 		self.all_graphs.clear()
 		self.current_graph = None
 		self.running_graph = None
+		self.point_count = 0
+		self.overlay_segments.clear()
+		self.overlay_temperatures.clear()
+		self.overlay_limits.clear()
+		self.overlay.set_segments( [] )
+		for curve in self.named_curves.values():
+			curve.remove()
+		self.named_curves.clear()
+		for ax in (self.ax, self.right_ax):
+			if ax is not None:
+				ax.relim()
+				ax.autoscale_view(True,True,True)
+		self.canvas.draw_idle()
 
 #import sys
 #from time import sleep
@@ -1,5 +1,8 @@
 from PyQt5 import QtCore
 
+from MPL_Shared.SQL_Controller import Commit_XY_Data_To_SQL
+from CV_Measurement_Assistant.SQL_Connection_Pool import Shared_SQL_Pool
+
 
 class Measurement_Loop( QtCore.QObject ):
 	Finished = QtCore.pyqtSignal()
@@ -8,7 +11,8 @@ class Measurement_Loop( QtCore.QObject ):
 	measurementRequested_signal = QtCore.pyqtSignal(float, float, float)
 	Finished = QtCore.pyqtSignal()
 
-	def __init__( self, sample_name, user, device_config_data, temperatures_to_measure, v_start, v_end, v_step, parent=None ):
+	def __init__( self, sample_name, user, device_config_data, temperatures_to_measure, v_start, v_end, v_step, parent=None,
+	              temperature_timeout_s=3 * 3600.0, pads_timeout_s=60.0, data_timeout_s=600.0 ):
 		super().__init__( parent )
 		self.sample_name = sample_name
 		self.user = user
@@ -16,7 +20,7 @@ class Measurement_Loop( QtCore.QObject ):
 		self.v_start = v_start
 		self.v_end = v_end
 		self.v_step = v_step
-		self.sql_type, self.sql_conn = Connect_To_SQL( resource_path( "configuration.ini" ) )
+		self.sql_pool = Shared_SQL_Pool()
 		self.device_config_data = device_config_data
 
 		self.pads_are_reversed = False
@@ -26,24 +30,45 @@ class Measurement_Loop( QtCore.QObject ):
 		self.quit_early = False
 		self.data_collection_callback = lambda x_data, y_data : None
 
+		# Waits run a local event loop, so the ready slots are delivered and wake the wait the moment they arrive
+		self.temperature_timeout_s = temperature_timeout_s
+		self.pads_timeout_s = pads_timeout_s
+		self.data_timeout_s = data_timeout_s
+		self.wait_loop = QtCore.QEventLoop( self )
+
+	def Wait_Until( self, is_ready, timeout_s, waiting_for ):
+		# Returns True if the measurement should stop, because of Quit_Early or a timeout
+		timeout = QtCore.QTimer( self )
+		timeout.setSingleShot( True )
+		timeout.timeout.connect( self.wait_loop.quit )
+		timeout.start( int( timeout_s * 1000 ) )
+		while not (is_ready() or self.quit_early or not timeout.isActive()):
+			self.wait_loop.exec_()
+		timed_out = not timeout.isActive() and not (is_ready() or self.quit_early)
+		timeout.stop()
+		timeout.deleteLater()
+		if timed_out:
+			print( f"Timed out after {timeout_s:g} s waiting for {waiting_for}" )
+		if self.quit_early or timed_out:
+			self.Finished.emit()
+			return True
+		return False
+
+	def Wake( self ):
+		# Safe from any thread, the wait loop lives in this object's thread
+		QtCore.QMetaObject.invokeMethod( self.wait_loop, "quit", QtCore.Qt.QueuedConnection )
+
 	def Wait_For_Temp_And_Pads( self ):
-		while( not (self.temperature_ready and self.pads_ready) ):
-			if self.quit_early:
-				self.Finished.emit()
-				return True
-			time.sleep( 2 )
-			QtCore.QCoreApplication.processEvents()
+		if self.Wait_Until( lambda : self.temperature_ready, self.temperature_timeout_s, "temperature" ) or \
+		   self.Wait_Until( lambda : self.pads_ready, self.pads_timeout_s, "pads" ):
+			return True
 		self.temperature_ready = False
 		self.pads_ready = False
 		return False
 
 	def Wait_For_Data( self ):
-		while( not self.data_gathered ):
-			if self.quit_early:
-				self.Finished.emit()
-				return True
-			time.sleep( 2 )
-			QtCore.QCoreApplication.processEvents()
+		if self.Wait_Until( lambda : self.data_gathered, self.data_timeout_s, "data" ):
+			return True
 		self.data_gathered = False
 		return False
 
@@ -62,7 +87,8 @@ class Measurement_Loop( QtCore.QObject ):
 					return
 
 				print( "Starting Measurement at {} K on pads {} and {}".format( temperature, neg_pad, pos_pad ) )
-				self.data_collection_callback = lambda x_data, y_data : self.Sweep_Part_Finished( x_data, y_data, sql_type=self.sql_type, sql_conn=self.sql_conn, meta_data=meta_data )
+				sql_type, sql_conn = self.sql_pool.Get_Connection()
+				self.data_collection_callback = lambda x_data, y_data : self.Sweep_Part_Finished( x_data, y_data, sql_type=sql_type, sql_conn=sql_conn, meta_data=meta_data )
 				self.measurementRequested_signal.emit( self.v_start, self.v_end, self.v_step )
 				if self.Wait_For_Data():
 					self.Finished.emit()
@@ -74,17 +100,21 @@ class Measurement_Loop( QtCore.QObject ):
 	def Collect_Data( self, x_data, y_data ):
 		self.data_collection_callback( x_data, y_data )
 		self.data_collection_callback = lambda x_data, y_data : None
+		self.Wake()
 
 	def Pads_Ready( self, pads, is_reversed ):
 		self.pads_ready = True
 		self.pads_are_reversed = is_reversed
+		self.Wake()
 
 	def Temperature_Ready( self ):
 		self.temperature_ready = True
+		self.Wake()
 
 	def Quit_Early( self ):
 		print( "Quitting Early" )
 		self.quit_early = True
+		self.Wake()
 
 	def Sweep_Part_Finished( self, x_data, y_data, sql_type, sql_conn, meta_data ):
 		if self.pads_are_reversed:
@@ -0,0 +1,112 @@
+# Orders a temperature x device run so the dewar spends less time ramping and the switch box less time switching,
+# and estimates how long the run will take before it starts.
+
+from collections import namedtuple
+
+import numpy as np
+from rich import print
+
+
+Planner_Timing = namedtuple( "Planner_Timing", ["pad_switch_s", "ramp_rate_K_per_s", "settle_s", "restabilize_s", "point_time_s"] )
+default_timing = Planner_Timing( pad_switch_s=1.0, ramp_rate_K_per_s=0.1, settle_s=300.0, restabilize_s=30.0, point_time_s=0.05 )
+
+Measurement_Plan = namedtuple( "Measurement_Plan", ["temperatures", "device_orders"] ) # device_orders[i] is measured at temperatures[i]
+
+
+def Pad_Switch_Cost( previous, device, reversal_cost=0.5 ):
+	# One unit per pad that has to be switched in, plus a penalty when a pad kept connected changes polarity
+	if previous is None:
+		return 2.0
+	previous_pads = { previous.neg_pad, previous.pos_pad }
+	cost = float( len( { device.neg_pad, device.pos_pad } - previous_pads ) )
+	if device.neg_pad == previous.pos_pad or device.pos_pad == previous.neg_pad:
+		cost += reversal_cost
+	return cost
+
+def Path_Cost( devices, start=None, reversal_cost=0.5 ):
+	return sum( Pad_Switch_Cost( previous, device, reversal_cost ) for previous, device in zip( [start] + list( devices[:-1] ), devices ) )
+
+def Order_Devices( devices, start=None, reversal_cost=0.5, max_passes=20 ):
+	# Nearest neighbour from the currently connected pads, then 2-opt segment reversals while they shorten the path.
+	# Ties keep description file order.
+	devices = list( devices )
+	count = len( devices )
+	if count < 3:
+		return devices
+	costs = np.array( [ [ Pad_Switch_Cost( a, b, reversal_cost ) for b in devices ] for a in devices ] )
+	start_costs = np.array( [ Pad_Switch_Cost( start, device, reversal_cost ) for device in devices ] )
+
+	visited = np.zeros( count, dtype=bool )
+	order = [ int( np.argmin( start_costs ) ) ]
+	visited[ order[0] ] = True
+	for _ in range( count - 1 ):
+		next_costs = np.where( visited, np.inf, costs[ order[-1] ] )
+		order.append( int( np.argmin( next_costs ) ) )
+		visited[ order[-1] ] = True
+
+	order = np.array( order )
+	for _ in range( max_passes ):
+		improved = False
+		for i in range( count - 1 ):
+			# Reversing order[i:j+1] replaces edges (i-1, i) and (j, j+1) with (i-1, j) and (i, j+1)
+			before = start_costs[ order[i] ] if i == 0 else costs[ order[i - 1], order[i] ]
+			j = np.arange( i + 1, count )
+			removed = before + np.append( costs[ order[j[:-1]], order[j[:-1] + 1] ], 0.0 )
+			added = ( start_costs[ order[j] ] if i == 0 else costs[ order[i - 1], order[j] ] ) + np.append( costs[ order[i], order[j[:-1] + 1] ], 0.0 )
+			gain = removed - added
+			best = int( np.argmax( gain ) )
+			if gain[ best ] > 1E-9:
+				order[ i : j[best] + 1 ] = order[ i : j[best] + 1 ][::-1].copy()
+				improved = True
+		if not improved:
+			break
+	return [ devices[ i ] for i in order ]
+
+def Order_Temperatures( temperatures, current_temperature=None, reorder=False ):
+	# Visiting setpoints on a line costs the span plus the trip to whichever end comes first, so the only choice
+	# is which end is nearer. The requested order is kept unless reorder is asked for, the direction of a
+	# temperature series can matter to the measurement (hysteresis, trap filling).
+	temperatures = list( temperatures )
+	if not reorder or current_temperature is None or None in temperatures or len( temperatures ) < 2:
+		return temperatures
+	ascending = sorted( temperatures )
+	if abs( current_temperature - ascending[-1] ) < abs( current_temperature - ascending[0] ):
+		return ascending[::-1]
+	return ascending
+
+def Plan_Measurement( temperatures, devices, current_temperature=None, current_pads=None, reversal_cost=0.5, reorder_temperatures=False ):
+	# Serpentine device order, every other temperature walks the devices backwards so the device measured last
+	# at one setpoint is measured first at the next without switching pads
+	temperatures = Order_Temperatures( temperatures, current_temperature, reorder_temperatures )
+	devices = Order_Devices( devices, current_pads, reversal_cost )
+	return Measurement_Plan( temperatures, [ devices if i % 2 == 0 else devices[::-1] for i in range( len( temperatures ) ) ] )
+
+def Sweep_Point_Count( voltage_sweep_info, ac_voltage_info ):
+	v_start, v_end, v_step, _ = voltage_sweep_info
+	_, ac_frequency = ac_voltage_info
+	return len( np.arange( v_start, v_end + v_step / 2, v_step ) ) * max( 1, np.size( ac_frequency ) )
+
+def Estimate_Run_Time( plan, voltage_sweep_info, ac_voltage_info, current_temperature=None, timing=default_timing ):
+	# Dry run of the plan with nominal timings, returns seconds spent in each phase
+	step_delay = voltage_sweep_info[3]
+	sweep_s = Sweep_Point_Count( voltage_sweep_info, ac_voltage_info ) * (step_delay + timing.point_time_s)
+	estimate = dict( ramp=0.0, pad_switch=0.0, restabilize=0.0, sweep=0.0 )
+	temperature, connected = current_temperature, None
+	for setpoint, devices in zip( plan.temperatures, plan.device_orders ):
+		if setpoint is not None:
+			estimate["ramp"] += timing.settle_s + ( abs( setpoint - temperature ) / timing.ramp_rate_K_per_s if temperature is not None else 0.0 )
+			estimate["restabilize"] += timing.restabilize_s * len( devices )
+			temperature = setpoint
+		for device in devices:
+			if connected is None or (device.neg_pad, device.pos_pad) != (connected.neg_pad, connected.pos_pad):
+				estimate["pad_switch"] += timing.pad_switch_s
+			connected = device
+		estimate["sweep"] += sweep_s * len( devices )
+	return estimate
+
+def Print_Plan( plan, estimate, original_devices=None ):
+	total_s = sum( estimate.values() )
+	print( f"Planned {len(plan.temperatures)} temperatures x {len(plan.device_orders[0]) if plan.device_orders else 0} devices, "
+	       f"estimated {total_s / 3600:.2f} h (" + ", ".join( f"{phase} {seconds / 3600:.2f} h" for phase, seconds in estimate.items() ) + ")" )
+	if original_devices is not None and plan.device_orders:
+		print( f"Pad switch cost per temperature {Path_Cost( list( original_devices ) ):.1f} in file order, {Path_Cost( plan.device_orders[0] ):.1f} planned" )
@@ -0,0 +1,191 @@
+# Runs a temperature x device C-V measurement on already connected subsystems, with no GUI imports,
+# so it can be driven by CV_GUI or headless by Run_Headless.
+
+import threading
+
+import numpy as np
+from rich import print
+
+from MPL_Shared.Async_Iterator import Async_Iterator, Run_Async
+from CV_Measurement_Assistant.SQL_Write_Behind import Shared_SQL_Writer
+from CV_Measurement_Assistant.Sweep_Spool import Shared_Sweep_Spool
+from CV_Measurement_Assistant.Measurement_Planner import Plan_Measurement, Estimate_Run_Time, Print_Plan
+from CV_Measurement_Assistant.Timing_Trace import Shared_Timing_Trace
+from CV_Measurement_Assistant.CV_Analysis import Device_Area_m2
+from CV_Measurement_Assistant.Repeat_Statistics import repeat_statistics_sql_table
+from CV_Measurement_Assistant.Run_Checkpoint import Run_Checkpoint, Recipe_Hash, Remaining_Setpoints, Skip_Completed
+
+
+def Measurement_Sweep( quit_early,
+                       temp_controller, cv_controller,
+                       meta_data, temperature_info, voltage_sweep_info, ac_voltage_info, device_config_data, current_temperature=None, resume=False ):
+	Multi_Station_Sweep( quit_early, [ (temp_controller, cv_controller, meta_data, temperature_info, voltage_sweep_info,
+	                                    ac_voltage_info, device_config_data, current_temperature) ], resume )
+
+def Station_Meta_Data( meta_data, cv_controller ):
+	meta_data = dict( meta_data )
+	station_name = getattr( cv_controller, "station_name", None )
+	if station_name:
+		meta_data["measurement_setup"] = f'{meta_data.get( "measurement_setup", "" )} {station_name}'.strip()
+	return meta_data
+
+def Station_Checkpoint( cv_controller, meta_data, temperature_info, voltage_sweep_info, ac_voltage_info, device_config_data ):
+	# Checkpoints live with the spool, they only ever list sweeps the spool already holds
+	return Run_Checkpoint( Shared_Sweep_Spool().directory / "Checkpoints",
+	                       Recipe_Hash( Station_Meta_Data( meta_data, cv_controller ), temperature_info, voltage_sweep_info, ac_voltage_info, device_config_data ) )
+
+def Completed_Sweep_Count( station_runs ):
+	# Device sweeps an interrupted run of the same recipes already finished, for asking whether to resume
+	return sum( len( Station_Checkpoint( cv_controller, *run_info[:5] ).Completed() ) for _, cv_controller, *run_info in station_runs )
+
+def Multi_Station_Sweep( quit_early, station_runs, resume=False, reorder_temperatures=False ):
+	# station_runs holds Measurement_Sweep's arguments after quit_early, one tuple per analyzer. Every station sweeps
+	# on its own thread through the same spool and database writer, results are tagged with the controller's
+	# station name in measurement_setup. With resume, (temperature, device) pairs an interrupted run of the same
+	# recipe finished are skipped, otherwise the run starts over. Temperatures are measured in the requested order
+	# unless reorder_temperatures lets the planner start from the end nearest the dewar's temperature.
+	sql_writer = Shared_SQL_Writer()
+	spool = Shared_Sweep_Spool()
+	trace = Shared_Timing_Trace()
+	trace.Clear()
+	replayed = spool.Replay( sql_writer ) # Uploads sweeps left over from runs the database missed
+	if replayed:
+		print( f"Uploading {replayed} spooled sweeps from earlier runs" )
+
+	errors = []
+	def run_station( *arguments, **keywords ):
+		try:
+			Run_Measurement_Sweep( *arguments, **keywords )
+		except Exception as e:
+			errors.append( e )
+			quit_early.set() # One failed station stops the others rather than leaving them unattended
+	threads = []
+	for temp_controller, cv_controller, meta_data, *run_info in station_runs:
+		checkpoint = Station_Checkpoint( cv_controller, meta_data, *run_info[:4] )
+		if not resume:
+			checkpoint.Clear()
+		station_name = getattr( cv_controller, "station_name", None )
+		threads.append( threading.Thread( target=run_station, name=f"Measurement_Sweep {station_name or ''}".strip(),
+		                                  args=(quit_early, temp_controller, cv_controller, sql_writer, spool, Station_Meta_Data( meta_data, cv_controller ), *run_info),
+		                                  kwargs=dict( checkpoint=checkpoint, reorder_temperatures=reorder_temperatures ) ) )
+	try:
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+	finally:
+		with trace.Span( "database flush" ):
+			sql_writer.Flush() # Waits for every queued sweep to reach the database
+		trace.Finish_Run( "Measurement_Sweep" )
+	if errors:
+		raise errors[0]
+
+def Run_Measurement_Sweep( quit_early,
+                           temp_controller, cv_controller, sql_writer, spool,
+                           meta_data, temperature_info, voltage_sweep_info, ac_voltage_info, device_config_data, current_temperature=None, checkpoint=None,
+                           reorder_temperatures=False ):
+	trace = Shared_Timing_Trace()
+	station_tags = dict( station=cv_controller.station_name ) if getattr( cv_controller, "station_name", None ) else {}
+	def Device_Iterator( devices, temperature ):
+		return trace.Timed_Iterator( Async_Iterator( devices,
+		                                             temp_controller, lambda current_device, temp_controller=temp_controller : temp_controller.Set_Active_Pads( current_device.neg_pad, current_device.pos_pad ),
+		                                             temp_controller.Pads_Selected_Changed,
+		                                             quit_early ),
+		                             "pad switch", lambda item : dict( device=item[0].location ), temperature=temperature, **station_tags )
+
+	if temperature_info is None:
+		turn_off_heater = [None]
+		turn_heater_back_on = [None]
+		setpoints = [None]
+	else:
+		turn_off_heater = Async_Iterator( [None],
+		                                  temp_controller, lambda _ : temp_controller.Turn_Off(),
+		                                  temp_controller.Heater_Output_Off,
+		                                  quit_early )
+		turn_heater_back_on = Async_Iterator( [None],
+		                                      temp_controller, lambda _ : temp_controller.Turn_On(),
+		                                      temp_controller.Temperature_Stable,
+		                                      quit_early )
+		temp_start, temp_end, temp_step = temperature_info
+		setpoints = np.arange( temp_start, temp_end + temp_step / 2, temp_step )
+
+	completed = checkpoint.Completed() if checkpoint is not None else set()
+	if completed: # Resuming, the dewar goes straight to the first setpoint with devices left
+		print( f"Resuming, skipping {len(completed)} device sweeps finished by an earlier run" )
+		setpoints = Remaining_Setpoints( setpoints, device_config_data, completed )
+	plan = Skip_Completed( Plan_Measurement( setpoints, device_config_data, current_temperature=current_temperature, reorder_temperatures=reorder_temperatures ), completed )
+	Print_Plan( plan, Estimate_Run_Time( plan, voltage_sweep_info, ac_voltage_info, current_temperature ), device_config_data )
+	if temperature_info is None:
+		run_temperatures = plan.temperatures
+	else:
+		run_temperatures = Async_Iterator( plan.temperatures,
+		                                   temp_controller, temp_controller.Set_Temp_And_Turn_On,
+		                                   temp_controller.Temperature_Stable,
+		                                   quit_early )
+
+	v_start, v_end, v_step, step_delay = voltage_sweep_info
+	ac_voltage, ac_frequency = ac_voltage_info
+	frequency_sweep = np.ndim( ac_frequency ) > 0 # A list of frequencies measures the whole bias x frequency grid per device
+	meta_data.update( { "ac_amplitude_v":ac_voltage, "ac_frequency_hz":ac_frequency } )
+	if frequency_sweep:
+		get_results = Async_Iterator( [None],
+		                              cv_controller, lambda *args, v_start=v_start, v_end=v_end, v_step=v_step, ac_voltage=ac_voltage, ac_frequency=ac_frequency, step_delay=step_delay :
+		                                                    cv_controller.Voltage_Frequency_Sweep( v_start, v_end, v_step, ac_voltage, ac_frequency, step_delay ),
+		                              cv_controller.cvfSweepFinished_signal,
+		                              quit_early )
+	else:
+		get_results = Async_Iterator( [None],
+		                              cv_controller, lambda *args, v_start=v_start, v_end=v_end, v_step=v_step, ac_voltage=ac_voltage, ac_frequency=ac_frequency, step_delay=step_delay :
+		                                                    cv_controller.Voltage_Sweep( v_start, v_end, v_step, ac_voltage, ac_frequency, step_delay ),
+		                              cv_controller.sweepFinished_signal,
+		                              quit_early )
+
+	# for temperature in run_temperatures:
+	# 	for device, pads_info in run_devices:
+	# 		for _ in turn_heater_back_on:
+	# Each temperature gets its own device iterator, the plan walks the devices in alternating directions
+	# Every wait is timed, the spans say whether an overnight run went to ramps, pad switching, sweeps or the database
+	timed_temperatures = trace.Timed_Iterator( run_temperatures, "temperature wait", lambda temperature : dict( temperature=temperature ), **station_tags )
+	timed_heater_on = lambda : trace.Timed_Iterator( turn_heater_back_on, "heater restabilize", **station_tags )
+	for temperature, (device, pads_info), _ in ((x,y,z) for i, x in enumerate( timed_temperatures ) for y in Device_Iterator( plan.device_orders[i], x ) for z in timed_heater_on() ):
+		meta_data.update( dict( temperature_in_k=temperature, device_location=device.location, device_side_length_in_um=device.side ) )
+		tags = dict( device=device.location, temperature=temperature, **station_tags )
+		cv_controller.trace_tags = tags # The controller tags its own phase spans with the device being swept
+		cv_controller.device_type = f"{device.side} um" # Devices of one size share a calibrated aperture
+		cv_controller.device_area_m2 = Device_Area_m2( device.side ) # Sent with the finished sweep so its doping profile can be computed
+		cv_controller.temperature_k = np.nan if temperature is None else temperature
+		(neg_pad, pos_pad), pads_are_reversed = pads_info
+		print( f"Starting Measurement for {device.location} side length {device.side} at {temperature} K on pads {neg_pad} and {pos_pad}" )
+
+		for _, xy_data in ((x,y) for x in trace.Timed_Iterator( turn_off_heater, "heater off", **tags ) for y in trace.Timed_Iterator( get_results, "sweep", **tags ) ):
+			if quit_early.is_set(): # A stopped sweep only holds partial data
+				break
+			if frequency_sweep: # Every frequency of the grid is committed together once the whole grid is measured
+				results = zip( ac_frequency, cv_controller.last_frequency_results )
+			else:
+				results = [ (ac_frequency, cv_controller.last_result) ] # Full record behind the xy_data payload
+			commit_group = []
+			for frequency, result in results:
+				meta_data.update( ac_frequency_hz=frequency )
+				if pads_are_reversed:
+					result = result.Reversed()
+				commit_group.append( (result, dict( xy_data_sql_table="cv_raw_data", xy_sql_labels=("voltage_v","capacitance_f"),
+				                                    metadata_sql_table="cv_measurements", **meta_data )) )
+			repeat_summary = None if frequency_sweep else cv_controller.last_repeat_summary
+			with trace.Span( "spool", **tags ):
+				spool.Commit_Group( sql_writer, commit_group ) # Safe on local disk, then queued so the next pad switch starts without waiting on the database
+				if repeat_summary is not None: # cv_raw_data holds the mean, the spread is its own group so a statistics failure never holds the mean back
+					std, count = repeat_summary.std, repeat_summary.count
+					if pads_are_reversed:
+						std, count = std.Reversed(), count[::-1]
+					spool.Commit_Group( sql_writer, [ (std, dict( statistics_sql_table=repeat_statistics_sql_table, sample_count=count.tolist(),
+					                                              repeat_count=repeat_summary.sweeps, measured_at_s=float( std.time_s[0] ) if len( std.time_s ) else None,
+					                                              **meta_data )) ] )
+			if checkpoint is not None:
+				checkpoint.Mark_Completed( temperature, device.location )
+
+	test1 = Run_Async( temp_controller, lambda : temp_controller.Make_Safe() ); test1.Run()
+	if checkpoint is not None and not quit_early.is_set(): # Finished, running the recipe again starts a new campaign
+		checkpoint.Clear()
+
+	print( "Finished Measurment" )
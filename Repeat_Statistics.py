@@ -0,0 +1,85 @@
+# Streaming per bias point statistics over repeated sweeps, Welford's update so no repeat has to be kept.
+
+from collections import namedtuple
+
+import numpy as np
+
+
+# Two sided 95% Student t critical values for 1 to 30 degrees of freedom
+t_critical_95 = np.array( [ 12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                            2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                            2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042 ] )
+
+Repeat_Summary = namedtuple( "Repeat_Summary", ["mean", "std", "count", "sweeps"] ) # Sweep_Results of mean and std, per point count, sweeps taken
+
+
+def T_Critical_95( degrees_of_freedom ):
+	degrees_of_freedom = np.asarray( degrees_of_freedom )
+	table_value = t_critical_95[ np.clip( degrees_of_freedom, 1, len(t_critical_95) ) - 1 ]
+	# Past the table t falls off roughly as 1/dof towards the normal 1.96
+	return np.where( degrees_of_freedom > len(t_critical_95), 1.96 + (t_critical_95[-1] - 1.96) * len(t_critical_95) / np.maximum( degrees_of_freedom, 1 ), table_value )
+
+
+class Running_Statistics:
+	def __init__( self, point_count ):
+		self.count = np.zeros( point_count, dtype=np.int64 )
+		self.mean = np.zeros( point_count )
+		self.m2 = np.zeros( point_count ) # Sum of squared differences from the mean
+
+	def Add( self, values ):
+		# Unparsable (NaN) points are left out of that point's statistics
+		values = np.asarray( values, dtype=float )
+		valid = np.isfinite( values )
+		self.count[ valid ] += 1
+		delta = values[ valid ] - self.mean[ valid ]
+		self.mean[ valid ] += delta / self.count[ valid ]
+		self.m2[ valid ] += delta * (values[ valid ] - self.mean[ valid ])
+
+	def Mean( self ):
+		return np.where( self.count > 0, self.mean, np.nan )
+
+	def Std( self ):
+		with np.errstate( divide='ignore', invalid='ignore' ):
+			return np.where( self.count > 1, np.sqrt( self.m2 / (self.count - 1) ), np.nan )
+
+	def Relative_Half_Width( self ):
+		# Half width of the 95% confidence interval on the mean, relative to the mean
+		with np.errstate( divide='ignore', invalid='ignore' ):
+			return T_Critical_95( self.count - 1 ) * self.Std() / np.sqrt( self.count ) / np.abs( self.Mean() )
+
+	def Is_Converged( self, relative_target, min_count=3 ):
+		measured = self.count > 0
+		if not np.any( measured ) or np.any( self.count[ measured ] < max( min_count, 2 ) ):
+			return False
+		return bool( np.all( self.Relative_Half_Width()[ measured ] <= relative_target ) )
+
+
+# Companion table for repeated sweeps, cv_raw_data holds the mean through Commit_XY_Data_To_SQL and the spread goes
+# here, one row per bias point keyed by the same sweep metadata. The writer creates it the first time statistics are written.
+repeat_statistics_sql_table = "cv_repeat_statistics"
+repeat_statistics_columns = ( ("sample_name", "VARCHAR(255)"), ("user", "VARCHAR(255)"), ("measurement_setup", "VARCHAR(255)"),
+                              ("device_location", "VARCHAR(255)"), ("device_side_length_in_um", "DOUBLE"), ("temperature_in_k", "DOUBLE"),
+                              ("ac_amplitude_v", "DOUBLE"), ("ac_frequency_hz", "DOUBLE"), ("repeat_count", "INTEGER"), ("measured_at_s", "DOUBLE"),
+                              ("voltage_v", "DOUBLE"), ("capacitance_std_f", "DOUBLE"), ("sample_count", "INTEGER") )
+
+def Create_Repeat_Statistics_Table( sql_conn ):
+	from PyQt5 import QtSql
+	query = QtSql.QSqlQuery( sql_conn )
+	columns = ", ".join( f"{name} {sql_type}" for name, sql_type in repeat_statistics_columns )
+	if not query.exec_( f"CREATE TABLE IF NOT EXISTS {repeat_statistics_sql_table} ( {columns} )" ):
+		raise RuntimeError( f"Creating {repeat_statistics_sql_table} failed: {query.lastError().text()}" )
+
+def Commit_Repeat_Statistics_To_SQL( sql_type, sql_conn, statistics_sql_table, x_data, y_data, sample_count, **meta_data ):
+	# Same calling convention as Commit_XY_Data_To_SQL, y_data is the standard deviation and sample_count the repeats
+	# that measured each bias point. Metadata the table has no column for is left out.
+	from PyQt5 import QtSql
+	names = [ name for name, _ in repeat_statistics_columns ]
+	point_columns = dict( voltage_v=list( map( float, x_data ) ),
+	                      capacitance_std_f=[ float(x) if np.isfinite( x ) else None for x in y_data ], # Single sample points have no spread
+	                      sample_count=list( map( int, sample_count ) ) )
+	query = QtSql.QSqlQuery( sql_conn )
+	query.prepare( f"INSERT INTO {statistics_sql_table} ( {', '.join( names )} ) VALUES ( {', '.join( '?' * len( names ) )} )" )
+	for name in names:
+		query.addBindValue( point_columns[ name ] if name in point_columns else [ meta_data.get( name ) ] * len( x_data ) )
+	if not query.execBatch():
+		raise RuntimeError( f"Writing {statistics_sql_table} failed: {query.lastError().text()}" )
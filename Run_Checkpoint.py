@@ -0,0 +1,52 @@
+# Remembers which (temperature, device) sweeps of a measurement recipe are safely spooled, so a run that was stopped,
+# crashed or lost the instrument can pick up where it left off instead of repeating ramps and sweeps.
+
+import hashlib
+import json
+import pathlib
+import threading
+
+from CV_Measurement_Assistant.Sweep_Spool import Append_Lines, Read_Json_Lines, To_Json
+from CV_Measurement_Assistant.Measurement_Planner import Measurement_Plan
+
+
+def Recipe_Hash( meta_data, temperature_info, voltage_sweep_info, ac_voltage_info, device_config_data ):
+	# Any change to what is measured, or on which station (named in measurement_setup), starts a fresh checkpoint
+	recipe = dict( meta_data=meta_data, temperature_info=temperature_info, voltage_sweep_info=voltage_sweep_info, ac_voltage_info=ac_voltage_info,
+	               devices=[ (device.location, device.neg_pad, device.pos_pad, device.side) for device in device_config_data ] )
+	return hashlib.sha256( json.dumps( recipe, sort_keys=True, default=To_Json ).encode() ).hexdigest()[:16]
+
+
+class Run_Checkpoint:
+	# One append only JSON lines file per recipe, a line is written once a device's sweeps at a temperature are spooled
+	def __init__( self, directory, recipe_hash ):
+		self.path = pathlib.Path( directory ) / f"{recipe_hash}.jsonl"
+		self.lock = threading.Lock()
+
+	@staticmethod
+	def Key( temperature, device_location ):
+		return ( None if temperature is None else round( float( temperature ), 3 ), str( device_location ) )
+
+	def Completed( self ):
+		return set( self.Key( entry["temperature_in_k"], entry["device_location"] ) for entry in Read_Json_Lines( self.path ) )
+
+	def Mark_Completed( self, temperature, device_location ):
+		temperature, device_location = self.Key( temperature, device_location )
+		with self.lock:
+			self.path.parent.mkdir( parents=True, exist_ok=True )
+			Append_Lines( self.path, [ json.dumps( dict( temperature_in_k=temperature, device_location=device_location ) ) ] )
+
+	def Clear( self ):
+		with self.lock:
+			if self.path.exists():
+				self.path.unlink()
+
+
+def Remaining_Setpoints( setpoints, devices, completed ):
+	# Setpoints with every device done are dropped, so a resumed run never ramps to them
+	return [ setpoint for setpoint in setpoints if any( Run_Checkpoint.Key( setpoint, device.location ) not in completed for device in devices ) ]
+
+def Skip_Completed( plan, completed ):
+	device_orders = [ [ device for device in devices if Run_Checkpoint.Key( temperature, device.location ) not in completed ]
+	                  for temperature, devices in zip( plan.temperatures, plan.device_orders ) ]
+	return Measurement_Plan( plan.temperatures, device_orders )
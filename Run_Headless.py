@@ -0,0 +1,177 @@
+# Runs a measurement sweep from a recipe file with no GUI, for unattended runs on headless lab machines.
+# Run with: python -m CV_Measurement_Assistant.Run_Headless recipe.ini [station2_recipe.ini ...] [--configuration configuration.ini] [--dry-run] [--resume]
+
+import argparse
+import configparser
+import pathlib
+import signal
+import sys
+import threading
+
+import numpy as np
+from PyQt5 import QtCore
+from rich import print
+
+
+def Read_Recipe( recipe_file ):
+	# Returns Measurement_Sweep's arguments after the subsystems: meta_data, temperature_info, voltage_sweep_info,
+	# ac_voltage_info, the device description file path and the station to run on (None for the primary analyzer)
+	recipe = configparser.ConfigParser()
+	if not recipe.read( recipe_file ):
+		raise ValueError( f"Could not read recipe: {recipe_file}" )
+	section = recipe["Recipe"]
+	meta_data = dict( sample_name=section["sample_name"], user=section["user"], measurement_setup=section.get( "measurement_setup", "LN2 Dewar" ) )
+	if not meta_data["sample_name"] or not meta_data["user"]:
+		raise ValueError( "Recipe must give a sample_name and user" )
+
+	if section.get( "start_t", "" ).strip():
+		temperature_info = ( section.getfloat( "start_t" ), section.getfloat( "end_t" ), section.getfloat( "step_t" ) )
+	else:
+		temperature_info = None # Measure at whatever temperature the dewar is at
+	voltage_sweep_info = ( section.getfloat( "start_v" ), section.getfloat( "end_v" ), section.getfloat( "step_v" ), section.getfloat( "step_delay", 0.5 ) )
+	ac_frequencies = [ float(x) for x in section["ac_frequency_hz"].split( ',' ) ]
+	ac_voltage_info = ( section.getfloat( "ac_voltage_v" ), ac_frequencies[0] if len( ac_frequencies ) == 1 else ac_frequencies )
+	device_file = pathlib.Path( recipe_file ).parent / section["device_file"]
+	station = section.get( "station", "" ).strip() or None
+	return meta_data, temperature_info, voltage_sweep_info, ac_voltage_info, device_file, station
+
+def Wait_For_Connections( subsystems, timeout_s ):
+	# Subsystems connect on their own threads, a local event loop waits for each to report Device_Connected
+	loop = QtCore.QEventLoop()
+	waiting = set( subsystems )
+	def connected( subsystem ):
+		waiting.discard( subsystem )
+		if not waiting:
+			loop.quit()
+	for subsystem in subsystems:
+		subsystem.Device_Connected.connect( lambda *args, subsystem=subsystem : connected( subsystem ), QtCore.Qt.QueuedConnection )
+	QtCore.QTimer.singleShot( int( timeout_s * 1000 ), loop.quit )
+	return waiting, loop
+
+def Start_Subsystem( subsystem ):
+	thread = QtCore.QThread()
+	subsystem.moveToThread( thread )
+	thread.started.connect( subsystem.thread_start )
+	thread.start()
+	return thread
+
+def Make_Station_Controllers( recipe_stations, configuration_file ):
+	# The primary analyzer and dewar come from configuration_file itself, other stations from its [CV_Stations] list
+	from MPL_Shared.Temperature_Controller import Temperature_Controller
+	from CV_Measurement_Assistant.CV_Box_Controller import CV_Controller, Configured_Stations
+
+	stations = { station.name : station for station in Configured_Stations( configuration_file ) }
+	controllers = {}
+	for name in dict.fromkeys( recipe_stations ):
+		if name is None:
+			controllers[ name ] = ( Temperature_Controller( configuration_file ), CV_Controller( configuration_file ) )
+			continue
+		if name not in stations:
+			raise ValueError( f"Station {name} is not listed in [CV_Stations] of {configuration_file}" )
+		if stations[ name ].temperature_configuration is None:
+			raise ValueError( f"Station {name} needs its own temperature controller configuration to run alongside other stations" )
+		controllers[ name ] = ( Temperature_Controller( stations[ name ].temperature_configuration ),
+		                        CV_Controller( configuration_file, address=stations[ name ].address, station_name=name ) )
+	return controllers
+
+def Run_Headless( recipe_files, configuration_file, spool_directory, trace_directory=None, dry_run=False, connect_timeout_s=60.0, current_temperature=None, resume=False,
+                  reorder_temperatures=False ):
+	# One recipe per analyzer, all stations measure at the same time
+	from MPL_Shared.Pad_Description_File import Get_Device_Description_File
+	from CV_Measurement_Assistant.Measurement_Planner import Plan_Measurement, Estimate_Run_Time, Print_Plan
+
+	recipes = []
+	for recipe_file in recipe_files:
+		meta_data, temperature_info, voltage_sweep_info, ac_voltage_info, device_file, station = Read_Recipe( recipe_file )
+		recipes.append( (station, meta_data, temperature_info, voltage_sweep_info, ac_voltage_info, Get_Device_Description_File( str( device_file ) )) )
+	if len( set( station for station, *_ in recipes ) ) != len( recipes ):
+		raise ValueError( "Each recipe must run on a different station" )
+	if dry_run:
+		for station, meta_data, temperature_info, voltage_sweep_info, ac_voltage_info, device_config_data in recipes:
+			setpoints = [None] if temperature_info is None else np.arange( temperature_info[0], temperature_info[1] + temperature_info[2] / 2, temperature_info[2] )
+			plan = Plan_Measurement( setpoints, device_config_data, current_temperature=current_temperature, reorder_temperatures=reorder_temperatures )
+			print( f"Station {station or 'primary'}, sample {meta_data['sample_name']}" )
+			Print_Plan( plan, Estimate_Run_Time( plan, voltage_sweep_info, ac_voltage_info, current_temperature ), device_config_data )
+		return 0
+
+	from CV_Measurement_Assistant.Measurement_Sweep import Multi_Station_Sweep, Completed_Sweep_Count
+	from CV_Measurement_Assistant.SQL_Connection_Pool import Shared_SQL_Pool
+	from CV_Measurement_Assistant.Sweep_Spool import Shared_Sweep_Spool
+	from CV_Measurement_Assistant.Timing_Trace import Shared_Timing_Trace
+
+	app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication( sys.argv[:1] )
+	Shared_SQL_Pool( configuration_file ).Get_Connection() # Fail before any hardware moves if the database is misconfigured
+	Shared_Sweep_Spool( spool_directory )
+	Shared_Timing_Trace( trace_directory )
+	controllers = Make_Station_Controllers( [ station for station, *_ in recipes ], configuration_file )
+	subsystems = [ subsystem for pair in controllers.values() for subsystem in pair ]
+	quit_early = threading.Event()
+	errors = []
+	def stop_on_error( error ):
+		# A subsystem that lost its instrument never finishes the request being waited on, so the run is stopped instead
+		print( f"[red]Error during measurement: {error}[/red]" )
+		errors.append( error )
+		quit_early.set()
+		for _, cv_controller in controllers.values():
+			cv_controller.Stop_Sweep()
+	for subsystem in subsystems:
+		if hasattr( subsystem, "Error_signal" ):
+			subsystem.Error_signal.connect( stop_on_error, QtCore.Qt.QueuedConnection )
+	waiting, connect_loop = Wait_For_Connections( subsystems, connect_timeout_s )
+	threads = [ Start_Subsystem( subsystem ) for subsystem in subsystems ] # Every analyzer and dewar gets its own thread
+	connect_loop.exec_()
+
+	exit_code = 0
+	if waiting:
+		print( f"[red]Timed out after {connect_timeout_s:g} s waiting for: {', '.join( type( subsystem ).__name__ for subsystem in waiting )}[/red]" )
+		exit_code = 1
+	else:
+		def stop( *args ):
+			print( "Stopping after the current sweep" )
+			quit_early.set()
+			for _, cv_controller in controllers.values():
+				cv_controller.Stop_Sweep()
+		signal.signal( signal.SIGINT, stop )
+		# Python only runs signal handlers between bytecodes, a timer keeps the interpreter ticking during app.exec_()
+		keep_alive = QtCore.QTimer()
+		keep_alive.timeout.connect( lambda : None )
+		keep_alive.start( 200 )
+
+		station_runs = [ (*controllers[ station ], meta_data, temperature_info, voltage_sweep_info, ac_voltage_info, device_config_data, current_temperature)
+		                 for station, meta_data, temperature_info, voltage_sweep_info, ac_voltage_info, device_config_data in recipes ]
+		completed_count = Completed_Sweep_Count( station_runs )
+		if completed_count and not resume:
+			print( f"[yellow]Starting over, an interrupted run of these recipes finished {completed_count} device sweeps, --resume skips them[/yellow]" )
+		def run_sweep():
+			try:
+				Multi_Station_Sweep( quit_early, station_runs, resume, reorder_temperatures )
+			finally:
+				QtCore.QMetaObject.invokeMethod( app, "quit", QtCore.Qt.QueuedConnection )
+		sweep_thread = threading.Thread( target=run_sweep, name="Multi_Station_Sweep" )
+		sweep_thread.start()
+		app.exec_()
+		sweep_thread.join()
+		exit_code = 1 if quit_early.is_set() or errors else 0
+
+	for thread in threads:
+		thread.quit()
+		thread.wait()
+	for subsystem in subsystems:
+		subsystem.thread_stop()
+	return exit_code
+
+
+if __name__ == "__main__":
+	this_files_directory = pathlib.Path( __file__ ).parent.resolve()
+	parser = argparse.ArgumentParser( description="Run a C-V measurement sweep from a recipe without the GUI" )
+	parser.add_argument( "recipes", nargs="+", help="Recipe .ini files with a [Recipe] section, see recipe.ini, one per station" )
+	parser.add_argument( "--configuration", default=str( this_files_directory / "configuration.ini" ), help="Instrument and database configuration" )
+	parser.add_argument( "--spool", default=str( this_files_directory / "Sweep Spool" ), help="Local sweep spool directory" )
+	parser.add_argument( "--traces", default=str( this_files_directory / "Timing Traces" ), help="Directory for per run timing traces" )
+	parser.add_argument( "--dry-run", action="store_true", help="Print the planned order and time estimate, then exit" )
+	parser.add_argument( "--connect-timeout", type=float, default=60.0, help="Seconds to wait for the instruments to connect" )
+	parser.add_argument( "--resume", action="store_true", help="Skip sweeps an interrupted run of the same recipes already finished" )
+	parser.add_argument( "--reorder-temperatures", action="store_true", help="Start from whichever end of the temperature range is nearer the current temperature" )
+	parser.add_argument( "--current-temperature", type=float, default=None, help="Present dewar temperature in K, for planning" )
+	args = parser.parse_args()
+	sys.exit( Run_Headless( args.recipes, args.configuration, args.spool, args.traces, args.dry_run, args.connect_timeout, args.current_temperature, args.resume, args.reorder_temperatures ) )
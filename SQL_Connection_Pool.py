@@ -0,0 +1,55 @@
+import threading
+import time
+
+from MPL_Shared.SQL_Controller import Connect_To_SQL
+
+
+def Connection_Is_Alive( sql_type, sql_conn ):
+	if sql_conn is None:
+		return False
+	if hasattr( sql_conn, "isOpen" ): # QtSql.QSqlDatabase
+		if not sql_conn.isOpen():
+			return False
+		from PyQt5 import QtSql
+		return QtSql.QSqlQuery( sql_conn ).exec_( "SELECT 1" )
+	if hasattr( sql_conn, "is_connected" ): # DB-API style connectors
+		return sql_conn.is_connected()
+	return True
+
+
+class SQL_Connection_Pool:
+	# Hands out one lazily opened connection per thread, since database connections can not be shared between threads.
+	# A connection idle for longer than ping_interval_s is checked before reuse and reopened if the server dropped it.
+	def __init__( self, configuration_file, ping_interval_s=60.0 ):
+		self.configuration_file = configuration_file
+		self.ping_interval_s = ping_interval_s
+		self.connections = {} # thread id -> [sql_type, sql_conn, last used time]
+		self.lock = threading.Lock()
+
+	def Get_Connection( self, config_error_popup=None ):
+		thread_id = threading.get_ident()
+		with self.lock:
+			connection = self.connections.get( thread_id )
+		now = time.monotonic()
+		if connection is not None:
+			sql_type, sql_conn, last_used = connection
+			if now - last_used < self.ping_interval_s or Connection_Is_Alive( sql_type, sql_conn ):
+				connection[2] = now
+				return sql_type, sql_conn
+
+		sql_type, sql_conn = Connect_To_SQL( self.configuration_file, config_error_popup=config_error_popup )
+		with self.lock:
+			self.connections[ thread_id ] = [sql_type, sql_conn, now]
+		return sql_type, sql_conn
+
+
+shared_pool = None
+
+def Shared_SQL_Pool( configuration_file=None ):
+	# The first caller, normally application startup, sets which configuration file is used
+	global shared_pool
+	if shared_pool is None:
+		if configuration_file is None:
+			raise ValueError( "Shared SQL pool must first be created with a configuration file" )
+		shared_pool = SQL_Connection_Pool( configuration_file )
+	return shared_pool
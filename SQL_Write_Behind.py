@@ -0,0 +1,126 @@
+import queue
+import threading
+
+from rich import print
+
+from MPL_Shared.SQL_Controller import Commit_XY_Data_To_SQL
+from CV_Measurement_Assistant.SQL_Connection_Pool import Shared_SQL_Pool
+from CV_Measurement_Assistant.Repeat_Statistics import Commit_Repeat_Statistics_To_SQL, Create_Repeat_Statistics_Table
+from CV_Measurement_Assistant.Timing_Trace import Shared_Timing_Trace
+
+
+class SQL_Write_Behind:
+	# Commits sweeps on its own thread so the measurement never waits on a database round trip.
+	# Every sweep waiting when the thread wakes up is written in one transaction.
+	def __init__( self, connect, max_queued_sweeps=64, max_batch_sweeps=16 ):
+		self.connect = connect # Called on the writer thread before each batch, database connections are not shared between threads
+		self.queue = queue.Queue( maxsize=max_queued_sweeps )
+		self.max_batch_sweeps = max_batch_sweeps
+		self.failed_commits = []
+		self.statistics_table_connection = None # Connection the repeat statistics table was last checked on
+		self.thread = threading.Thread( target=self.Run, name="SQL_Write_Behind", daemon=True )
+		self.thread.start()
+
+	def Commit_XY_Data( self, **commit_arguments ):
+		# Takes the arguments of Commit_XY_Data_To_SQL, without the connection
+		self.Commit_Group( [commit_arguments] )
+
+	def Commit_Group( self, group, on_committed=None, on_failed=None ):
+		# Sweeps in a group are always written in the same transaction, blocks only while the queue is full.
+		# The callbacks run on the writer thread once the group's transaction has succeeded or failed.
+		self.queue.put( ( [ dict( commit_arguments ) for commit_arguments in group ], on_committed, on_failed ) )
+
+	def Flush( self ):
+		self.queue.join()
+		self.Report_Failures()
+
+	def Close( self ):
+		self.queue.put( None )
+		self.thread.join()
+		self.Report_Failures()
+
+	def Report_Failures( self ):
+		if self.failed_commits:
+			print( f"[red]{len(self.failed_commits)} queued commits could not be written to the database[/red]" )
+			self.failed_commits.clear()
+
+	def Run( self ):
+		while True:
+			batch = [ self.queue.get() ]
+			while batch[-1] is not None and len( batch ) < self.max_batch_sweeps:
+				try:
+					batch.append( self.queue.get_nowait() )
+				except queue.Empty:
+					break
+			self.Commit_Batch( [ group for group in batch if group is not None ] )
+			for _ in batch:
+				self.queue.task_done()
+			if batch[-1] is None:
+				return
+
+	def Commit_Batch( self, batch ):
+		if not batch:
+			return
+		errors, rolled_back = self.Try_Commit( batch )
+		if rolled_back and len( batch ) > 1:
+			# One bad group must not hold back the rest of the batch, each group is retried in its own transaction
+			errors = [ self.Try_Commit( [entry] )[0][0] for entry in batch ]
+		for (group, on_committed, on_failed), error in zip( batch, errors ):
+			if error is not None:
+				print( f"[red]Database commit failed: {error}[/red]" )
+				self.failed_commits.append( group )
+			callback = on_committed if error is None else on_failed
+			if callback is not None:
+				callback()
+
+	def Try_Commit( self, batch ):
+		# Writes every group of the batch in one transaction, returns an exception or None per group and whether the
+		# batch was rolled back. Without transactions each group stands on its own, so the groups written before a
+		# failure are reported as committed and never replayed into duplicates.
+		errors = [ None ] * len( batch )
+		in_transaction = False
+		try:
+			with Shared_Timing_Trace().Span( "database commit", sweeps=sum( len( group ) for group, _, _ in batch ) ):
+				sql_type, sql_conn = self.connect()
+				if any( "statistics_sql_table" in commit_arguments for group, _, _ in batch for commit_arguments in group ):
+					self.Prepare_Statistics_Table( sql_conn )
+				in_transaction = hasattr( sql_conn, "transaction" ) and sql_conn.transaction()
+				for index, (group, _, _) in enumerate( batch ):
+					try:
+						for commit_arguments in group:
+							if "statistics_sql_table" in commit_arguments:
+								Commit_Repeat_Statistics_To_SQL( sql_type, sql_conn, **commit_arguments )
+							else:
+								Commit_XY_Data_To_SQL( sql_type, sql_conn, **commit_arguments )
+					except Exception as e:
+						if in_transaction:
+							raise
+						errors[ index ] = e
+				if in_transaction:
+					sql_conn.commit()
+		except Exception as e:
+			if in_transaction:
+				sql_conn.rollback()
+			return [ e ] * len( batch ), bool( in_transaction )
+		return errors, False
+
+	def Prepare_Statistics_Table( self, sql_conn ):
+		# Created the first time repeat statistics are written, before the batch's transaction since DDL commits implicitly
+		# on MySQL. If it can not be created the statistics inserts fail on their own and only those groups are kept back.
+		if sql_conn is None or sql_conn is self.statistics_table_connection or not hasattr( sql_conn, "isOpen" ):
+			return
+		try:
+			Create_Repeat_Statistics_Table( sql_conn )
+			self.statistics_table_connection = sql_conn
+		except Exception as e:
+			print( f"[yellow]{e}[/yellow]" )
+
+
+shared_writer = None
+
+def Shared_SQL_Writer():
+	# One long lived writer on the shared connection pool, so starting a run does not pay connection setup again
+	global shared_writer
+	if shared_writer is None or not shared_writer.thread.is_alive():
+		shared_writer = SQL_Write_Behind( Shared_SQL_Pool().Get_Connection )
+	return shared_writer
@@ -0,0 +1,162 @@
+# Stand-in for a Keysight E4980 on the VISA bus, so CV_Controller can be run and benchmarked without hardware.
+# Models bus latency and transfer rate, trigger delay, per point integration time and measurement noise.
+
+import numpy as np
+import time
+
+
+def Simulated_CV_Curve( bias_voltages, frequency=1E5, zero_bias_capacitance_F=150E-12, built_in_voltage_V=0.7 ):
+	# Abrupt junction style depletion capacitance, C = C0 / sqrt( 1 - V / Vbi ), clamped in forward bias
+	v = np.minimum( np.asarray( bias_voltages, dtype=float ), 0.9 * built_in_voltage_V )
+	trap_response = 1 + 0.2 / (1 + (frequency / 1E4)**2) # Slow traps only follow low frequencies
+	capacitance_F = trap_response * zero_bias_capacitance_F / np.sqrt( 1 - v / built_in_voltage_V )
+	Q = 20 + 5 * np.tanh( v )
+	return capacitance_F, Q
+
+
+# Enough of IEEE 488.2 block handling to stand in for pyvisa.util, the simulator must not import pyvisa
+def To_IEEE_Block( values ):
+	payload = np.asarray( values, dtype='>f8' ).tobytes() # Instrument always sends big endian float64
+	length = str( len( payload ) )
+	return f"#{len(length)}{length}".encode() + payload
+
+def From_IEEE_Block( block, datatype='f', is_big_endian=False ):
+	digit_count = int( block[1:2] )
+	start = 2 + digit_count
+	payload = block[ start : start + int( block[2:start] ) ]
+	return np.frombuffer( payload, dtype=('>' if is_big_endian else '<') + datatype )
+
+
+class Simulated_E4980:
+	# Approximate E4980 measurement time and relative noise for each :APERTURE mode at one averaging count
+	integration_time_s = { "SHORT" : 5.6E-3, "MEDIUM" : 88E-3, "LONG" : 220E-3 }
+	relative_noise = { "SHORT" : 2E-3, "MEDIUM" : 5E-4, "LONG" : 2E-4 }
+
+	def __init__( self, bus_latency_s=2E-3, bus_bytes_per_second=250E3, time_scale=1.0, noise=True,
+	              zero_bias_capacitance_F=150E-12, built_in_voltage_V=0.7, seed=0 ):
+		self.bus_latency_s = bus_latency_s # Fixed cost of every write or query on the bus
+		self.bus_bytes_per_second = bus_bytes_per_second
+		self.time_scale = time_scale # 0 runs instantly, 1 runs in real time
+		self.noise = noise
+		self.zero_bias_capacitance_F = zero_bias_capacitance_F
+		self.built_in_voltage_V = built_in_voltage_V
+		self.random = np.random.default_rng( seed )
+		self.timeout = 2000
+		self.command_log = []
+		self.Reset()
+
+	def Reset( self ):
+		self.transfer_format = "ASCII"
+		self.display_page = "MEASUREMENT"
+		self.frequency = 1E3
+		self.trigger_delay_s = 0.0
+		self.aperture = ("MEDIUM", 1)
+		self.bias_voltage = 0.0
+		self.bias_list = np.array( [] )
+		self.measured_results = np.zeros( 4 )
+		self.measurement_done_time = 0.0
+
+	def Wait( self, seconds ):
+		if self.time_scale > 0 and seconds > 0:
+			time.sleep( seconds * self.time_scale )
+
+	def Bus_Transfer( self, number_of_bytes ):
+		self.Wait( self.bus_latency_s + number_of_bytes / self.bus_bytes_per_second )
+
+	def clear( self ):
+		self.Bus_Transfer( 0 )
+
+	def close( self ):
+		pass
+
+	def write( self, message ):
+		self.Bus_Transfer( len(message) )
+		self.command_log.append( message )
+		for command in message.split( ';' ):
+			self.Handle_Command( command.strip() )
+
+	def query( self, message ):
+		self.Bus_Transfer( len(message) )
+		if message.upper() == "*IDN?":
+			return "Keysight Technologies,E4980A,SIMULATED,A.02.20"
+		if message.upper() in (":SYSTEM:ERROR?", ":SYST:ERR?"):
+			return '+0,"No error"'
+		raise ValueError( f"Unsupported query: {message}" )
+
+	def Handle_Command( self, command ):
+		header, _, arguments = command.partition( ' ' )
+		header = header.upper()
+		if header == "*RST":
+			self.Reset()
+		elif header in (":FORMAT", ":FORMAT:DATA"):
+			self.transfer_format = arguments.split( ',' )[0].strip().upper()
+		elif header == ":DISPLAY:PAGE":
+			self.display_page = arguments.strip().upper()
+		elif header == ":FREQUENCY":
+			self.frequency = float( arguments )
+		elif header == ":TRIGGER:DELAY":
+			self.trigger_delay_s = float( arguments )
+		elif header == ":APERTURE":
+			mode, _, averaging = arguments.partition( ',' )
+			mode = next( name for name in self.integration_time_s if name.startswith( mode.strip().upper()[:3] ) )
+			self.aperture = (mode, int( averaging ) if averaging else 1)
+		elif header == ":BIAS:VOLTAGE":
+			self.bias_voltage = float( arguments )
+		elif header == ":LIST:BIAS:VOLTAGE":
+			self.bias_list = np.array( [float(x) for x in arguments.split( ',' )] )
+		elif header == ":TRIGGER:IMMEDIATE":
+			self.Trigger()
+
+	def Point_Measurement_Time( self ):
+		mode, averaging = self.aperture
+		return self.trigger_delay_s + averaging * (self.integration_time_s[ mode ] + 2 / self.frequency) # Low frequencies need a few periods
+
+	def Trigger( self ):
+		# On the list sweep page every list point is measured, otherwise just the single present bias
+		bias_voltages = self.bias_list if self.display_page == "LIST" else np.array( [self.bias_voltage] )
+		capacitance_F, Q = Simulated_CV_Curve( bias_voltages, self.frequency, self.zero_bias_capacitance_F, self.built_in_voltage_V )
+		if self.noise:
+			mode, averaging = self.aperture
+			sigma_F = self.relative_noise[ mode ] * capacitance_F + 5E-15 # Fixed floor makes small devices relatively noisier
+			capacitance_F = capacitance_F + self.random.normal( 0, 1, len(capacitance_F) ) * sigma_F / np.sqrt( averaging )
+		status = np.zeros_like( capacitance_F )
+		if self.display_page == "LIST": # Each list point ends in its comparator IN/OUT result, the measurement page has no fourth field with the comparator off
+			self.measured_results = np.column_stack( (capacitance_F, Q, status, np.zeros_like( capacitance_F )) ).ravel()
+		else:
+			self.measured_results = np.column_stack( (capacitance_F, Q, status) ).ravel()
+		# Measurement runs in the background, a fetch blocks until it is done
+		self.measurement_done_time = time.perf_counter() + len(bias_voltages) * self.Point_Measurement_Time() * self.time_scale
+
+	def Wait_For_Measurement( self, message ):
+		assert message.upper() == ":FETCH:IMPEDANCE?", f"Unsupported query: {message}"
+		self.Bus_Transfer( len(message) )
+		if self.time_scale > 0:
+			time.sleep( max( 0.0, self.measurement_done_time - time.perf_counter() ) )
+
+	def query_ascii_values( self, message, container=list ):
+		self.Wait_For_Measurement( message )
+		assert self.transfer_format == "ASCII", "Instrument is not in ASCII transfer mode"
+		text = ','.join( f'{x:+.5E}' for x in self.measured_results )
+		self.Bus_Transfer( len(text) )
+		return container( [ float(x) for x in text.split( ',' ) ] )
+
+	def query_binary_values( self, message, datatype='f', is_big_endian=False, container=list ):
+		self.Wait_For_Measurement( message )
+		assert self.transfer_format == "REAL", "Instrument is not in binary transfer mode"
+		block = To_IEEE_Block( self.measured_results )
+		self.Bus_Transfer( len(block) )
+		return container( From_IEEE_Block( block, datatype=datatype, is_big_endian=is_big_endian ).tolist() )
+
+
+class Simulated_Resource_Manager:
+	# Plays the part of pyvisa.ResourceManager for the "Simulated" machine type
+	def __init__( self, **instrument_settings ):
+		self.instrument_settings = instrument_settings
+
+	def list_resources( self ):
+		return ( "SIM0::E4980::INSTR", )
+
+	def open_resource( self, address ):
+		if not address.startswith( "SIM" ): # Any SIM address opens its own instrument, for multi station runs
+			raise ValueError( f"No simulated instrument at {address}" )
+		return Simulated_E4980( **self.instrument_settings )
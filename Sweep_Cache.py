@@ -0,0 +1,175 @@
+# Local SQLite copy of stored sweeps, indexed by sample, device, temperature and AC settings, so earlier sweeps can be
+# pulled back for comparison with one local query instead of a server round trip per sweep.
+# Filled incrementally from the database and the sweep spool, least recently used sweeps are evicted past max_points.
+# Run with: python -m CV_Measurement_Assistant.Sweep_Cache <cache file> <configuration.ini> [--sample name] to fill the cache
+
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from PyQt5 import QtCore
+from rich import print
+
+from CV_Measurement_Assistant.CV_Analysis import Load_Raw_Data, Stack_Sweeps
+
+
+index_columns = ( "sample_name", "device_location", "temperature_in_k", "ac_amplitude_v", "ac_frequency_hz" )
+
+Cached_Sweeps = namedtuple( "Cached_Sweeps", ["meta_data", "bias_v", "capacitance_f"] ) # meta_data per sweep, NaN padded (sweep, point) arrays
+
+
+class Sweep_Cache:
+	def __init__( self, file_name, max_points=10_000_000 ):
+		self.max_points = max_points # About 16 bytes each
+		self.lock = threading.Lock()
+		self.connection = sqlite3.connect( str( file_name ), check_same_thread=False )
+		with self.lock, self.connection:
+			self.connection.execute( "PRAGMA journal_mode=WAL" )
+			self.connection.execute( "CREATE TABLE IF NOT EXISTS sweeps ( sweep_key TEXT PRIMARY KEY, sample_name TEXT, device_location TEXT, temperature_in_k REAL, "
+			                         "ac_amplitude_v REAL, ac_frequency_hz REAL, point_count INTEGER, last_used REAL, bias_v BLOB, capacitance_f BLOB )" )
+			self.connection.execute( "CREATE INDEX IF NOT EXISTS sweeps_by_device ON sweeps ( sample_name, device_location, temperature_in_k, ac_frequency_hz )" )
+			self.connection.execute( "CREATE INDEX IF NOT EXISTS sweeps_by_use ON sweeps ( last_used )" )
+
+	def Close( self ):
+		self.connection.close()
+
+	def Cached_Keys( self, prefix ):
+		with self.lock:
+			return set( key for key, in self.connection.execute( "SELECT sweep_key FROM sweeps WHERE sweep_key LIKE ?", (prefix + "%",) ) )
+
+	def Add_Sweeps( self, sweeps ):
+		# sweeps is a list of (sweep_key, meta_data, bias_v, capacitance_f), written in one transaction
+		now = time.time()
+		rows = [ ( sweep_key, *( meta_data.get( column ) for column in index_columns ), len( bias_v ), now,
+		           np.ascontiguousarray( bias_v, dtype=np.float64 ).tobytes(), np.ascontiguousarray( capacitance_f, dtype=np.float64 ).tobytes() )
+		         for sweep_key, meta_data, bias_v, capacitance_f in sweeps ]
+		with self.lock, self.connection:
+			self.connection.executemany( "INSERT OR REPLACE INTO sweeps VALUES (?,?,?,?,?,?,?,?,?,?)", rows )
+		self.Evict()
+		return len( rows )
+
+	def Evict( self ):
+		# Drops least recently used sweeps until the cache holds at most max_points
+		with self.lock, self.connection:
+			usage = self.connection.execute( "SELECT sweep_key, point_count FROM sweeps ORDER BY last_used DESC" ).fetchall()
+			if not usage:
+				return 0
+			kept_points = np.cumsum( [ point_count for _, point_count in usage ] )
+			evicted = [ (sweep_key,) for (sweep_key, _), total in zip( usage, kept_points ) if total > self.max_points ]
+			self.connection.executemany( "DELETE FROM sweeps WHERE sweep_key = ?", evicted )
+		return len( evicted )
+
+	def Fill_From_Database( self, sql_conn, chunk_size=500, **filters ):
+		# filters are cv_measurements index columns, e.g. sample_name="A123". Only sweeps not already cached are read,
+		# chunk_size at a time in one raw data query each.
+		from PyQt5 import QtSql
+		unknown = set( filters ) - set( index_columns )
+		if unknown:
+			raise ValueError( f"Cannot filter on {', '.join( sorted( unknown ) )}" )
+		query = QtSql.QSqlQuery( sql_conn )
+		query.setForwardOnly( True )
+		query.prepare( f"SELECT id, {', '.join( index_columns )} FROM cv_measurements"
+		               + ( " WHERE " + " AND ".join( f"{column} = ?" for column in filters ) if filters else "" ) )
+		for value in filters.values():
+			query.addBindValue( value )
+		if not query.exec_():
+			raise RuntimeError( f"Reading cv_measurements failed: {query.lastError().text()}" )
+		cached = self.Cached_Keys( "db:" )
+		missing = {}
+		while query.next():
+			if f"db:{query.value( 0 )}" not in cached:
+				missing[ query.value( 0 ) ] = { column : query.value( index + 1 ) for index, column in enumerate( index_columns ) }
+		ids = list( missing )
+		added = 0
+		for start in range( 0, len( ids ), chunk_size ):
+			added += self.Add_Sweeps( [ (f"db:{measurement_id}", missing[ measurement_id ], bias_v, capacitance_f)
+			                            for measurement_id, bias_v, capacitance_f, _ in Load_Raw_Data( sql_conn, ids[ start:start + chunk_size ] ) ] )
+		return added
+
+	def Fill_From_Spool( self, spool ):
+		# Sweeps the database has not accepted yet, once uploaded (or compacted out of the spool) they are dropped here
+		# and come back from the database
+		uploaded = spool.Uploaded_Ids()
+		pending = [ entry for entry in spool.Entries() if entry["sweep_id"] not in uploaded ]
+		pending_keys = set( f"spool:{entry['sweep_id']}" for entry in pending )
+		cached = self.Cached_Keys( "spool:" )
+		with self.lock, self.connection:
+			self.connection.executemany( "DELETE FROM sweeps WHERE sweep_key = ?", [ (key,) for key in cached if key not in pending_keys ] )
+		entries = [ entry for entry in pending if f"spool:{entry['sweep_id']}" not in cached
+		            and entry["commit_arguments"].get( "xy_data_sql_table" ) == "cv_raw_data" ] # Not the repeat statistics companions
+		return self.Add_Sweeps( [ (f"spool:{entry['sweep_id']}", entry["commit_arguments"], result.bias_v, result.capacitance_f)
+		                          for entry, result in spool.Read_Sweeps( entries ) ] )
+
+	def Query( self, sample_name=None, device_location=None, temperature_in_k=None, ac_frequency_hz=None, ac_amplitude_v=None,
+	           temperature_tolerance_k=0.5, limit=None ):
+		# Every matching sweep in one indexed query, returned stacked. None matches anything.
+		conditions, values = [], []
+		for column, value in (("sample_name", sample_name), ("device_location", device_location)):
+			if value is not None:
+				conditions.append( f"{column} = ?" )
+				values.append( value )
+		for column, value, tolerance in (("temperature_in_k", temperature_in_k, temperature_tolerance_k),
+		                                 ("ac_frequency_hz", ac_frequency_hz, None), ("ac_amplitude_v", ac_amplitude_v, None)):
+			if value is not None:
+				conditions.append( f"{column} BETWEEN ? AND ?" )
+				tolerance = abs( value ) * 1E-6 if tolerance is None else tolerance
+				values += [ value - tolerance, value + tolerance ]
+		sql = ( "SELECT sweep_key, " + ", ".join( index_columns ) + ", bias_v, capacitance_f FROM sweeps"
+		        + ( " WHERE " + " AND ".join( conditions ) if conditions else "" ) + " ORDER BY temperature_in_k, sweep_key"
+		        + ( f" LIMIT {int( limit )}" if limit is not None else "" ) )
+		with self.lock, self.connection:
+			rows = self.connection.execute( sql, values ).fetchall()
+			now = time.time()
+			self.connection.executemany( "UPDATE sweeps SET last_used = ? WHERE sweep_key = ?", [ (now, row[0]) for row in rows ] )
+		meta_data = [ dict( sweep_key=row[0], **dict( zip( index_columns, row[ 1:1 + len( index_columns ) ] ) ) ) for row in rows ]
+		return Cached_Sweeps( meta_data, Stack_Sweeps( [ np.frombuffer( row[-2] ) for row in rows ] ), Stack_Sweeps( [ np.frombuffer( row[-1] ) for row in rows ] ) )
+
+
+class Sweep_Cache_Worker( QtCore.QObject ):
+	# Lives off the GUI thread, tops the cache up from the spool and database before each query and hands the sweeps back
+	sweepsLoaded_signal = QtCore.pyqtSignal( object ) # Cached_Sweeps
+	loadFailed_signal = QtCore.pyqtSignal( str )
+
+	def __init__( self, cache_file, get_connection, spool, parent=None ):
+		super().__init__( parent )
+		self.cache_file = cache_file
+		self.get_connection = get_connection
+		self.spool = spool
+		self.cache = None # Opened on first use, on the worker's thread
+
+	@QtCore.pyqtSlot( str, float )
+	def Load_Sweeps( self, sample_name, ac_frequency_hz ):
+		# A NaN frequency matches every frequency. Without the database the sweeps cached so far are still returned.
+		try:
+			if self.cache is None:
+				self.cache = Sweep_Cache( self.cache_file )
+			self.cache.Fill_From_Spool( self.spool )
+			try:
+				_, sql_conn = self.get_connection()
+				if sql_conn is not None:
+					self.cache.Fill_From_Database( sql_conn, sample_name=sample_name )
+			except Exception as e:
+				print( f"[yellow]Database unavailable, showing cached sweeps only: {e}[/yellow]" )
+			sweeps = self.cache.Query( sample_name=sample_name, ac_frequency_hz=ac_frequency_hz if np.isfinite( ac_frequency_hz ) else None )
+		except Exception as e:
+			self.loadFailed_signal.emit( str( e ) )
+			return
+		self.sweepsLoaded_signal.emit( sweeps )
+
+
+if __name__ == "__main__":
+	import argparse
+	from CV_Measurement_Assistant.SQL_Connection_Pool import Shared_SQL_Pool
+
+	parser = argparse.ArgumentParser( description="Fill the local sweep cache from the database" )
+	parser.add_argument( "cache_file" )
+	parser.add_argument( "configuration" )
+	parser.add_argument( "--sample", default=None, help="Only cache this sample's sweeps" )
+	args = parser.parse_args()
+	cache = Sweep_Cache( args.cache_file )
+	_, sql_conn = Shared_SQL_Pool( args.configuration ).Get_Connection()
+	start_s = time.perf_counter()
+	added = cache.Fill_From_Database( sql_conn, **( dict( sample_name=args.sample ) if args.sample else {} ) )
+	print( f"Cached {added} new sweeps in {time.perf_counter() - start_s:.1f} s" )
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+# One record per bias point, a whole sweep lives in a single contiguous structured array
+sweep_point_dtype = np.dtype( [ ("bias_v", np.float64), ("capacitance_f", np.float64), ("q", np.float64),
+                                ("status", np.int8), ("time_s", np.float64) ] )
+
+
+class Sweep_Result:
+	__slots__ = ( "points", )
+
+	def __init__( self, points ):
+		self.points = points
+
+	@classmethod
+	def From_Arrays( cls, bias_v, capacitance_f, q, status=0, time_s=np.nan ):
+		points = np.empty( len(bias_v), dtype=sweep_point_dtype )
+		points["bias_v"] = bias_v
+		points["capacitance_f"] = capacitance_f
+		points["q"] = q
+		points["status"] = status
+		points["time_s"] = time_s
+		return cls( points )
+
+	@classmethod
+	def Concatenate( cls, results ):
+		return cls( np.concatenate( [result.points for result in results] ) )
+
+	# Fields are views into the record, no copies are made
+	@property
+	def bias_v( self ):
+		return self.points["bias_v"]
+
+	@property
+	def capacitance_f( self ):
+		return self.points["capacitance_f"]
+
+	@property
+	def q( self ):
+		return self.points["q"]
+
+	@property
+	def status( self ):
+		return self.points["status"]
+
+	@property
+	def time_s( self ):
+		return self.points["time_s"]
+
+	def Reversed( self ):
+		return Sweep_Result( self.points[::-1] )
+
+	def __len__( self ):
+		return len( self.points )
+
+	def __iter__( self ): # Unpacks like the sweepFinished_signal payload before its temperature
+		return iter( (self.bias_v, self.capacitance_f, self.q) )
@@ -0,0 +1,232 @@
+# Append only local store of every completed sweep, written before the database sees it.
+# points.bin holds the raw Sweep_Result records back to back, index.jsonl says which records belong to which sweep
+# and how to commit it, uploaded.txt lists the sweeps the database has accepted. Uploaded sweeps are compacted away
+# when the shared spool is opened, so the files only grow with what the database has not taken yet.
+# Run with: python -m CV_Measurement_Assistant.Sweep_Spool <spool directory> <configuration.ini> to upload what is left over
+
+import json
+import os
+import pathlib
+import threading
+from collections import OrderedDict
+from uuid import uuid4
+
+import numpy as np
+from rich import print
+
+from CV_Measurement_Assistant.Sweep_Result import Sweep_Result, sweep_point_dtype
+
+
+def To_Json( value ):
+	if hasattr( value, "item" ): # numpy scalars
+		return value.item()
+	return str( value )
+
+def Drop_Partial_Line( path ):
+	# A crash mid write leaves a last line without its newline, it is cut off so the next line is not glued onto it
+	if not os.path.exists( path ):
+		return
+	with open( path, 'rb+' ) as infile:
+		size = end = infile.seek( 0, os.SEEK_END )
+		while end > 0:
+			start = max( 0, end - 65536 )
+			infile.seek( start )
+			newline = infile.read( end - start ).rfind( b'\n' )
+			if newline >= 0:
+				if start + newline + 1 < size:
+					infile.truncate( start + newline + 1 )
+				return
+			end = start
+		infile.truncate( 0 )
+
+def Append_Lines( path, lines ):
+	Drop_Partial_Line( path )
+	with open( path, 'a' ) as outfile:
+		outfile.writelines( line + '\n' for line in lines )
+		outfile.flush()
+		os.fsync( outfile.fileno() )
+
+def Read_Lines( path ):
+	# Complete lines only, a last line without its newline was never finished
+	if not os.path.exists( path ):
+		return []
+	with open( path ) as infile:
+		return [ line for line in infile.read().split( '\n' )[:-1] if line.strip() ]
+
+def Read_Json_Lines( path ):
+	# Lines that do not parse, torn by a crash before partial lines were cut off on append, are skipped
+	entries = []
+	for line in Read_Lines( path ):
+		try:
+			entries.append( json.loads( line ) )
+		except json.JSONDecodeError:
+			print( f"[yellow]Skipping a damaged line in {path}[/yellow]" )
+	return entries
+
+
+class Sweep_Spool:
+	def __init__( self, directory ):
+		self.directory = pathlib.Path( directory )
+		self.directory.mkdir( parents=True, exist_ok=True )
+		self.points_path = self.directory / "points.bin"
+		self.index_path = self.directory / "index.jsonl"
+		self.uploaded_path = self.directory / "uploaded.txt"
+		self.compaction_ready_path = self.directory / "compaction.ready"
+		self.in_flight = set() # Queued for the database but not yet confirmed, never replayed twice
+		self.lock = threading.Lock()
+		self.Finish_Compaction()
+
+	def Append_Group( self, group ):
+		# group is a list of (Sweep_Result, commit_arguments), commit_arguments being Commit_XY_Data_To_SQL's keywords
+		# other than the xy data. Returns the new sweep ids once they are safely on disk.
+		group_id = uuid4().hex
+		with self.lock:
+			size = os.path.getsize( self.points_path ) if self.points_path.exists() else 0
+			if size % sweep_point_dtype.itemsize: # A crash mid write left part of a record, which would misalign every later offset
+				size -= size % sweep_point_dtype.itemsize
+				os.truncate( self.points_path, size )
+			offset = size // sweep_point_dtype.itemsize
+			with open( self.points_path, 'ab' ) as outfile:
+				for result, _ in group:
+					outfile.write( np.ascontiguousarray( result.points ).tobytes() )
+				outfile.flush()
+				os.fsync( outfile.fileno() )
+
+			entries = []
+			for result, commit_arguments in group:
+				entries.append( dict( sweep_id=uuid4().hex, group_id=group_id, offset=offset, count=len(result), commit_arguments=commit_arguments ) )
+				offset += len( result )
+			Append_Lines( self.index_path, [ json.dumps( entry, default=To_Json ) for entry in entries ] )
+			sweep_ids = [ entry["sweep_id"] for entry in entries ]
+			self.in_flight.update( sweep_ids )
+		return sweep_ids
+
+	def Mark_Uploaded( self, sweep_ids ):
+		with self.lock:
+			Append_Lines( self.uploaded_path, sweep_ids )
+			self.in_flight.difference_update( sweep_ids )
+
+	def Mark_Failed( self, sweep_ids ):
+		with self.lock:
+			self.in_flight.difference_update( sweep_ids ) # Left in the spool for the next replay
+
+	def Entries( self ):
+		return Read_Json_Lines( self.index_path )
+
+	def Uploaded_Ids( self ):
+		return set( line.strip() for line in Read_Lines( self.uploaded_path ) )
+
+	def Read_Sweeps( self, entries=None ):
+		# Memory maps the spool so even a long campaign can be reanalyzed without loading it all
+		if entries is None:
+			entries = self.Entries()
+		if not entries:
+			return []
+		points = np.memmap( self.points_path, dtype=sweep_point_dtype, mode='r' )
+		return [ (entry, Sweep_Result( points[ entry["offset"] : entry["offset"] + entry["count"] ] )) for entry in entries ]
+
+	def Compact( self ):
+		# Rewrites the spool with only the sweeps the database has not accepted, returns how many were dropped.
+		# The new files are written beside the old ones and swapped in once complete, see Finish_Compaction.
+		with self.lock:
+			if self.in_flight: # Offsets of queued sweeps must not move under them
+				return 0
+			uploaded = self.Uploaded_Ids()
+			entries = self.Entries()
+			kept = [ entry for entry in entries if entry["sweep_id"] not in uploaded ]
+			if len( kept ) == len( entries ):
+				return 0
+			new_points_path, new_index_path = self.points_path.with_suffix( ".bin.new" ), self.index_path.with_suffix( ".jsonl.new" )
+			points = np.memmap( self.points_path, dtype=sweep_point_dtype, mode='r' ) if kept else None
+			offset = 0
+			with open( new_points_path, 'wb' ) as outfile:
+				for entry in kept:
+					outfile.write( np.ascontiguousarray( points[ entry["offset"] : entry["offset"] + entry["count"] ] ).tobytes() )
+					entry["offset"] = offset
+					offset += entry["count"]
+				outfile.flush()
+				os.fsync( outfile.fileno() )
+			del points
+			with open( new_index_path, 'w' ) as outfile:
+				outfile.writelines( json.dumps( entry, default=To_Json ) + '\n' for entry in kept )
+				outfile.flush()
+				os.fsync( outfile.fileno() )
+			Append_Lines( self.compaction_ready_path, [] )
+			self.Finish_Compaction()
+		return len( entries ) - len( kept )
+
+	def Finish_Compaction( self ):
+		# Once compaction.ready exists both new files are complete, a crash part way through the swap is finished
+		# on the next open. Without it the new files are from a compaction that never completed and are dropped.
+		new_paths = [ (self.points_path.with_suffix( ".bin.new" ), self.points_path), (self.index_path.with_suffix( ".jsonl.new" ), self.index_path) ]
+		if self.compaction_ready_path.exists():
+			for new_path, path in new_paths:
+				if new_path.exists():
+					os.replace( new_path, path )
+			if self.uploaded_path.exists(): # Every sweep left is still waiting for the database
+				os.truncate( self.uploaded_path, 0 )
+			self.compaction_ready_path.unlink()
+		else:
+			for new_path, _ in new_paths:
+				if new_path.exists():
+					new_path.unlink()
+
+	def Pending_Groups( self ):
+		uploaded = self.Uploaded_Ids()
+		with self.lock:
+			skip = uploaded | self.in_flight
+		groups = OrderedDict()
+		for entry, result in self.Read_Sweeps( [ entry for entry in self.Entries() if entry["sweep_id"] not in skip ] ):
+			groups.setdefault( entry["group_id"], [] ).append( (entry, result) )
+		return list( groups.values() )
+
+	def Commit_Group( self, sql_writer, group ):
+		# Spools the group first so nothing is lost if the database is unreachable, then queues it for upload
+		sweep_ids = self.Append_Group( group )
+		self.Queue_Upload( sql_writer, sweep_ids, group )
+
+	def Queue_Upload( self, sql_writer, sweep_ids, group ):
+		commit_group = []
+		for result, commit_arguments in group:
+			commit_arguments = dict( commit_arguments )
+			if "xy_sql_labels" in commit_arguments: # Lists after the JSON round trip
+				commit_arguments["xy_sql_labels"] = tuple( commit_arguments["xy_sql_labels"] )
+			commit_group.append( dict( x_data=np.array( result.bias_v ), y_data=np.array( result.capacitance_f ), **commit_arguments ) )
+		sql_writer.Commit_Group( commit_group, on_committed=lambda : self.Mark_Uploaded( sweep_ids ),
+		                                       on_failed=lambda : self.Mark_Failed( sweep_ids ) )
+
+	def Replay( self, sql_writer ):
+		# Queues every spooled sweep the database has not confirmed, the writer batches them into bulk transactions
+		pending = self.Pending_Groups()
+		for group in pending:
+			sweep_ids = [ entry["sweep_id"] for entry, _ in group ]
+			with self.lock:
+				self.in_flight.update( sweep_ids )
+			self.Queue_Upload( sql_writer, sweep_ids, [ (result, entry["commit_arguments"]) for entry, result in group ] )
+		return sum( len(group) for group in pending )
+
+
+shared_spool = None
+
+def Shared_Sweep_Spool( directory=None ):
+	global shared_spool
+	if shared_spool is None:
+		if directory is None:
+			raise ValueError( "Shared sweep spool must first be created with a directory" )
+		shared_spool = Sweep_Spool( directory )
+		compacted = shared_spool.Compact() # Once per process, before any sweep of this session is spooled
+		if compacted:
+			print( f"Compacted {compacted} uploaded sweeps out of the spool" )
+	return shared_spool
+
+
+if __name__ == "__main__":
+	import sys
+	from CV_Measurement_Assistant.SQL_Connection_Pool import Shared_SQL_Pool
+	from CV_Measurement_Assistant.SQL_Write_Behind import Shared_SQL_Writer
+
+	spool_directory, configuration_file = sys.argv[1:3]
+	Shared_SQL_Pool( configuration_file )
+	sql_writer = Shared_SQL_Writer()
+	print( f"Uploading {Sweep_Spool( spool_directory ).Replay( sql_writer )} spooled sweeps" )
+	sql_writer.Close()
@@ -0,0 +1,114 @@
+# Timed spans for each phase of a measurement run, written as Chrome trace JSON (open in chrome://tracing or
+# https://ui.perfetto.dev) or CSV, with a summary table of where the time went.
+
+import csv
+import json
+import pathlib
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from rich import print
+from rich.table import Table
+
+
+class Timing_Trace:
+	# Spans can be recorded from any thread, each is (name, start_s, end_s, thread name, tags)
+	def __init__( self, directory=None ):
+		self.directory = None if directory is None else pathlib.Path( directory ) # Where Finish_Run writes traces, None to only summarize
+		self.spans = []
+		self.lock = threading.Lock()
+		self.origin_s = time.perf_counter()
+
+	def Clear( self ):
+		with self.lock:
+			self.spans = []
+			self.origin_s = time.perf_counter()
+
+	def Record( self, name, start_s, end_s, **tags ):
+		span = ( name, start_s, end_s, threading.current_thread().name, tags )
+		with self.lock:
+			self.spans.append( span )
+
+	@contextmanager
+	def Span( self, name, **tags ):
+		start_s = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.Record( name, start_s, time.perf_counter(), **tags )
+
+	def Timed_Iterator( self, iterable, name, tags_from_item=None, **tags ):
+		# Times how long each item takes to arrive, which for an Async_Iterator is the wait for the requested action
+		iterator = iter( iterable )
+		while True:
+			start_s = time.perf_counter()
+			try:
+				item = next( iterator )
+			except StopIteration:
+				return
+			self.Record( name, start_s, time.perf_counter(), **tags, **(tags_from_item( item ) if tags_from_item else {}) )
+			yield item
+
+	def Write_Chrome_Trace( self, file_name ):
+		with self.lock:
+			spans = list( self.spans )
+		thread_ids = { thread_name : index for index, thread_name in enumerate( dict.fromkeys( span[3] for span in spans ) ) }
+		events = [ dict( name="thread_name", ph="M", pid=1, tid=tid, args=dict( name=thread_name ) ) for thread_name, tid in thread_ids.items() ]
+		events += [ dict( name=name, ph="X", pid=1, tid=thread_ids[ thread_name ], ts=(start_s - self.origin_s) * 1E6, dur=(end_s - start_s) * 1E6,
+		                  args={ key : str( value ) for key, value in tags.items() } ) for name, start_s, end_s, thread_name, tags in spans ]
+		with open( file_name, 'w' ) as outfile:
+			json.dump( dict( traceEvents=events, displayTimeUnit="ms" ), outfile )
+
+	def Write_CSV( self, file_name ):
+		with self.lock:
+			spans = list( self.spans )
+		tag_names = list( dict.fromkeys( key for span in spans for key in span[4] ) )
+		with open( file_name, 'w', newline='' ) as outfile:
+			writer = csv.writer( outfile )
+			writer.writerow( ["phase", "start_s", "duration_s", "thread"] + tag_names )
+			for name, start_s, end_s, thread_name, tags in spans:
+				writer.writerow( [name, f"{start_s - self.origin_s:.6f}", f"{end_s - start_s:.6f}", thread_name] + [ tags.get( key, "" ) for key in tag_names ] )
+
+	def Summary( self ):
+		# Returns {phase : (count, total_s, max_s)}
+		summary = defaultdict( lambda : [0, 0.0, 0.0] )
+		with self.lock:
+			for name, start_s, end_s, _, _ in self.spans:
+				entry = summary[ name ]
+				entry[0] += 1
+				entry[1] += end_s - start_s
+				entry[2] = max( entry[2], end_s - start_s )
+		return { name : tuple( entry ) for name, entry in summary.items() }
+
+	def Print_Summary( self, title="Measurement run timing" ):
+		table = Table( title=title )
+		for column in ("Phase", "Count", "Total (s)", "Mean (s)", "Max (s)"):
+			table.add_column( column, justify="left" if column == "Phase" else "right" )
+		for name, (count, total_s, max_s) in sorted( self.Summary().items(), key=lambda item : -item[1][1] ):
+			table.add_row( name, str( count ), f"{total_s:.2f}", f"{total_s / count:.4f}", f"{max_s:.4f}" )
+		print( table )
+
+	def Finish_Run( self, label="run" ):
+		# Writes the trace of the run that just ended, if a directory was given, and prints its summary
+		self.Print_Summary()
+		if self.directory is None:
+			return None
+		self.directory.mkdir( parents=True, exist_ok=True )
+		file_name = self.directory / f"{label}_{time.strftime( '%Y%m%d-%H%M%S' )}.json"
+		self.Write_Chrome_Trace( file_name )
+		print( f"Timing trace written to {file_name}" )
+		return file_name
+
+
+shared_trace = None
+
+def Shared_Timing_Trace( directory=None ):
+	# The first caller with a directory sets where traces are written, without one traces are only summarized
+	global shared_trace
+	if shared_trace is None:
+		shared_trace = Timing_Trace( directory )
+	elif directory is not None and shared_trace.directory is None:
+		shared_trace.directory = pathlib.Path( directory )
+	return shared_trace
@@ -0,0 +1,38 @@
+# Checks the depletion analysis against an ideal abrupt junction, run with pytest from the directory containing the package
+
+import numpy as np
+
+from CV_Measurement_Assistant.CV_Analysis import CV_Analyzer, Device_Area_m2, Stack_Sweeps, elementary_charge_C, vacuum_permittivity_F_per_m
+
+
+relative_permittivity = 11.7
+doping_per_m3 = 1E22
+built_in_v = 0.7
+area_m2 = Device_Area_m2( 200 )
+
+def Abrupt_Junction_C( bias_v ):
+	# 1/C^2 = 2 (Vbi - V) / (q eps N A^2), linear in bias so the fitted slope and intercept are exact
+	permittivity = relative_permittivity * vacuum_permittivity_F_per_m
+	return area_m2 * np.sqrt( elementary_charge_C * permittivity * doping_per_m3 / (2 * (built_in_v - bias_v)) )
+
+def test_Abrupt_Junction_Profile():
+	bias_v = np.concatenate( (np.arange( -3.0, -1.0, 0.1 ), np.arange( -1.0, 0.0, 0.02 )) ) # Uneven steps as from an adaptive sweep
+	capacitance_f = Abrupt_Junction_C( bias_v )
+	profile, = CV_Analyzer( relative_permittivity=relative_permittivity ).Analyze( [ ("sweep", bias_v, capacitance_f, area_m2) ] )
+	assert np.allclose( profile.inverse_c2, 1 / capacitance_f**2 )
+	assert np.allclose( profile.doping_per_m3, doping_per_m3, rtol=1E-6 )
+	assert np.allclose( profile.depth_m, relative_permittivity * vacuum_permittivity_F_per_m * area_m2 / capacitance_f )
+	assert abs( profile.built_in_v - built_in_v ) < 1E-6
+
+def test_Batch_Of_Different_Lengths():
+	short_bias_v, long_bias_v = np.linspace( -2.0, 0.0, 21 ), np.linspace( -3.0, 0.0, 61 )
+	analyzer = CV_Analyzer( relative_permittivity=relative_permittivity )
+	short, long = analyzer.Analyze( [ ("short", short_bias_v, Abrupt_Junction_C( short_bias_v ), area_m2), ("long", long_bias_v, Abrupt_Junction_C( long_bias_v ), None) ] )
+	assert len( short.doping_per_m3 ) == 21 and np.allclose( short.doping_per_m3, doping_per_m3, rtol=1E-6 ) # NaN padding does not leak in
+	assert len( long.depth_m ) == 61 and np.all( np.isnan( long.doping_per_m3 ) ) # Unknown area
+	assert abs( long.built_in_v - built_in_v ) < 1E-6
+	assert analyzer.Analyze( [ ("short", short_bias_v, None, None) ] )[0] is short # Memoized by sweep id
+
+def test_Stack_Sweeps():
+	stacked = Stack_Sweeps( [ np.arange( 3.0 ), np.arange( 1.0 ) ] )
+	assert stacked.shape == (2, 3) and np.array_equal( stacked[0], [0, 1, 2] ) and np.isnan( stacked[1, 1:] ).all()
@@ -0,0 +1,45 @@
+# Checks the whole-session export formats, run with pytest from the directory containing the package
+
+import csv
+
+import numpy as np
+import pytest
+
+from CV_Measurement_Assistant.Export_Data import Export_Sweeps, Load_NPZ
+from CV_Measurement_Assistant.Sweep_Result import Sweep_Result
+
+
+def Make_Sweeps():
+	first = Sweep_Result.From_Arrays( np.array( [-1.0, -0.5, 0.0] ), np.array( [1E-12, 2E-12, 3E-12] ), np.array( [20.0, 21.0, 22.0] ), time_s=1E9 )
+	second = Sweep_Result.From_Arrays( np.array( [-1.0, 0.0] ), np.array( [4E-12, np.nan] ), np.array( [23.0, np.nan] ), status=np.array( [0, -1] ) )
+	return [ (dict( sample_name="S1", temperature_in_k=77.0 ), first), (dict( sample_name="S1,b", ac_frequency_hz=1E5 ), second) ]
+
+def test_CSV( tmp_path ):
+	file_name = tmp_path / "sweeps.csv"
+	Export_Sweeps( file_name, Make_Sweeps() )
+	with open( file_name, newline='' ) as infile:
+		rows = list( csv.DictReader( infile ) )
+	assert len( rows ) == 5
+	assert list( rows[0] ) == [ "sweep_index", "sample_name", "temperature_in_k", "ac_frequency_hz", "bias_v", "capacitance_f", "q", "status", "time_s" ]
+	assert rows[0]["temperature_in_k"] == "77.0" and rows[0]["ac_frequency_hz"] == "" and float( rows[2]["capacitance_f"] ) == 3E-12
+	assert rows[3]["sample_name"] == "S1,b" and rows[4]["capacitance_f"] == "nan" and rows[4]["status"] == "-1" # Quoted metadata, full precision points
+
+def test_NPZ_Round_Trip( tmp_path ):
+	file_name = tmp_path / "sweeps.npz"
+	sweeps = Make_Sweeps()
+	Export_Sweeps( file_name, sweeps )
+	loaded = Load_NPZ( file_name )
+	assert [ meta_data for meta_data, _ in loaded ] == [ meta_data for meta_data, _ in sweeps ]
+	for (_, loaded_result), (_, result) in zip( loaded, sweeps ):
+		assert loaded_result.points.tobytes() == result.points.tobytes()
+
+def test_Parquet( tmp_path ):
+	pyarrow_parquet = pytest.importorskip( "pyarrow.parquet" )
+	file_name = tmp_path / "sweeps.parquet"
+	Export_Sweeps( file_name, Make_Sweeps() )
+	table = pyarrow_parquet.read_table( file_name )
+	assert table.num_rows == 5 and table.column( "sample_name" ).to_pylist()[3] == "S1,b"
+
+def test_Unsupported_Format( tmp_path ):
+	with pytest.raises( ValueError ):
+		Export_Sweeps( tmp_path / "sweeps.xlsx", Make_Sweeps() )
@@ -0,0 +1,33 @@
+# Checks the device and temperature ordering of Measurement_Planner, run with pytest from the directory containing the package
+
+import itertools
+from collections import namedtuple
+
+from CV_Measurement_Assistant.Measurement_Planner import Order_Devices, Order_Temperatures, Path_Cost, Plan_Measurement
+
+
+Device = namedtuple( "Device", ["location", "neg_pad", "pos_pad", "side"] ) # As read from a pad description file
+
+def Make_Devices( pads ):
+	return [ Device( f"D{i}", neg_pad, pos_pad, 100 ) for i, (neg_pad, pos_pad) in enumerate( pads ) ]
+
+def test_Two_Opt_Improves_Nearest_Neighbour():
+	devices = Make_Devices( [ (1, 6), (4, 5), (6, 3), (6, 1), (5, 6), (1, 4) ] ) # Nearest neighbour alone is one pad reversal off
+	nearest_neighbour = Order_Devices( devices, max_passes=0 )
+	ordered = Order_Devices( devices )
+	best_cost = min( Path_Cost( list( order ) ) for order in itertools.permutations( devices ) )
+	assert sorted( ordered ) == sorted( devices )
+	assert Path_Cost( ordered ) < Path_Cost( nearest_neighbour ) and Path_Cost( ordered ) == best_cost
+
+def test_Serpentine_Plan():
+	devices = Make_Devices( [ (1, 2), (1, 3), (1, 4) ] )
+	plan = Plan_Measurement( [ 100.0, 150.0, 200.0 ], devices )
+	assert plan.temperatures == [ 100.0, 150.0, 200.0 ]
+	assert plan.device_orders[1] == plan.device_orders[0][::-1] and plan.device_orders[2] == plan.device_orders[0]
+	assert plan.device_orders[0][-1] == plan.device_orders[1][0] # No pad switch between setpoints
+
+def test_Temperature_Order():
+	assert Order_Temperatures( [ 100.0, 200.0, 300.0 ], current_temperature=290.0 ) == [ 100.0, 200.0, 300.0 ] # Requested order by default
+	assert Order_Temperatures( [ 100.0, 200.0, 300.0 ], current_temperature=290.0, reorder=True ) == [ 300.0, 200.0, 100.0 ]
+	assert Order_Temperatures( [ 300.0, 100.0, 200.0 ], current_temperature=80.0, reorder=True ) == [ 100.0, 200.0, 300.0 ]
+	assert Order_Temperatures( [ None ], current_temperature=80.0, reorder=True ) == [ None ]
@@ -0,0 +1,36 @@
+# Checks how an interrupted measurement resumes from its checkpoint, run with pytest from the directory containing the package
+
+from collections import namedtuple
+
+from CV_Measurement_Assistant.Measurement_Planner import Plan_Measurement
+from CV_Measurement_Assistant.Run_Checkpoint import Run_Checkpoint, Recipe_Hash, Remaining_Setpoints, Skip_Completed
+
+
+Device = namedtuple( "Device", ["location", "neg_pad", "pos_pad", "side"] )
+
+devices = [ Device( "A1", 1, 2, 100 ), Device( "A2", 1, 3, 200 ) ]
+recipe = ( dict( sample_name="S1", user="U" ), (100.0, 200.0, 50.0), (-2.0, 0.5, 0.0125, 0.5), (30E-3, 1E5), devices )
+
+def test_Recipe_Hash():
+	assert Recipe_Hash( *recipe ) == Recipe_Hash( *recipe )
+	assert Recipe_Hash( dict( recipe[0], measurement_setup="LN2 Dewar station2" ), *recipe[1:] ) != Recipe_Hash( *recipe )
+
+def test_Resume( tmp_path ):
+	checkpoint = Run_Checkpoint( tmp_path, Recipe_Hash( *recipe ) )
+	for temperature, location in [ (100.0, "A1"), (100.0, "A2"), (150.0, "A2") ]:
+		checkpoint.Mark_Completed( temperature, location )
+	completed = Run_Checkpoint( tmp_path, Recipe_Hash( *recipe ) ).Completed() # As the resumed run reads it
+	assert completed == { (100.0, "A1"), (100.0, "A2"), (150.0, "A2") }
+
+	setpoints = Remaining_Setpoints( [ 100.0, 150.0, 200.0 ], devices, completed )
+	assert setpoints == [ 150.0, 200.0 ] # Every device at 100 K is done, the dewar never goes there
+	plan = Skip_Completed( Plan_Measurement( setpoints, devices ), completed )
+	assert [ [ device.location for device in order ] for order in plan.device_orders ] == [ ["A1"], ["A2", "A1"] ]
+
+	checkpoint.Clear()
+	assert checkpoint.Completed() == set()
+
+def test_Unknown_Temperature():
+	completed = { Run_Checkpoint.Key( None, "A1" ) }
+	assert Remaining_Setpoints( [ None ], devices, completed ) == [ None ]
+	assert Remaining_Setpoints( [ None ], devices[:1], completed ) == []
@@ -0,0 +1,45 @@
+# Checks which queued groups the write-behind writer reports as committed, run with pytest from the directory containing the package
+
+from CV_Measurement_Assistant import SQL_Write_Behind as write_behind
+
+
+class Fake_Connection:
+	# Rows land as they are written, with a transaction they only count once committed
+	def __init__( self, transactions ):
+		self.transactions = transactions
+		self.rows, self.pending = [], []
+
+	def transaction( self ):
+		return self.transactions
+
+	def commit( self ):
+		self.rows += self.pending
+		self.pending.clear()
+
+	def rollback( self ):
+		self.pending.clear()
+
+def Run_Batch( monkeypatch, connection, sample_names ):
+	def commit( sql_type, sql_conn, sample_name, **commit_arguments ):
+		if sample_name == "bad":
+			raise RuntimeError( "rejected" )
+		( sql_conn.pending if sql_conn.transactions else sql_conn.rows ).append( sample_name )
+	monkeypatch.setattr( write_behind, "Commit_XY_Data_To_SQL", commit )
+	writer = write_behind.SQL_Write_Behind( lambda : ("QMYSQL", connection) )
+	committed, failed = [], []
+	batch = [ ([ dict( sample_name=name ) ], lambda name=name : committed.append( name ), lambda name=name : failed.append( name )) for name in sample_names ]
+	writer.Commit_Batch( batch )
+	writer.Close()
+	return committed, failed
+
+def test_Failed_Group_Without_Transactions( monkeypatch ):
+	connection = Fake_Connection( transactions=False )
+	committed, failed = Run_Batch( monkeypatch, connection, ["a", "bad", "c"] )
+	assert committed == ["a", "c"] and failed == ["bad"] # Written groups are never replayed into duplicates
+	assert connection.rows == ["a", "c"]
+
+def test_Failed_Group_In_Transaction( monkeypatch ):
+	connection = Fake_Connection( transactions=True )
+	committed, failed = Run_Batch( monkeypatch, connection, ["a", "bad", "c"] )
+	assert committed == ["a", "c"] and failed == ["bad"] # Retried one group per transaction after the rollback
+	assert connection.rows == ["a", "c"]
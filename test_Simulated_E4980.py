@@ -0,0 +1,120 @@
+# Checks CV_Controller against the simulated E4980, run with pytest from the directory containing the package
+
+import numpy as np
+from PyQt5 import QtCore
+
+from CV_Measurement_Assistant.CV_Box_Controller import CV_Controller
+from CV_Measurement_Assistant.Aperture_Calibration import Aperture_Cache
+from CV_Measurement_Assistant.Simulated_E4980 import Simulated_E4980, Simulated_CV_Curve
+
+
+app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication( [] ) # Signals need an application object
+
+ideal_instrument = dict( time_scale=0, noise=False ) # Instant and noiseless, for checking results exactly
+
+default_sweep_args = ( -2.0, 0.5, 0.0125, 30E-3, 1E5, 0.0 ) # v_start, v_end, v_step, ac_voltage, ac_frequency, step_delay
+
+def Simulated_Controller( instrument=None, **controller_options ):
+	controller = CV_Controller( **controller_options )
+	controller.gpib_resource = Simulated_E4980( **ideal_instrument ) if instrument is None else instrument
+	return controller
+
+def Run_Simulated_Sweep( controller, sweep_args=default_sweep_args ):
+	# Runs one sweep and returns its sweepFinished_signal payload without the temperature. A list of frequencies
+	# runs a C-V-f grid and returns the cvfSweepFinished_signal payload instead.
+	frequency_sweep = np.ndim( sweep_args[4] ) > 0
+	signal = controller.cvfSweepFinished_signal if frequency_sweep else controller.sweepFinished_signal
+	results = []
+	record = lambda *payload : results.append( payload )
+	signal.connect( record )
+	try:
+		( controller.Voltage_Frequency_Sweep_Keysight if frequency_sweep else controller.Voltage_Sweep_Keysight )( *sweep_args )
+	finally:
+		signal.disconnect( record )
+	assert len( results ) == 1
+	return results[0] if frequency_sweep else results[0][:3]
+
+def test_Binary_Transfer_Parity():
+	ascii_payload = Run_Simulated_Sweep( Simulated_Controller( binary_transfer=False ) )
+	binary_payload = Run_Simulated_Sweep( Simulated_Controller( binary_transfer=True ) )
+	for ascii_array, binary_array in zip( ascii_payload, binary_payload ):
+		assert ascii_array.shape == binary_array.shape
+		assert np.allclose( ascii_array, binary_array, rtol=1E-5, equal_nan=True ) # ASCII is limited to 6 significant digits
+
+def test_Long_Sweep_Stitching():
+	sweep_args = ( -5.0, 0.5, 0.005, 30E-3, 1E5, 0.0 ) # 1101 points, six list segments
+	bias_V, capacitance_F, Q = Run_Simulated_Sweep( Simulated_Controller( binary_transfer=True ), sweep_args )
+	expected_capacitance_F, expected_Q = Simulated_CV_Curve( bias_V )
+	assert len(bias_V) == len(capacitance_F) == len(Q) == 1101
+	assert np.allclose( capacitance_F, expected_capacitance_F ) and np.allclose( Q, expected_Q )
+
+def test_Streaming_Sweep():
+	controller = Simulated_Controller( streaming=True )
+	streamed_points = []
+	def stop_after_ten_points( x, y ):
+		streamed_points.append( (x, y) )
+		if len( streamed_points ) == 10:
+			controller.Stop_Sweep()
+	controller.dataPointGotten_signal.connect( stop_after_ten_points )
+	bias_V, capacitance_F, Q = Run_Simulated_Sweep( controller )
+	assert len( bias_V ) == len( capacitance_F ) == 10
+	assert np.allclose( capacitance_F, [y for x, y in streamed_points] )
+
+def test_Frequency_Sweep():
+	ac_frequencies = [1E3, 1E4, 1E5, 1E6]
+	bias_V, frequencies_Hz, capacitance_F, Q = Run_Simulated_Sweep( Simulated_Controller(), ( -3.0, 0.5, 0.01, 30E-3, ac_frequencies, 0.0 ) )
+	assert capacitance_F.shape == Q.shape == (len(bias_V), len(ac_frequencies))
+	for column, frequency in enumerate( ac_frequencies ):
+		assert np.allclose( capacitance_F[:, column], Simulated_CV_Curve( bias_V, frequency )[0] )
+
+def test_Adaptive_Sweep():
+	bias_V, capacitance_F, Q = Run_Simulated_Sweep( Simulated_Controller( binary_transfer=True, adaptive_stepping=True ), ( -5.0, 0.5, 0.005, 30E-3, 1E5, 0.0 ) )
+	full_bias_V = np.arange( -5.0, 0.5 + 0.0025, 0.005 )
+	assert np.all( np.diff( bias_V ) > 0 ) and len( bias_V ) < len( full_bias_V )
+	assert np.allclose( capacitance_F, Simulated_CV_Curve( bias_V )[0] )
+	interpolated_F = np.interp( full_bias_V, bias_V, capacitance_F )
+	assert np.max( np.abs( interpolated_F / Simulated_CV_Curve( full_bias_V )[0] - 1 ) ) < 1E-3
+
+def test_Aperture_Calibration():
+	instrument = Simulated_E4980( time_scale=0 )
+	controller = Simulated_Controller( instrument, binary_transfer=True, noise_target=8E-4 )
+	controller.aperture_cache = Aperture_Cache() # Kept in memory so every run calibrates
+	controller.device_type = "100 um"
+	Run_Simulated_Sweep( controller )
+	assert controller.aperture == instrument.aperture == ("MEDIUM", 1) # SHORT is too noisy even with 4 averages
+	assert controller.aperture_cache.Get( "100 um", 1E5 ) == ("MEDIUM", 1)
+	instrument.command_log.clear()
+	Run_Simulated_Sweep( controller )
+	assert not any( command.startswith( ":APERTURE" ) for command in instrument.command_log ) # Cached choice is already programmed
+
+def test_Repeated_Sweep():
+	controller = Simulated_Controller( Simulated_E4980( time_scale=0 ), binary_transfer=True, max_repeats=50, min_repeats=3, repeat_target=1E-3 )
+	bias_V, capacitance_F, Q = Run_Simulated_Sweep( controller )
+	summary = controller.last_repeat_summary
+	assert 3 <= summary.sweeps < 50 and np.all( summary.count == summary.sweeps )
+	assert np.allclose( capacitance_F, Simulated_CV_Curve( bias_V )[0], rtol=2E-3 )
+	pooled_relative_std = np.sqrt( np.mean( (summary.std.capacitance_f / capacitance_F)**2 ) )
+	assert abs( pooled_relative_std / Simulated_E4980.relative_noise["MEDIUM"] - 1 ) < 0.3
+
+def test_State_Cache():
+	instrument = Simulated_E4980( **ideal_instrument )
+	controller = Simulated_Controller( instrument )
+	Run_Simulated_Sweep( controller )
+	first_sweep_writes = len( instrument.command_log )
+	instrument.command_log.clear()
+	Run_Simulated_Sweep( controller )
+	assert "*RST;*CLS" not in instrument.command_log and len( instrument.command_log ) < first_sweep_writes
+	controller.Invalidate_Instrument_State()
+	instrument.command_log.clear()
+	Run_Simulated_Sweep( controller )
+	assert instrument.command_log[0] == "*RST;*CLS" and len( instrument.command_log ) == first_sweep_writes
+
+def test_Empty_Bias_Range():
+	instrument = Simulated_E4980( **ideal_instrument )
+	controller = Simulated_Controller( instrument )
+	errors, disconnects = [], []
+	controller.Error_signal.connect( errors.append )
+	controller.Device_Disconnected.connect( lambda *args : disconnects.append( args ) )
+	controller.Check_Connection_Then_Run( controller.Voltage_Sweep_Keysight )( 0.5, -2.0, 0.0125, 30E-3, 1E5, 0.0 ) # Reversed with a positive step
+	assert errors and errors[0].startswith( "Invalid sweep settings" ) and not disconnects
+	assert not any( command.startswith( ":LIST" ) or command.startswith( ":BIAS" ) for command in instrument.command_log )
@@ -0,0 +1,51 @@
+# Checks the local sweep cache's queries and least recently used eviction, run with pytest from the directory containing the package
+
+import itertools
+
+import numpy as np
+
+from CV_Measurement_Assistant import Sweep_Cache as sweep_cache
+from CV_Measurement_Assistant.Sweep_Result import Sweep_Result
+from CV_Measurement_Assistant.Sweep_Spool import Sweep_Spool
+
+
+def Make_Sweep( sweep_key, temperature_in_k, ac_frequency_hz=1E5, point_count=4, sample_name="S1" ):
+	bias_v = np.linspace( -1.0, 0.0, point_count )
+	meta_data = dict( sample_name=sample_name, device_location="A1", temperature_in_k=temperature_in_k, ac_amplitude_v=30E-3, ac_frequency_hz=ac_frequency_hz )
+	return ( sweep_key, meta_data, bias_v, bias_v * 1E-12 + temperature_in_k * 1E-15 )
+
+def test_Bulk_Query( tmp_path ):
+	cache = sweep_cache.Sweep_Cache( tmp_path / "cache.sqlite" )
+	cache.Add_Sweeps( [ Make_Sweep( "db:1", 200.0 ), Make_Sweep( "db:2", 77.2, point_count=6 ), Make_Sweep( "db:3", 77.0, ac_frequency_hz=1E3 ),
+	                    Make_Sweep( "db:4", 77.0, sample_name="S2" ) ] )
+	sweeps = cache.Query( sample_name="S1", ac_frequency_hz=1E5 )
+	assert [ meta_data["sweep_key"] for meta_data in sweeps.meta_data ] == [ "db:2", "db:1" ] # Ordered by temperature
+	assert sweeps.bias_v.shape == sweeps.capacitance_f.shape == (2, 6) and np.isnan( sweeps.bias_v[1, 4:] ).all() # NaN padded
+	assert np.allclose( sweeps.capacitance_f[1, :4], Make_Sweep( "db:1", 200.0 )[3] )
+	assert [ meta_data["sweep_key"] for meta_data in cache.Query( sample_name="S1", temperature_in_k=77.0 ).meta_data ] == [ "db:3", "db:2" ] # Within 0.5 K
+	assert cache.Query( sample_name="S3" ).bias_v.shape[0] == 0
+	cache.Close()
+
+def test_Least_Recently_Used_Eviction( tmp_path, monkeypatch ):
+	clock = itertools.count()
+	monkeypatch.setattr( sweep_cache.time, "time", lambda : float( next( clock ) ) )
+	cache = sweep_cache.Sweep_Cache( tmp_path / "cache.sqlite", max_points=10 )
+	cache.Add_Sweeps( [ Make_Sweep( "db:1", 100.0 ), Make_Sweep( "db:2", 150.0 ) ] )
+	cache.Query( temperature_in_k=100.0 ) # db:1 is now used more recently than db:2
+	cache.Add_Sweeps( [ Make_Sweep( "db:3", 200.0 ) ] ) # 12 points, one sweep has to go
+	assert cache.Cached_Keys( "db:" ) == { "db:1", "db:3" }
+	cache.Close()
+
+def test_Fill_From_Spool( tmp_path ):
+	spool = Sweep_Spool( tmp_path / "spool" )
+	bias_v = np.linspace( -1.0, 0.0, 5 )
+	meta_data = Make_Sweep( "", 77.0 )[1]
+	mean_ids = spool.Append_Group( [ (Sweep_Result.From_Arrays( bias_v, bias_v * 1E-12, bias_v ), dict( xy_data_sql_table="cv_raw_data", **meta_data )) ] )
+	spool.Append_Group( [ (Sweep_Result.From_Arrays( bias_v, bias_v * 0, bias_v ), dict( statistics_sql_table="cv_repeat_statistics", sample_count=[3] * 5, **meta_data )) ] )
+	cache = sweep_cache.Sweep_Cache( tmp_path / "cache.sqlite" )
+	assert cache.Fill_From_Spool( spool ) == 1 # Not the repeat statistics
+	assert cache.Fill_From_Spool( spool ) == 0
+	spool.Mark_Uploaded( mean_ids )
+	cache.Fill_From_Spool( spool )
+	assert cache.Cached_Keys( "spool:" ) == set() # Comes back from the database once uploaded
+	cache.Close()
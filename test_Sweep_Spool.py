@@ -0,0 +1,109 @@
+# Checks the sweep spool's replay, compaction and recovery from writes a crash cut short, run with pytest from the directory containing the package
+
+import numpy as np
+
+from CV_Measurement_Assistant.Sweep_Result import Sweep_Result, sweep_point_dtype
+from CV_Measurement_Assistant.Sweep_Spool import Sweep_Spool
+from CV_Measurement_Assistant.Run_Checkpoint import Run_Checkpoint
+
+
+def Make_Group( sweep_count=2, point_count=5 ):
+	bias_v = np.linspace( -1.0, 0.0, point_count )
+	return [ (Sweep_Result.From_Arrays( bias_v, bias_v * 1E-12 * (i + 1), bias_v ), dict( xy_data_sql_table="cv_raw_data", sample_name=f"S{i}" ))
+	         for i in range( sweep_count ) ]
+
+class Recording_Writer:
+	# Stands in for SQL_Write_Behind, keeps queued groups so the test decides which commits succeed
+	def __init__( self ):
+		self.queued = []
+
+	def Commit_Group( self, group, on_committed=None, on_failed=None ):
+		self.queued.append( (group, on_committed, on_failed) )
+
+def test_Append_And_Replay( tmp_path ):
+	spool = Sweep_Spool( tmp_path )
+	writer = Recording_Writer()
+	group = Make_Group()
+	for _, commit_arguments in group:
+		commit_arguments["xy_sql_labels"] = ("voltage_v", "capacitance_f")
+	spool.Commit_Group( writer, group )
+	(queued, on_committed, on_failed), = writer.queued
+	assert [ commit_arguments["sample_name"] for commit_arguments in queued ] == [ "S0", "S1" ]
+	assert np.array_equal( queued[1]["y_data"], group[1][0].capacitance_f ) and queued[0]["xy_sql_labels"] == ("voltage_v", "capacitance_f")
+	assert spool.Replay( writer ) == 0 # Still in flight, never queued twice
+
+	on_failed() # Database unreachable, the group stays in the spool
+	replay_writer = Recording_Writer()
+	assert Sweep_Spool( tmp_path ).Replay( replay_writer ) == 2
+	(replayed, on_committed, _), = replay_writer.queued
+	assert replayed[0]["xy_sql_labels"] == ("voltage_v", "capacitance_f") # A tuple again after the JSON round trip
+	on_committed()
+	assert Sweep_Spool( tmp_path ).Replay( Recording_Writer() ) == 0 # Uploaded once, never duplicated
+
+def test_Torn_Index_Line( tmp_path ):
+	spool = Sweep_Spool( tmp_path )
+	first_ids = spool.Append_Group( Make_Group() )
+	with open( spool.index_path, 'a' ) as outfile:
+		outfile.write( '{"sweep_id": "torn", "group' ) # Power lost mid line
+	assert [ entry["sweep_id"] for entry in spool.Entries() ] == first_ids
+	assert len( Sweep_Spool( tmp_path ).Pending_Groups() ) == 1 # As the next run sees it
+
+	second_ids = spool.Append_Group( Make_Group() ) # Not glued onto the partial line
+	assert [ entry["sweep_id"] for entry in spool.Entries() ] == first_ids + second_ids
+	assert "torn" not in spool.index_path.read_text()
+
+def test_Torn_Points_Record( tmp_path ):
+	spool = Sweep_Spool( tmp_path )
+	spool.Append_Group( Make_Group() )
+	with open( spool.points_path, 'ab' ) as outfile:
+		outfile.write( b'\0' * (sweep_point_dtype.itemsize // 2) )
+	group = Make_Group( sweep_count=1 )
+	spool.Append_Group( group )
+	entry, result = spool.Read_Sweeps()[-1]
+	assert np.array_equal( result.capacitance_f, group[0][0].capacitance_f )
+
+def test_Torn_Uploaded_Id( tmp_path ):
+	spool = Sweep_Spool( tmp_path )
+	sweep_ids = spool.Append_Group( Make_Group() )
+	spool.Mark_Uploaded( sweep_ids[:1] )
+	with open( spool.uploaded_path, 'a' ) as outfile:
+		outfile.write( sweep_ids[1][:8] )
+	assert spool.Uploaded_Ids() == set( sweep_ids[:1] )
+	spool.Mark_Uploaded( sweep_ids[1:] )
+	assert spool.Uploaded_Ids() == set( sweep_ids )
+
+def test_Torn_Checkpoint_Line( tmp_path ):
+	checkpoint = Run_Checkpoint( tmp_path, "recipe" )
+	checkpoint.Mark_Completed( 77.0, "A1" )
+	with open( checkpoint.path, 'a' ) as outfile:
+		outfile.write( '{"temperature_in_k": 80' )
+	assert checkpoint.Completed() == { (77.0, "A1") }
+	checkpoint.Mark_Completed( 80.0, "A1" )
+	assert checkpoint.Completed() == { (77.0, "A1"), (80.0, "A1") }
+
+def test_Compaction( tmp_path ):
+	spool = Sweep_Spool( tmp_path )
+	uploaded_ids = spool.Append_Group( Make_Group() )
+	pending_group = Make_Group( sweep_count=1, point_count=7 )
+	pending_ids = spool.Append_Group( pending_group )
+	spool.Mark_Uploaded( uploaded_ids )
+	spool.Mark_Failed( pending_ids )
+	assert spool.Compact() == 2
+	assert [ entry["sweep_id"] for entry in spool.Entries() ] == pending_ids and spool.Uploaded_Ids() == set()
+	(entry, result), = spool.Read_Sweeps()
+	assert entry["offset"] == 0 and result.points.tobytes() == pending_group[0][0].points.tobytes()
+	assert spool.points_path.stat().st_size == 7 * sweep_point_dtype.itemsize
+	assert spool.Compact() == 0
+
+def test_Interrupted_Compaction( tmp_path ):
+	spool = Sweep_Spool( tmp_path )
+	spool.Append_Group( Make_Group() )
+	original_index = spool.index_path.read_text()
+	spool.index_path.with_suffix( ".jsonl.new" ).write_text( "" )
+	spool.points_path.with_suffix( ".bin.new" ).write_bytes( b"" )
+	assert Sweep_Spool( tmp_path ).index_path.read_text() == original_index # Never marked ready, the old files stand
+	assert not spool.index_path.with_suffix( ".jsonl.new" ).exists()
+
+	spool.index_path.with_suffix( ".jsonl.new" ).write_text( "" )
+	spool.compaction_ready_path.touch() # Crashed after the points were swapped, before the index was
+	assert Sweep_Spool( tmp_path ).Entries() == [] and not spool.compaction_ready_path.exists()